@@ -3,34 +3,72 @@ from pathlib import Path
 import sys
 sys.path.append(str(Path(__file__).resolve().parents[1]))
 
-from fastapi import FastAPI, UploadFile, File, Form, Depends, HTTPException, status, Request
+from fastapi import FastAPI, UploadFile, File, Form, Depends, HTTPException, status, Request, Query
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse, FileResponse, PlainTextResponse
+from fastapi.responses import JSONResponse, FileResponse, PlainTextResponse, Response
 from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
+from fastapi.concurrency import run_in_threadpool
 from pydantic import BaseModel, EmailStr, ConfigDict
-from typing import Optional
-from sqlalchemy.orm import Session
+from typing import BinaryIO, List, Optional
+from sqlalchemy import select, delete, update, func, or_, and_
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import load_only, selectinload
 from pathlib import Path
-import shutil, uuid, os, re
+import shutil, uuid, os, re, io
+import base64
 from datetime import datetime, timedelta
 import secrets
+import hmac
 import smtplib
 import ssl
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
 import threading
+import asyncio
+from contextlib import asynccontextmanager
 from dotenv import load_dotenv
 
-from utils.convert import convert_to_mp3
-from scripts.transcribe import transcribe_audio
-from scripts.export import save_transcript_json, save_transcript_txt
-from api.database import init_db, get_db, User, Transcript, ChatMessage, SpeakerMapping, UserSettings, PasswordResetToken
+from starlette.requests import ClientDisconnect
+
+from utils.convert import (
+    prepare_audio, convert_stream, stream_sha256, file_sha256, estimate_mp3_duration, ConversionQueueFull, ConversionTicket
+)
+from scripts.transcribe import notify_completion, WEBHOOK_AUTH_HEADER
+from scripts.backends import transcribe_routed
+from api.database import init_db, get_async_db, async_engine, User, Transcript, ChatMessage, SpeakerMapping, UserSettings, PasswordResetToken, TranscriptionJob, TranscriptionCache, ResumableUpload, Utterance, utterances_from_response, fill_list_metadata
+from api.jobs import (
+    QUALITY_PRESETS,
+    BATCH_MAX_FILES,
+    GUEST_FLOW,
+    GUEST_WEIGHT,
+    conversion_executor,
+    job_executor,
+    remote_slots,
+    remote_slot_for,
+    queue_info,
+    probe_duration,
+    enqueue_job,
+    enqueue_batch,
+    job_to_dict,
+    batch_to_dict,
+    build_transcript_text,
+    find_cached_result,
+    complete_from_cache,
+    queue_staged_job,
+    start_job_recovery,
+    stop_job_recovery
+)
+from api.search import search_transcripts
+from api.limits import UploadSizeLimitMiddleware, UploadTooLarge, MULTIPART_OVERHEAD
 from api.auth import (
-    verify_password, 
-    get_password_hash, 
     create_access_token, 
     create_refresh_token,
-    decode_token
+    decode_token,
+    CachedUser,
+    user_cache,
+    password_hasher,
+    HashQueueFull
 )
 import openai
 import json
@@ -41,30 +79,75 @@ load_dotenv()
 # Initialize database
 init_db()
 
-app = FastAPI(title="MemoMind API", version="1.0.0")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Keep this process's job leases alive and resume jobs a dead process left behind
+    start_job_recovery()
+    yield
+    stop_job_recovery()
+    password_hasher.shutdown()
+    await async_engine.dispose()
+
+
+app = FastAPI(title="MemoMind API", version="1.0.0", lifespan=lifespan)
+
+# Directories
+INPUT_DIR = Path("inputs")
+OUTPUT_DIR = Path("outputs")
+INPUT_DIR.mkdir(exist_ok=True)
+OUTPUT_DIR.mkdir(exist_ok=True)
+
+# Pipe uploads straight through ffmpeg instead of staging them in inputs/ and outputs/
+STREAM_CONVERSION = os.getenv("STREAM_CONVERSION", "false").lower() == "true"
+
+# Resumable uploads: partial files live in inputs/partial until the last chunk arrives
+PARTIAL_DIR = INPUT_DIR / "partial"
+PARTIAL_DIR.mkdir(exist_ok=True)
+MAX_UPLOAD_SIZE = int(os.getenv("MAX_UPLOAD_SIZE", str(100 * 1024 * 1024)))  # 100MB
+UPLOAD_EXPIRY_HOURS = int(os.getenv("UPLOAD_EXPIRY_HOURS", "24"))
+
+# Request body caps, enforced as the body streams in (see api/limits.py)
+GUEST_MAX_SIZE = 5 * 1024 * 1024  # 5MB
+BATCH_MAX_SIZE = int(os.getenv("BATCH_MAX_SIZE", str(500 * 1024 * 1024)))  # whole /transcribe/batch request
+REQUEST_MAX_SIZE = int(os.getenv("REQUEST_MAX_SIZE", str(2 * 1024 * 1024)))  # every other route (JSON bodies)
+GUEST_TOO_LARGE = {
+    "error": "File too large for guest mode. Maximum size is 5MB. Please create an account for files up to 100MB.",
+    "upgrade_required": True
+}
+
+UTTERANCES_MAX_PAGE = 1000  # largest `limit` accepted by /transcripts/{id}/utterances
+TRANSCRIPTS_PAGE_SIZE = 50  # /transcripts/list
+TRANSCRIPTS_MAX_PAGE = 200
+SEARCH_PAGE_SIZE = 20  # /transcripts/search
+SEARCH_MAX_PAGE = 100
+
+# job_to_dict reads the ids of a finished job's transcript: loaded with the job,
+# since an AsyncSession cannot lazy load (and the text and JSON are not needed)
+JOB_TRANSCRIPT = selectinload(TranscriptionJob.transcript).load_only(Transcript.id, Transcript.transcript_id)
 
-# CORS Configuration
+app.add_middleware(
+    UploadSizeLimitMiddleware,
+    rules=[
+        ("POST", r"/transcribe/guest", GUEST_MAX_SIZE + MULTIPART_OVERHEAD, GUEST_TOO_LARGE),
+        ("POST", r"/transcribe", MAX_UPLOAD_SIZE + MULTIPART_OVERHEAD, None),
+        ("POST", r"/transcribe/batch", BATCH_MAX_SIZE, None),
+        ("PUT", r"/uploads/[^/]+", MAX_UPLOAD_SIZE, None),
+    ],
+    default_limit=REQUEST_MAX_SIZE
+)
+
+# CORS Configuration (added last so it wraps the size limits and their 413s)
 app.add_middleware(
     CORSMiddleware,
     allow_origins=os.getenv("CORS_ORIGINS", "http://localhost:3000,http://localhost:5173").split(","),
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["Location", "Upload-Offset", "Upload-Length", "Retry-After"],
 )
-# Directories
-INPUT_DIR = Path("inputs")
-OUTPUT_DIR = Path("outputs")
-INPUT_DIR.mkdir(exist_ok=True)
-OUTPUT_DIR.mkdir(exist_ok=True)
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/token")
 
-QUALITY_PRESETS = {
-    "high": "128k",
-    "medium": "96k",
-    "low": "64k"
-}
-
 # Pydantic models
 class UserCreate(BaseModel):
     email: EmailStr
@@ -83,27 +166,53 @@ class UserResponse(BaseModel):
 
 
 
-def authenticate_token(token: str = Depends(oauth2_scheme)):
-    """Validate JWT token and return email"""
+async def load_cached_user(db: AsyncSession, email: str, user_id: int = None):
+    """The user a token names, from the user cache or the users table; None if gone or renamed"""
+    user = user_cache.get(user_id) if user_id else None
+    if user is None:
+        row = (await db.execute(select(User.id, User.email, User.is_active, User.created_at).filter(
+            User.id == user_id if user_id else User.email == email
+        ))).first()
+        if row is None:
+            return None
+        user = CachedUser(row.id, row.email, bool(row.is_active), row.created_at)
+        user_cache.put(user)
+    # Tokens issued before an email change still name the old address
+    return user if user.email == email else None
+
+
+async def current_user(token: str = Depends(oauth2_scheme), db: AsyncSession = Depends(get_async_db)) -> CachedUser:
+    """
+    Validate the JWT and return its user. Tokens carry the user id, so the
+    user usually comes from the cache without a users query (tokens issued
+    before the id claim are looked up by email).
+    """
     try:
         payload = decode_token(token)
-        email = payload.get("sub")
-        if email is None:
-            raise HTTPException(status_code=401, detail="Invalid token")
-        return email
     except Exception:
         raise HTTPException(status_code=401, detail="Invalid token")
+    email = payload.get("sub")
+    if email is None:
+        raise HTTPException(status_code=401, detail="Invalid token")
+
+    user = await load_cached_user(db, email, payload.get("uid"))
+    if not user or not user.is_active or not payload.get("act", True):
+        raise HTTPException(
+            status_code=401, 
+            detail="User session expired or invalid. Please log out and log back in."
+        )
+    return user
 
 
-def get_user_by_email(db: Session, email: str):
-    """Get user from database by email"""
-    return db.query(User).filter(User.email == email).first()
+async def get_user_by_email(db: AsyncSession, email: str, *options):
+    """Get user from database by email (`options`: loader options for its relationships)"""
+    return await db.scalar(select(User).filter(User.email == email).options(*options))
 
 @app.post("/register")
-async def register(user_data: UserCreate, db: Session = Depends(get_db)):
+async def register(user_data: UserCreate, db: AsyncSession = Depends(get_async_db)):
     """Register a new user"""
     # Check if email already exists
-    existing_email = db.query(User).filter(User.email == user_data.email).first()
+    existing_email = await db.scalar(select(User).filter(User.email == user_data.email))
     if existing_email:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -111,15 +220,15 @@ async def register(user_data: UserCreate, db: Session = Depends(get_db)):
         )
     
     # Create new user
-    hashed_password = get_password_hash(user_data.password)
+    hashed_password = await password_hasher.hash(user_data.password)
     new_user = User(
         email=user_data.email,
         hashed_password=hashed_password
     )
     
     db.add(new_user)
-    db.commit()
-    db.refresh(new_user)
+    await db.commit()
+    await db.refresh(new_user)
     
     return {
         "message": "User created successfully",
@@ -128,7 +237,7 @@ async def register(user_data: UserCreate, db: Session = Depends(get_db)):
 
 
 @app.post("/token")
-async def login(request: Request, db: Session = Depends(get_db)):
+async def login(request: Request, db: AsyncSession = Depends(get_async_db)):
     """Login and get access token - accepts both form data and JSON"""
     content_type = request.headers.get("content-type", "")
     
@@ -151,9 +260,9 @@ async def login(request: Request, db: Session = Depends(get_db)):
         )
     
     # Get user from database by email
-    user = get_user_by_email(db, email)
+    user = await get_user_by_email(db, email)
     
-    if not user or not verify_password(password, user.hashed_password):
+    if not user or not await password_hasher.verify(password, user.hashed_password):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect email or password",
@@ -167,8 +276,9 @@ async def login(request: Request, db: Session = Depends(get_db)):
         )
     
     # Create tokens
-    access_token = create_access_token(user.email)
-    refresh_token = create_refresh_token(user.email)
+    access_token = create_access_token(user.email, user.id, user.is_active)
+    refresh_token = create_refresh_token(user.email, user.id)
+    user_cache.put(CachedUser(user.id, user.email, bool(user.is_active), user.created_at))
     
     return {
         "access_token": access_token,
@@ -177,7 +287,7 @@ async def login(request: Request, db: Session = Depends(get_db)):
     }
 
 @app.post("/refresh")
-async def refresh_token_endpoint(refresh_token: str = Form(...)):
+async def refresh_token_endpoint(refresh_token: str = Form(...), db: AsyncSession = Depends(get_async_db)):
     """Refresh access token using refresh token"""
     try:
         # JWT is cryptographically signed - just validate signature and expiry
@@ -186,25 +296,22 @@ async def refresh_token_endpoint(refresh_token: str = Form(...)):
         
         if not email:
             raise HTTPException(status_code=401, detail="Invalid refresh token")
-        
-        new_access_token = create_access_token(email)
-        return {"access_token": new_access_token, "token_type": "bearer"}
     except jwt.ExpiredSignatureError:
         raise HTTPException(status_code=401, detail="Refresh token expired")
     except Exception:
         raise HTTPException(status_code=401, detail="Invalid refresh token")
 
+    # The new token's claims come from the account as it is now (deleted, renamed or disabled: no token)
+    user = await load_cached_user(db, email, payload.get("uid"))
+    if not user or not user.is_active:
+        raise HTTPException(status_code=401, detail="Invalid refresh token")
+    new_access_token = create_access_token(user.email, user.id, user.is_active)
+    return {"access_token": new_access_token, "token_type": "bearer"}
+
 
 @app.get("/me", response_model=UserResponse)
-async def get_current_user(
-    email: str = Depends(authenticate_token),
-    db: Session = Depends(get_db)
-):
+async def get_current_user(user: CachedUser = Depends(current_user)):
     """Get current user information"""
-    user = get_user_by_email(db, email)
-    if not user:
-        raise HTTPException(status_code=404, detail="User not found")
-    
     return UserResponse(
         id=user.id,
         email=user.email,
@@ -333,20 +440,20 @@ The MemoMind Team
 @app.post("/forgot-password")
 async def forgot_password(
     request: PasswordResetRequest,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Request a password reset email"""
-    user = get_user_by_email(db, request.email)
+    user = await get_user_by_email(db, request.email)
     
     # Always return success to prevent email enumeration
     if not user:
         return {"message": "If an account exists with this email, you will receive a password reset link."}
     
     # Invalidate any existing tokens for this user
-    db.query(PasswordResetToken).filter(
+    await db.execute(update(PasswordResetToken).filter(
         PasswordResetToken.user_id == user.id,
         PasswordResetToken.used == 0
-    ).update({"used": 1})
+    ).values(used=1))
     
     # Create new reset token
     token = secrets.token_urlsafe(32)
@@ -358,7 +465,7 @@ async def forgot_password(
         expires_at=expires_at
     )
     db.add(reset_token)
-    db.commit()
+    await db.commit()
     
     # Send email in background thread (don't block the response)
     frontend_url = os.getenv("FRONTEND_URL", "http://localhost:3000")
@@ -374,15 +481,15 @@ async def forgot_password(
 @app.post("/reset-password")
 async def reset_password(
     request: PasswordResetConfirm,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Reset password using token"""
     # Find valid token
-    reset_token = db.query(PasswordResetToken).filter(
+    reset_token = await db.scalar(select(PasswordResetToken).filter(
         PasswordResetToken.token == request.token,
         PasswordResetToken.used == 0,
         PasswordResetToken.expires_at > datetime.utcnow()
-    ).first()
+    ))
     
     if not reset_token:
         raise HTTPException(
@@ -398,16 +505,17 @@ async def reset_password(
         )
     
     # Update password
-    user = db.query(User).filter(User.id == reset_token.user_id).first()
+    user = await db.get(User, reset_token.user_id)
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
     
-    user.hashed_password = get_password_hash(request.new_password)
+    user.hashed_password = await password_hasher.hash(request.new_password)
     
     # Mark token as used
     reset_token.used = 1
     
-    db.commit()
+    await db.commit()
+    user_cache.invalidate(user.id)
     
     return {"message": "Password has been reset successfully"}
 
@@ -415,14 +523,14 @@ async def reset_password(
 @app.get("/verify-reset-token")
 async def verify_reset_token(
     token: str,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Verify if a reset token is valid"""
-    reset_token = db.query(PasswordResetToken).filter(
+    reset_token = await db.scalar(select(PasswordResetToken.id).filter(
         PasswordResetToken.token == token,
         PasswordResetToken.used == 0,
         PasswordResetToken.expires_at > datetime.utcnow()
-    ).first()
+    ))
     
     if not reset_token:
         raise HTTPException(
@@ -433,13 +541,71 @@ async def verify_reset_token(
     return {"valid": True}
 
 
-@app.post("/transcribe")
+@app.exception_handler(UploadTooLarge)
+async def upload_too_large_handler(request: Request, exc: UploadTooLarge):
+    """The body crossed its route's size limit while streaming in"""
+    return JSONResponse(status_code=413, content=exc.payload, headers={"Connection": "close"})
+
+
+@app.exception_handler(ConversionQueueFull)
+async def conversion_queue_full_handler(request: Request, exc: ConversionQueueFull):
+    """Backpressure: every ffmpeg slot is busy and the wait queue is full"""
+    return JSONResponse(
+        status_code=503,
+        content={"error": "Server is busy converting audio. Please retry shortly."},
+        headers={"Retry-After": str(exc.retry_after)}
+    )
+
+
+@app.exception_handler(HashQueueFull)
+async def hash_queue_full_handler(request: Request, exc: HashQueueFull):
+    """Backpressure: a login/registration burst has filled the password hashing queue"""
+    return JSONResponse(
+        status_code=503,
+        content={"error": "Server is busy. Please retry shortly."},
+        headers={"Retry-After": str(exc.retry_after)}
+    )
+
+
+async def convert_upload_stream(file: UploadFile, bitrate: str, ticket: ConversionTicket):
+    """
+    Pipe the upload through ffmpeg in memory when STREAM_CONVERSION is on,
+    using the conversion queue place held by `ticket`.
+    Returns None when streaming is off or the input cannot be piped, in which
+    case the caller stages the upload on disk as before.
+    """
+    if not STREAM_CONVERSION:
+        return None
+    try:
+        return await asyncio.wrap_future(
+            conversion_executor.submit(convert_stream, file.file, bitrate, ticket=ticket)
+        )
+    except RuntimeError as e:
+        # Inputs that need seeking (e.g. m4a with a trailing moov atom) cannot be piped
+        print(f"⚠️  Streaming conversion failed, staging upload instead: {e}")
+        file.file.seek(0)
+        return None
+
+
+def detach_upload(file: UploadFile) -> BinaryIO:
+    """
+    Take the spooled request body away from `file`, rewound, so it outlives
+    the request (Starlette closes the UploadFile, not the body) until a job
+    worker closes it. Bodies over 1 MB are already spooled in a temp file.
+    """
+    body, file.file = file.file, io.BytesIO()
+    body.seek(0)
+    return body
+
+
+@app.post("/transcribe", status_code=status.HTTP_202_ACCEPTED)
 async def transcribe_endpoint(
     file: UploadFile = File(...),
     quality: str = Form("high"),
-    user: str = Depends(authenticate_token),
-    db: Session = Depends(get_db)
+    db_user: CachedUser = Depends(current_user),
+    db: AsyncSession = Depends(get_async_db)
 ):
+    """Stage the upload and queue a background transcription job"""
     api_key = os.getenv("AAI_API_KEY")
     if not api_key:
         return JSONResponse(status_code=500, content={"error": "AAI_API_KEY missing in .env"})
@@ -447,79 +613,388 @@ async def transcribe_endpoint(
     if quality not in QUALITY_PRESETS:
         return JSONResponse(status_code=400, content={"error": "Invalid quality value"})
 
-    uid = uuid.uuid4().hex[:8]
-    input_path = INPUT_DIR / f"{uid}_{file.filename}"
-    with open(input_path, "wb") as buffer:
-        shutil.copyfileobj(file.file, buffer)
 
+    # Fail fast with 503 + Retry-After when the conversion queue is full
+    ticket = conversion_executor.reserve()
     try:
-        base_name = input_path.stem
-        mp3_path = OUTPUT_DIR / f"{base_name}.mp3"
-        json_path = OUTPUT_DIR / f"{base_name}.json"
-        txt_path = OUTPUT_DIR / f"{base_name}.txt"
-
-        convert_to_mp3(input_path, mp3_path, bitrate=QUALITY_PRESETS[quality])
-        job = transcribe_audio(str(mp3_path), api_key)
-        save_transcript_json(job, json_path)
-        save_transcript_txt(job, txt_path)
-
-        # Extract full text from transcript with speaker labels
-        # Always use utterances format for consistency with speaker mappings
-        if hasattr(job, 'utterances') and job.utterances:
-            transcript_text = "\n".join([f"{utt.speaker}: {utt.text}" for utt in job.utterances])
-            # Debug: print first speaker label format
-            if job.utterances:
-                print(f"🔍 First speaker label format: '{job.utterances[0].speaker}'")
+        # Hash the upload as it is read; repeats are answered from the dedup cache
+        uid = uuid.uuid4().hex[:8]
+        input_path = None
+        if STREAM_CONVERSION:
+            content_hash = await run_in_threadpool(stream_sha256, file.file)
+            file.file.seek(0)
         else:
-            # Fallback to plain text if no utterances
-            transcript_text = job.text if hasattr(job, 'text') else ""
-        
-        # Save transcript to database
-        db_user = get_user_by_email(db, user)
-        if not db_user:
-            raise HTTPException(
-                status_code=401, 
-                detail="User session expired or invalid. Please log out and log back in."
-            )
-        
-        new_transcript = Transcript(
-            transcript_id=base_name,
+            input_path = INPUT_DIR / f"{uid}_{file.filename}"
+            with open(input_path, "wb") as buffer:
+                content_hash = await run_in_threadpool(stream_sha256, file.file, buffer)
+
+        job = TranscriptionJob(
+            job_id=uuid.uuid4().hex,
             user_id=db_user.id,
             filename=file.filename,
-            text_content=transcript_text,
-            json_content=json.dumps(job.json_response) if hasattr(job, 'json_response') else None
+            quality=quality,
+            content_hash=content_hash,
+            input_path=str(input_path) if input_path else None,
+            duration=await run_in_threadpool(probe_duration, input_path, content_hash) if input_path else None
         )
-        db.add(new_transcript)
-        db.commit()
-        db.refresh(new_transcript)
+        db.add(job)
 
-        # Cleanup: delete audio files (transcript is saved in database)
-        try:
-            if input_path.exists():
-                input_path.unlink()
-            if mp3_path.exists():
-                mp3_path.unlink()
-            if json_path.exists():
-                json_path.unlink()
-            if txt_path.exists():
-                txt_path.unlink()
-        except Exception as cleanup_error:
-            print(f"Warning: Failed to cleanup files: {cleanup_error}")
+        if input_path is not None:
+            if await queue_staged_job(db, job, ticket=ticket):
+                ticket = None
+        else:
+            cached = await db.run_sync(find_cached_result, content_hash)
+            if cached:
+                await db.run_sync(complete_from_cache, job, cached)
+            else:
+                # The worker pipes the body through ffmpeg into the AssemblyAI upload
+                body = detach_upload(file)
+                job.duration = await run_in_threadpool(probe_duration, body, content_hash)
+                await db.commit()
+                await run_in_threadpool(
+                    enqueue_job, job.job_id, job.user_id, body=body, ticket=ticket, duration=job.duration
+                )
+                ticket = None
+        await db.refresh(job)
+    finally:
+        if ticket is not None:
+            conversion_executor.cancel(ticket)
 
-        return {
-            "id": base_name,
-            "text_file": f"/transcripts/{base_name}?format=txt",
-            "json_file": f"/transcripts/{base_name}?format=json",
-            "database_id": new_transcript.id
-        }
-    except Exception as e:
-        # Cleanup on error too
+    return {
+        "job_id": job.job_id,
+        "status": job.status,
+        "status_url": f"/jobs/{job.job_id}",
+        **queue_info(job.job_id)
+    }
+
+
+@app.get("/jobs/{job_id}")
+async def get_job_status(
+    job_id: str,
+    db_user: CachedUser = Depends(current_user),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Report the current stage of a transcription job"""
+    job = await db.scalar(select(TranscriptionJob).filter(
+        TranscriptionJob.job_id == job_id,
+        TranscriptionJob.user_id == db_user.id
+    ).options(JOB_TRANSCRIPT))
+
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+
+    return job_to_dict(job)
+
+
+@app.post("/transcribe/batch", status_code=status.HTTP_202_ACCEPTED)
+async def transcribe_batch_endpoint(
+    files: List[UploadFile] = File(...),
+    quality: str = Form("high"),
+    db_user: CachedUser = Depends(current_user),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Stage several uploads at once and queue them as one batch: conversions
+    are pipelined with transcription and the transcripts are stored together.
+    """
+    api_key = os.getenv("AAI_API_KEY")
+    if not api_key:
+        return JSONResponse(status_code=500, content={"error": "AAI_API_KEY missing in .env"})
+
+    if quality not in QUALITY_PRESETS:
+        return JSONResponse(status_code=400, content={"error": "Invalid quality value"})
+
+    if len(files) > BATCH_MAX_FILES:
+        return JSONResponse(status_code=400, content={"error": f"A batch holds at most {BATCH_MAX_FILES} files"})
+
+
+    # Admission for the batch as a whole: its first file converts on this place, the next ones
+    # on the job worker's own (ConversionExecutor.run never waits on admission)
+    ticket = conversion_executor.reserve()
+    batch_id = uuid.uuid4().hex
+    staged = []
+    durations = []
+    try:
+        for file in files:
+            input_path = INPUT_DIR / f"{uuid.uuid4().hex[:8]}_{file.filename}"
+            staged.append(input_path)
+            with open(input_path, "wb") as buffer:
+                content_hash = await run_in_threadpool(stream_sha256, file.file, buffer)
+            durations.append(await run_in_threadpool(probe_duration, input_path, content_hash))
+            db.add(TranscriptionJob(
+                job_id=uuid.uuid4().hex,
+                user_id=db_user.id,
+                filename=file.filename,
+                quality=quality,
+                content_hash=content_hash,
+                input_path=str(input_path),
+                batch_id=batch_id,
+                duration=durations[-1]
+            ))
+        await db.commit()
+        await run_in_threadpool(enqueue_batch, batch_id, db_user.id, durations, ticket=ticket)
+        ticket = None
+        staged = []
+    finally:
+        if ticket is not None:
+            conversion_executor.cancel(ticket)
+        for path in staged:
+            if path.exists():
+                path.unlink()
+
+    jobs = (await db.scalars(
+        select(TranscriptionJob).filter(TranscriptionJob.batch_id == batch_id).order_by(TranscriptionJob.id)
+    )).all()
+    return {
+        "batch_id": batch_id,
+        "status_url": f"/batches/{batch_id}",
+        "jobs": [{"job_id": job.job_id, "filename": job.filename, "status": job.status} for job in jobs]
+    }
+
+
+@app.get("/batches/{batch_id}")
+async def get_batch_status(
+    batch_id: str,
+    db_user: CachedUser = Depends(current_user),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Report the progress of every file in a batch"""
+    jobs = (await db.scalars(select(TranscriptionJob).filter(
+        TranscriptionJob.batch_id == batch_id,
+        TranscriptionJob.user_id == db_user.id
+    ).options(JOB_TRANSCRIPT).order_by(TranscriptionJob.id))).all()
+
+    if not jobs:
+        raise HTTPException(status_code=404, detail="Batch not found")
+
+    return batch_to_dict(batch_id, jobs)
+
+
+# Resumable uploads (tus-style): POST /uploads declares the file, HEAD reports
+# how many bytes the server holds, PUT appends a chunk at Upload-Offset. The
+# last chunk starts the transcription job like POST /transcribe.
+
+class UploadCreate(BaseModel):
+    filename: str
+    size: int
+    quality: str = "high"
+
+
+# upload id -> lock serializing chunk writes within this process
+_upload_locks = {}
+
+
+async def _purge_expired_uploads(db: AsyncSession):
+    """Drop uploads nobody resumed before they expired"""
+    expired = (await db.scalars(
+        select(ResumableUpload).filter(ResumableUpload.expires_at < datetime.utcnow())
+    )).all()
+    for upload in expired:
+        partial = Path(upload.path)
+        if partial.exists():
+            partial.unlink()
+        _upload_locks.pop(upload.upload_id, None)
+        await db.delete(upload)
+    if expired:
+        await db.commit()
+
+
+async def _get_upload(db: AsyncSession, upload_id: str, db_user: CachedUser) -> ResumableUpload:
+    upload = await db.scalar(select(ResumableUpload).filter(
+        ResumableUpload.upload_id == upload_id,
+        ResumableUpload.user_id == db_user.id
+    ))
+
+    if not upload:
+        raise HTTPException(status_code=404, detail="Upload not found")
+    if upload.expires_at < datetime.utcnow():
+        await _purge_expired_uploads(db)
+        raise HTTPException(status_code=410, detail="Upload expired, please start again")
+    return upload
+
+
+def _upload_headers(upload: ResumableUpload) -> dict:
+    return {
+        "Upload-Offset": str(upload.offset),
+        "Upload-Length": str(upload.size),
+        "Cache-Control": "no-store"
+    }
+
+
+async def _start_upload_job(db: AsyncSession, upload: ResumableUpload, ticket: ConversionTicket):
+    """Move a complete upload into inputs/ and start its job; returns (job, whether it took the ticket)"""
+    input_path = INPUT_DIR / f"{upload.upload_id[:8]}_{upload.filename}"
+    content_hash = await run_in_threadpool(file_sha256, Path(upload.path))
+    os.replace(upload.path, input_path)
+
+    job = TranscriptionJob(
+        job_id=uuid.uuid4().hex,
+        user_id=upload.user_id,
+        filename=upload.filename,
+        quality=upload.quality,
+        content_hash=content_hash,
+        input_path=str(input_path),
+        duration=await run_in_threadpool(probe_duration, input_path, content_hash)
+    )
+    db.add(job)
+    upload.job_id = job.job_id
+    queued = await queue_staged_job(db, job, ticket=ticket)
+    return job, queued
+
+
+@app.post("/uploads", status_code=status.HTTP_201_CREATED)
+async def create_upload(
+    data: UploadCreate,
+    db_user: CachedUser = Depends(current_user),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Declare a file to be sent in chunks"""
+    if data.quality not in QUALITY_PRESETS:
+        return JSONResponse(status_code=400, content={"error": "Invalid quality value"})
+    if data.size <= 0:
+        return JSONResponse(status_code=400, content={"error": "Invalid file size"})
+    if data.size > MAX_UPLOAD_SIZE:
+        return JSONResponse(
+            status_code=413,
+            content={"error": f"File is too large. Maximum size is {MAX_UPLOAD_SIZE // (1024 * 1024)}MB."}
+        )
+
+
+    await _purge_expired_uploads(db)
+
+    upload_id = uuid.uuid4().hex
+    partial = PARTIAL_DIR / upload_id
+    partial.touch()
+    upload = ResumableUpload(
+        upload_id=upload_id,
+        user_id=db_user.id,
+        filename=Path(data.filename).name,
+        quality=data.quality,
+        size=data.size,
+        offset=0,
+        path=str(partial),
+        expires_at=datetime.utcnow() + timedelta(hours=UPLOAD_EXPIRY_HOURS)
+    )
+    db.add(upload)
+    await db.commit()
+
+    return JSONResponse(
+        status_code=201,
+        content={"upload_id": upload_id, "upload_url": f"/uploads/{upload_id}", "offset": 0, "size": data.size},
+        headers={"Location": f"/uploads/{upload_id}", **_upload_headers(upload)}
+    )
+
+
+@app.head("/uploads/{upload_id}")
+async def get_upload_offset(
+    upload_id: str,
+    db_user: CachedUser = Depends(current_user),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Report how many bytes of the upload the server already holds"""
+    upload = await _get_upload(db, upload_id, db_user)
+    return Response(status_code=200, headers=_upload_headers(upload))
+
+
+@app.put("/uploads/{upload_id}")
+async def upload_chunk(
+    upload_id: str,
+    request: Request,
+    db_user: CachedUser = Depends(current_user),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Append the request body at Upload-Offset. Answers 204 with the new
+    offset, or - once the last byte is in - the queued transcription job.
+    """
+    upload = await _get_upload(db, upload_id, db_user)
+    try:
+        offset = int(request.headers["Upload-Offset"])
+    except (KeyError, ValueError):
+        return JSONResponse(status_code=400, content={"error": "Upload-Offset header is required"})
+
+    lock = _upload_locks.setdefault(upload_id, asyncio.Lock())
+    async with lock:
+        await db.refresh(upload)
+        if upload.job_id:
+            return {"job_id": upload.job_id, "offset": upload.offset, "status_url": f"/jobs/{upload.job_id}"}
+        if offset != upload.offset:
+            return JSONResponse(
+                status_code=409,
+                content={"error": "Upload-Offset does not match the stored offset", "offset": upload.offset},
+                headers=_upload_headers(upload)
+            )
+
+        # Reserve the conversion slot before reading the last chunk, so a busy
+        # server answers 503 without the client losing anything
+        declared = request.headers.get("content-length")
+        completes = upload.offset == upload.size or (
+            declared is not None and declared.isdigit() and upload.offset + int(declared) >= upload.size
+        )
+        ticket = conversion_executor.reserve() if completes else None
         try:
-            if input_path.exists():
-                input_path.unlink()
-        except:
-            pass
-        return JSONResponse(status_code=500, content={"error": str(e)})
+            received = upload.offset
+            disconnected = False
+            with open(upload.path, "r+b") as partial:
+                # Drop bytes written by an attempt that never recorded its offset
+                partial.seek(received)
+                partial.truncate()
+                try:
+                    async for chunk in request.stream():
+                        if received + len(chunk) > upload.size:
+                            partial.truncate(upload.offset)
+                            return JSONResponse(
+                                status_code=413,
+                                content={"error": "Chunk goes past the declared upload size"},
+                                headers=_upload_headers(upload)
+                            )
+                        partial.write(chunk)
+                        received += len(chunk)
+                except ClientDisconnect:
+                    # Keep what arrived; the client resumes from here
+                    disconnected = True
+
+            upload.offset = received
+            upload.expires_at = datetime.utcnow() + timedelta(hours=UPLOAD_EXPIRY_HOURS)
+            await db.commit()
+
+            if disconnected or received < upload.size:
+                return Response(status_code=204, headers=_upload_headers(upload))
+
+            if ticket is None:
+                ticket = conversion_executor.reserve()
+            job, queued = await _start_upload_job(db, upload, ticket)
+            if queued:
+                ticket = None
+            _upload_locks.pop(upload_id, None)
+            return {
+                "job_id": job.job_id,
+                "status": job.status,
+                "offset": upload.offset,
+                "status_url": f"/jobs/{job.job_id}",
+                **queue_info(job.job_id)
+            }
+        finally:
+            if ticket is not None:
+                conversion_executor.cancel(ticket)
+
+
+@app.delete("/uploads/{upload_id}", status_code=status.HTTP_204_NO_CONTENT)
+async def cancel_upload(
+    upload_id: str,
+    db_user: CachedUser = Depends(current_user),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Abandon an unfinished upload and free its disk space"""
+    upload = await _get_upload(db, upload_id, db_user)
+    if not upload.job_id:
+        partial = Path(upload.path)
+        if partial.exists():
+            partial.unlink()
+    _upload_locks.pop(upload_id, None)
+    await db.delete(upload)
+    await db.commit()
+    return Response(status_code=204)
 
 
 @app.post("/transcribe/guest")
@@ -530,12 +1005,10 @@ async def transcribe_guest(
     """
     Guest transcription endpoint - no authentication required.
     Limitations:
-    - Max file size: 5MB
+    - Max file size: 5MB (413 from UploadSizeLimitMiddleware as the body streams in)
     - No history saved
     - Default prompts only
     """
-    GUEST_MAX_SIZE = 5 * 1024 * 1024  # 5MB
-    
     api_key = os.getenv("ASSEMBLYAI_API_KEY")
     if not api_key:
         return JSONResponse(status_code=500, content={"error": "API key not configured"})
@@ -543,63 +1016,82 @@ async def transcribe_guest(
     if quality not in QUALITY_PRESETS:
         quality = "medium"
 
-    # Check file size
-    file.file.seek(0, 2)  # Seek to end
-    file_size = file.file.tell()
-    file.file.seek(0)  # Reset to beginning
-    
-    if file_size > GUEST_MAX_SIZE:
-        return JSONResponse(
-            status_code=400, 
-            content={
-                "error": f"File too large for guest mode. Maximum size is 5MB. Please create an account for files up to 100MB.",
-                "upgrade_required": True
-            }
-        )
-
     # Generate unique ID for this guest transcription
     unique_id = f"guest_{uuid.uuid4().hex[:12]}"
     input_path = INPUT_DIR / f"{unique_id}{Path(file.filename).suffix}"
+    mp3_path = None
 
-    with open(input_path, "wb") as buffer:
-        shutil.copyfileobj(file.file, buffer)
-
+    # Fail fast with 503 + Retry-After when the conversion queue is full
+    ticket = conversion_executor.reserve()
     try:
-        base_name = input_path.stem
-        mp3_path = OUTPUT_DIR / f"{base_name}.mp3"
+        # Run the blocking conversion and AssemblyAI round-trip off the event loop
+        audio = await convert_upload_stream(file, QUALITY_PRESETS[quality], ticket)
+        if audio is None:
+            if ticket.used:
+                # The failed streaming attempt used up its place in the queue
+                ticket = conversion_executor.reserve()
+            with open(input_path, "wb") as buffer:
+                shutil.copyfileobj(file.file, buffer)
+            mp3_path, media_info = await asyncio.wrap_future(conversion_executor.submit(
+                prepare_audio, input_path, OUTPUT_DIR / unique_id, bitrate=QUALITY_PRESETS[quality], ticket=ticket
+            ))
+            audio = mp3_path
+            duration = media_info.get("duration")
+        else:
+            duration = estimate_mp3_duration(audio.getbuffer().nbytes, QUALITY_PRESETS[quality])
 
-        convert_to_mp3(input_path, mp3_path, bitrate=QUALITY_PRESETS[quality])
-        job = transcribe_audio(str(mp3_path), api_key)
+        # Short guest memos are what the local engine is for (TRANSCRIPTION_BACKEND=auto)
+        # Guests wait behind account holders for an AssemblyAI slot (lower weight)
+        job = await run_in_threadpool(
+            transcribe_routed, audio, duration, api_key,
+            remote_slot=remote_slot_for(GUEST_FLOW, unique_id, weight=GUEST_WEIGHT)
+        )
 
         # Extract transcript text
-        if hasattr(job, 'utterances') and job.utterances:
-            transcript_text = "\n".join([f"{utt.speaker}: {utt.text}" for utt in job.utterances])
-        else:
-            transcript_text = job.text if hasattr(job, 'text') else ""
-
-        # Cleanup files immediately (no persistence for guests)
-        try:
-            if input_path.exists():
-                input_path.unlink()
-            if mp3_path.exists():
-                mp3_path.unlink()
-        except Exception as cleanup_error:
-            print(f"Warning: Failed to cleanup guest files: {cleanup_error}")
+        transcript_text = build_transcript_text(job)
 
         return {
-            "id": base_name,
+            "id": unique_id,
             "text": transcript_text,
             "json_response": job.json_response if hasattr(job, 'json_response') else None,
             "is_guest": True,
             "upgrade_message": "Create an account to save transcripts, access history, and customize AI prompts!"
         }
+    except ConversionQueueFull:
+        raise
     except Exception as e:
+        return JSONResponse(status_code=500, content={"error": str(e)})
+    finally:
+        conversion_executor.cancel(ticket)
+        # Cleanup files immediately (no persistence for guests)
         try:
             if input_path.exists():
                 input_path.unlink()
-        except:
-            pass
-        return JSONResponse(status_code=500, content={"error": str(e)})
+            if mp3_path and mp3_path.exists():
+                mp3_path.unlink()
+        except Exception as cleanup_error:
+            print(f"Warning: Failed to cleanup guest files: {cleanup_error}")
+
+
+@app.post("/webhooks/assemblyai")
+async def assemblyai_webhook(request: Request):
+    """
+    Completion callback from AssemblyAI (AAI_COMPLETION_MODE=webhook).
+    The payload is only used as a wake-up signal - the waiting job still
+    fetches its result from AssemblyAI itself.
+    """
+    secret = os.getenv("AAI_WEBHOOK_SECRET")
+    if secret and not hmac.compare_digest(request.headers.get(WEBHOOK_AUTH_HEADER, ""), secret):
+        raise HTTPException(status_code=401, detail="Invalid webhook secret")
+
+    payload = await request.json()
+    transcript_id = payload.get("transcript_id")
+    if not transcript_id:
+        raise HTTPException(status_code=400, detail="Missing transcript_id")
+
+    print(f"🔔 Webhook: transcript {transcript_id} is {payload.get('status')}")
+    notify_completion(transcript_id)
+    return {"status": "ok"}
 
 
 @app.post("/chat/guest")
@@ -642,32 +1134,110 @@ async def chat_with_transcript_guest(
         return JSONResponse(status_code=500, content={"error": str(e)})
 
 
+def _encode_cursor(transcript: Transcript) -> str:
+    raw = f"{transcript.created_at.isoformat()}|{transcript.id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def _decode_cursor(cursor: str):
+    """(created_at, id) of the last transcript of the previous page"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        created_at, transcript_id = raw.rsplit("|", 1)
+        return datetime.fromisoformat(created_at), int(transcript_id)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
 @app.get("/transcripts/list")
 async def list_transcripts(
-    user: str = Depends(authenticate_token),
-    db: Session = Depends(get_db)
+    cursor: Optional[str] = None,
+    limit: int = Query(TRANSCRIPTS_PAGE_SIZE, ge=1, le=TRANSCRIPTS_MAX_PAGE),
+    created_from: Optional[datetime] = None,
+    created_to: Optional[datetime] = None,
+    prefix: Optional[str] = None,
+    db_user: CachedUser = Depends(current_user),
+    db: AsyncSession = Depends(get_async_db)
 ):
-    """List all transcripts for the current user"""
-    db_user = get_user_by_email(db, user)
-    if not db_user:
-        raise HTTPException(
-            status_code=401, 
-            detail="User session expired or invalid. Please log out and log back in."
-        )
-    
-    transcripts = db.query(Transcript).filter(Transcript.user_id == db_user.id).order_by(Transcript.created_at.desc()).all()
+    """
+    List the current user's transcripts, newest first, one page at a time.
+
+    Pass the returned `next_cursor` back as `cursor` for the next page.
+    `created_from` (inclusive) and `created_to` (exclusive) bound the
+    creation date; `prefix` matches the start of the filename, ignoring case.
+    """
     
-    return [
-        {
+    # Only the precomputed list columns: the texts and JSON stay in the database
+    query = select(Transcript).options(load_only(
+        Transcript.id, Transcript.transcript_id, Transcript.filename, Transcript.created_at, Transcript.duration,
+        Transcript.word_count, Transcript.preview, Transcript.speaker_count
+    )).filter(Transcript.user_id == db_user.id)
+    if created_from:
+        query = query.filter(Transcript.created_at >= created_from)
+    if created_to:
+        query = query.filter(Transcript.created_at < created_to)
+    if prefix:
+        query = query.filter(func.lower(Transcript.filename).startswith(prefix.lower(), autoescape=True))
+    if cursor:
+        # Keyset: resume strictly after the previous page's last row, whatever was inserted since
+        last_created_at, last_id = _decode_cursor(cursor)
+        query = query.filter(or_(
+            Transcript.created_at < last_created_at,
+            and_(Transcript.created_at == last_created_at, Transcript.id < last_id)
+        ))
+    # One extra row tells whether another page follows
+    transcripts = (await db.scalars(
+        query.order_by(Transcript.created_at.desc(), Transcript.id.desc()).limit(limit + 1)
+    )).all()
+    has_more = len(transcripts) > limit
+    transcripts = transcripts[:limit]
+
+    for t in transcripts:
+        if t.word_count is None:
+            # Not backfilled yet (backfill_list_metadata.py): loads this row's text once
+            await db.refresh(t, ["text_content"])
+            fill_list_metadata(t)
+
+    listing = {
+        "transcripts": [{
             "id": t.id,
             "transcript_id": t.transcript_id,
             "filename": t.filename,
             "created_at": t.created_at.isoformat(),
-            "word_count": len(t.text_content.split()) if t.text_content else 0,
-            "preview": t.text_content[:150] + "..." if t.text_content and len(t.text_content) > 150 else (t.text_content or "")
-        }
-        for t in transcripts
-    ]
+            "duration": t.duration,
+            "word_count": t.word_count,
+            "speaker_count": t.speaker_count,
+            "preview": t.preview or ""
+        } for t in transcripts],
+        "next_cursor": _encode_cursor(transcripts[-1]) if has_more else None
+    }
+    if db.dirty:
+        await db.commit()
+    return listing
+
+
+@app.get("/transcripts/search")
+async def search_user_transcripts(
+    q: str = Query(..., min_length=1, max_length=200),
+    limit: int = Query(SEARCH_PAGE_SIZE, ge=1, le=SEARCH_MAX_PAGE),
+    offset: int = Query(0, ge=0),
+    db_user: CachedUser = Depends(current_user),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Search the current user's transcripts (filenames and text).
+
+    Every word of `q` must match, the last one as a prefix. Results are
+    ranked by relevance and carry a highlighted `snippet` plus the matching
+    utterances with their timestamps (ms) to jump straight to them.
+    """
+
+    results = await db.run_sync(search_transcripts, db_user.id, q, limit=limit, offset=offset)
+    return {
+        "results": results,
+        "offset": offset,
+        "next_offset": offset + limit if len(results) == limit else None
+    }
 
 
 class TranscriptUpdate(BaseModel):
@@ -678,21 +1248,20 @@ class TranscriptUpdate(BaseModel):
 async def rename_transcript(
     transcript_id: int,
     update: TranscriptUpdate,
-    user: str = Depends(authenticate_token),
-    db: Session = Depends(get_db)
+    db_user: CachedUser = Depends(current_user),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Rename a transcript"""
-    db_user = get_user_by_email(db, user)
-    transcript = db.query(Transcript).filter(
+    transcript = await db.scalar(select(Transcript).options(load_only(Transcript.id, Transcript.filename)).filter(
         Transcript.id == transcript_id,
         Transcript.user_id == db_user.id
-    ).first()
+    ))
     
     if not transcript:
         raise HTTPException(status_code=404, detail="Transcript not found")
     
     transcript.filename = update.filename
-    db.commit()
+    await db.commit()
     
     return {"status": "success", "filename": update.filename}
 
@@ -700,72 +1269,82 @@ async def rename_transcript(
 @app.delete("/transcripts/{transcript_id}")
 async def delete_transcript(
     transcript_id: int,
-    user: str = Depends(authenticate_token),
-    db: Session = Depends(get_db)
+    db_user: CachedUser = Depends(current_user),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Delete a transcript and all associated data"""
-    db_user = get_user_by_email(db, user)
-    transcript = db.query(Transcript).filter(
+    transcript = await db.scalar(select(Transcript.id).filter(
         Transcript.id == transcript_id,
         Transcript.user_id == db_user.id
-    ).first()
+    ))
     
     if not transcript:
         raise HTTPException(status_code=404, detail="Transcript not found")
     
     # Delete associated chat messages
-    db.query(ChatMessage).filter(ChatMessage.transcript_id == transcript_id).delete()
+    await db.execute(delete(ChatMessage).filter(ChatMessage.transcript_id == transcript_id))
     
     # Delete speaker mappings
-    db.query(SpeakerMapping).filter(SpeakerMapping.transcript_id == transcript_id).delete()
+    await db.execute(delete(SpeakerMapping).filter(SpeakerMapping.transcript_id == transcript_id))
+    
+    # Repeat uploads of the same audio must not be served this text any more
+    await db.execute(delete(TranscriptionCache).filter(TranscriptionCache.transcript_db_id == transcript_id))
     
-    # Delete the transcript
-    db.delete(transcript)
-    db.commit()
+    # Jobs keep their history without it (ON DELETE SET NULL, which SQLite does not enforce)
+    await db.execute(update(TranscriptionJob).filter(
+        TranscriptionJob.transcript_db_id == transcript_id
+    ).values(transcript_db_id=None))
+    
+    # Delete utterances in one statement (a long recording has thousands)
+    await db.execute(delete(Utterance).filter(Utterance.transcript_id == transcript_id))
+    
+    # Delete the transcript (bulk too: the ORM cascade would load the emptied relationships first)
+    await db.execute(delete(Transcript).filter(Transcript.id == transcript_id))
+    await db.commit()
     
     return {"status": "success", "message": "Transcript deleted"}
 
 
 @app.get("/transcripts/{transcript_id}")
-def get_transcript(
+async def get_transcript(
     transcript_id: str, 
     format: str = "txt", 
-    user: str = Depends(authenticate_token),
-    db: Session = Depends(get_db)
+    db_user: CachedUser = Depends(current_user),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Download transcript with speaker names applied"""
     # Try to parse as database ID first
-    db_user = get_user_by_email(db, user)
     transcript = None
     
     # Check if it's a numeric ID (database_id)
     if transcript_id.isdigit():
-        transcript = db.query(Transcript).filter(
+        transcript = await db.scalar(select(Transcript).filter(
             Transcript.id == int(transcript_id),
             Transcript.user_id == db_user.id
-        ).first()
+        ))
     
     # If not found, try as transcript_id (filename-based)
     if not transcript:
-        transcript = db.query(Transcript).filter(
+        transcript = await db.scalar(select(Transcript).filter(
             Transcript.transcript_id == transcript_id,
             Transcript.user_id == db_user.id
-        ).first()
+        ))
     
     if not transcript:
         raise HTTPException(status_code=404, detail="Transcript not found")
     
     # Get speaker mappings
-    speaker_mappings = db.query(SpeakerMapping).filter(
+    speaker_mappings = (await db.scalars(select(SpeakerMapping).filter(
         SpeakerMapping.transcript_id == transcript.id
-    ).all()
+    ))).all()
     
     if format == "json":
         # For JSON, parse and replace speaker names in utterances
-        if not transcript.json_content:
+        if not transcript.json_content_stored:
             raise HTTPException(status_code=404, detail="JSON content not found")
         
-        json_data = json.loads(transcript.json_content)
+        # Decompressing and parsing a long recording's JSON is CPU work: off the event loop
+        json_data = await run_in_threadpool(lambda: json.loads(transcript.json_content))
         
         # Apply mappings to utterances if they exist
         if 'utterances' in json_data:
@@ -831,12 +1410,12 @@ class EmailChange(BaseModel):
 
 @app.get("/settings")
 async def get_settings(
-    user: str = Depends(authenticate_token),
-    db: Session = Depends(get_db)
+    db_user: CachedUser = Depends(current_user),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Get user settings"""
-    db_user = get_user_by_email(db, user)
-    if not db_user.settings:
+    user_settings = await db.scalar(select(UserSettings).filter(UserSettings.user_id == db_user.id))
+    if not user_settings:
         # Return defaults if no settings exist
         return {
             "system_prompt_template": None,
@@ -852,93 +1431,129 @@ async def get_settings(
         }
     
     return {
-        "system_prompt_template": db_user.settings.system_prompt_template,
-        "default_user_prompt": db_user.settings.default_user_prompt,
-        "ai_model": db_user.settings.ai_model or "gpt-4o-mini",
-        "response_length": db_user.settings.response_length or "medium",
-        "temperature": db_user.settings.temperature or "0.7",
-        "default_quality": db_user.settings.default_quality or "medium",
-        "default_language": db_user.settings.default_language,
-        "theme": db_user.settings.theme or "system",
-        "date_format": db_user.settings.date_format or "us",
-        "font_size": db_user.settings.font_size or "medium"
+        "system_prompt_template": user_settings.system_prompt_template,
+        "default_user_prompt": user_settings.default_user_prompt,
+        "ai_model": user_settings.ai_model or "gpt-4o-mini",
+        "response_length": user_settings.response_length or "medium",
+        "temperature": user_settings.temperature or "0.7",
+        "default_quality": user_settings.default_quality or "medium",
+        "default_language": user_settings.default_language,
+        "theme": user_settings.theme or "system",
+        "date_format": user_settings.date_format or "us",
+        "font_size": user_settings.font_size or "medium"
     }
 
 
 @app.put("/settings")
 async def update_settings(
     settings: SettingsUpdate,
-    user: str = Depends(authenticate_token),
-    db: Session = Depends(get_db)
+    db_user: CachedUser = Depends(current_user),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Update user settings"""
-    db_user = get_user_by_email(db, user)
+    user_settings = await db.scalar(select(UserSettings).filter(UserSettings.user_id == db_user.id))
     
-    if not db_user.settings:
+    if not user_settings:
         user_settings = UserSettings(user_id=db_user.id)
         db.add(user_settings)
-        db_user.settings = user_settings
     
     # Update only provided fields
     if settings.system_prompt_template is not None:
-        db_user.settings.system_prompt_template = settings.system_prompt_template or None
+        user_settings.system_prompt_template = settings.system_prompt_template or None
     if settings.default_user_prompt is not None:
-        db_user.settings.default_user_prompt = settings.default_user_prompt or None
+        user_settings.default_user_prompt = settings.default_user_prompt or None
     if settings.ai_model is not None:
-        db_user.settings.ai_model = settings.ai_model
+        user_settings.ai_model = settings.ai_model
     if settings.response_length is not None:
-        db_user.settings.response_length = settings.response_length
+        user_settings.response_length = settings.response_length
     if settings.temperature is not None:
-        db_user.settings.temperature = settings.temperature
+        user_settings.temperature = settings.temperature
     if settings.default_quality is not None:
-        db_user.settings.default_quality = settings.default_quality
+        user_settings.default_quality = settings.default_quality
     if settings.default_language is not None:
-        db_user.settings.default_language = settings.default_language or None
+        user_settings.default_language = settings.default_language or None
     if settings.theme is not None:
-        db_user.settings.theme = settings.theme
+        user_settings.theme = settings.theme
     if settings.date_format is not None:
-        db_user.settings.date_format = settings.date_format
+        user_settings.date_format = settings.date_format
     if settings.font_size is not None:
-        db_user.settings.font_size = settings.font_size
+        user_settings.font_size = settings.font_size
     
-    db.commit()
+    await db.commit()
     
     return {"status": "success"}
 
 
+async def _ensure_utterances(db: AsyncSession, transcript: Transcript):
+    """Fill the utterances table from json_content for transcripts stored before it existed"""
+    if await db.scalar(select(Utterance.id).filter(Utterance.transcript_id == transcript.id).limit(1)):
+        return
+    # Not loaded by the endpoint: only read when the table has to be filled from it
+    await db.refresh(transcript, ["json_content_stored"])
+    if not transcript.json_content_stored:
+        return
+    try:
+        rows = await run_in_threadpool(utterances_from_response, transcript.json_content)
+    except json.JSONDecodeError:
+        return
+    if rows:
+        for row in rows:
+            row.transcript_id = transcript.id
+        db.add_all(rows)
+        try:
+            await db.commit()
+        except IntegrityError:
+            # A concurrent first read filled it in between: its rows are the same ones
+            await db.rollback()
+            await db.refresh(transcript, ["id"])
+
+
 @app.get("/transcripts/{transcript_id}/utterances")
 async def get_transcript_utterances(
     transcript_id: int,
-    user: str = Depends(authenticate_token),
-    db: Session = Depends(get_db)
+    offset: int = Query(0, ge=0),
+    limit: Optional[int] = Query(None, ge=1, le=UTTERANCES_MAX_PAGE),
+    from_ms: Optional[int] = Query(None, ge=0),
+    to_ms: Optional[int] = Query(None, ge=0),
+    db_user: CachedUser = Depends(current_user),
+    db: AsyncSession = Depends(get_async_db)
 ):
-    """Get utterances and speaker mappings for a transcript"""
+    """
+    Get utterances and speaker mappings for a transcript.
+
+    `offset`/`limit` page through the utterances in time order (all of them
+    without a limit); `from_ms`/`to_ms` keep those overlapping that window.
+    """
     # Verify transcript belongs to user
-    db_user = get_user_by_email(db, user)
-    transcript = db.query(Transcript).filter(
+    transcript = await db.scalar(select(Transcript).options(load_only(Transcript.id)).filter(
         Transcript.id == transcript_id,
         Transcript.user_id == db_user.id
-    ).first()
+    ))
     
     if not transcript:
         raise HTTPException(status_code=404, detail="Transcript not found")
     
     # Get speaker mappings
-    mappings = {m.original_label: m.display_name for m in transcript.speaker_mappings}
-    
-    # Parse JSON content
-    utterances = []
-    if transcript.json_content:
-        try:
-            data = json.loads(transcript.json_content)
-            if 'utterances' in data and data['utterances']:
-                utterances = data['utterances']
-        except json.JSONDecodeError:
-            pass
-            
+    mappings = {m.original_label: m.display_name for m in (await db.scalars(
+        select(SpeakerMapping).filter(SpeakerMapping.transcript_id == transcript.id)
+    ))}
+
+    await _ensure_utterances(db, transcript)
+    query = select(Utterance).filter(Utterance.transcript_id == transcript.id)
+    if from_ms is not None:
+        query = query.filter(Utterance.end_ms > from_ms)
+    if to_ms is not None:
+        query = query.filter(Utterance.start_ms < to_ms)
+    total = await db.scalar(select(func.count()).select_from(query.subquery()))
+    rows = (await db.scalars(query.order_by(Utterance.start_ms, Utterance.idx).offset(offset).limit(limit))).all()
+
+    next_offset = offset + len(rows)
     return {
-        "utterances": utterances,
-        "speakers": mappings
+        "utterances": [row.to_dict() for row in rows],
+        "speakers": mappings,
+        "total": total,
+        "offset": offset,
+        "next_offset": next_offset if next_offset < total else None
     }
 
 
@@ -946,25 +1561,24 @@ async def get_transcript_utterances(
 async def update_speaker_mapping(
     transcript_id: int,
     speaker_update: SpeakerUpdate,
-    user: str = Depends(authenticate_token),
-    db: Session = Depends(get_db)
+    db_user: CachedUser = Depends(current_user),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Update speaker name mapping"""
     # Verify transcript belongs to user
-    db_user = get_user_by_email(db, user)
-    transcript = db.query(Transcript).filter(
+    transcript = await db.scalar(select(Transcript.id).filter(
         Transcript.id == transcript_id,
         Transcript.user_id == db_user.id
-    ).first()
+    ))
     
     if not transcript:
         raise HTTPException(status_code=404, detail="Transcript not found")
     
     # Check if mapping exists
-    mapping = db.query(SpeakerMapping).filter(
+    mapping = await db.scalar(select(SpeakerMapping).filter(
         SpeakerMapping.transcript_id == transcript_id,
         SpeakerMapping.original_label == speaker_update.original_label
-    ).first()
+    ))
     
     if mapping:
         mapping.display_name = speaker_update.display_name
@@ -976,7 +1590,7 @@ async def update_speaker_mapping(
         )
         db.add(mapping)
         
-    db.commit()
+    await db.commit()
     
     return {"status": "success", "display_name": speaker_update.display_name}
 
@@ -985,8 +1599,8 @@ async def update_speaker_mapping(
 async def chat_with_transcript(
     transcript_id: int,
     chat_request: ChatRequest,
-    user: str = Depends(authenticate_token),
-    db: Session = Depends(get_db)
+    db_user: CachedUser = Depends(current_user),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Send a chat message and get AI response about the transcript"""
     # Get OpenAI API key
@@ -998,11 +1612,10 @@ async def chat_with_transcript(
         )
     
     # Verify transcript belongs to user
-    db_user = get_user_by_email(db, user)
-    transcript = db.query(Transcript).filter(
+    transcript = await db.scalar(select(Transcript).options(load_only(Transcript.id, Transcript.text_content)).filter(
         Transcript.id == transcript_id,
         Transcript.user_id == db_user.id
-    ).first()
+    ))
     
     if not transcript:
         raise HTTPException(status_code=404, detail="Transcript not found")
@@ -1014,18 +1627,18 @@ async def chat_with_transcript(
         content=chat_request.message
     )
     db.add(user_message)
-    db.commit()
+    await db.commit()
     
     # Get chat history
-    chat_history = db.query(ChatMessage).filter(
+    chat_history = (await db.scalars(select(ChatMessage).filter(
         ChatMessage.transcript_id == transcript_id
-    ).order_by(ChatMessage.created_at).limit(20).all()
+    ).order_by(ChatMessage.created_at).limit(20))).all()
     
     # Apply speaker mappings to transcript
     transcript_text = transcript.text_content
-    speaker_mappings = db.query(SpeakerMapping).filter(
+    speaker_mappings = (await db.scalars(select(SpeakerMapping).filter(
         SpeakerMapping.transcript_id == transcript_id
-    ).all()
+    ))).all()
     
     print(f"🔍 Found {len(speaker_mappings)} speaker mappings")
     for mapping in speaker_mappings:
@@ -1046,9 +1659,10 @@ async def chat_with_transcript(
     # Get user settings for custom prompt
     system_prompt = f"You are a helpful assistant analyzing an audio transcript. Here is the full transcript:\n\n{transcript_text}\n\nAnswer questions about this transcript accurately and concisely."
     
-    if db_user.settings and db_user.settings.system_prompt_template:
+    user_settings = await db.scalar(select(UserSettings).filter(UserSettings.user_id == db_user.id))
+    if user_settings and user_settings.system_prompt_template:
         # Inject transcript into template
-        template = db_user.settings.system_prompt_template
+        template = user_settings.system_prompt_template
         # Replace {transcript} placeholder, or append if not present
         if "{transcript}" in template:
             system_prompt = template.replace("{transcript}", transcript_text)
@@ -1097,8 +1711,8 @@ async def chat_with_transcript(
             content=ai_response or ""  # Ensure we don't save None
         )
         db.add(assistant_message)
-        db.commit()
-        db.refresh(assistant_message)
+        await db.commit()
+        await db.refresh(assistant_message)
         
         return ChatResponse(
             content=ai_response or "",
@@ -1114,23 +1728,22 @@ async def chat_with_transcript(
 @app.get("/chat/{transcript_id}/history")
 async def get_chat_history(
     transcript_id: int,
-    user: str = Depends(authenticate_token),
-    db: Session = Depends(get_db)
+    db_user: CachedUser = Depends(current_user),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Get chat history for a transcript"""
     # Verify transcript belongs to user
-    db_user = get_user_by_email(db, user)
-    transcript = db.query(Transcript).filter(
+    transcript = await db.scalar(select(Transcript.id).filter(
         Transcript.id == transcript_id,
         Transcript.user_id == db_user.id
-    ).first()
+    ))
     
     if not transcript:
         raise HTTPException(status_code=404, detail="Transcript not found")
     
-    messages = db.query(ChatMessage).filter(
+    messages = (await db.scalars(select(ChatMessage).filter(
         ChatMessage.transcript_id == transcript_id
-    ).order_by(ChatMessage.created_at).all()
+    ).order_by(ChatMessage.created_at))).all()
     
     return [
         {
@@ -1146,23 +1759,22 @@ async def get_chat_history(
 @app.delete("/chat/{transcript_id}/history")
 async def clear_chat_history(
     transcript_id: int,
-    user: str = Depends(authenticate_token),
-    db: Session = Depends(get_db)
+    db_user: CachedUser = Depends(current_user),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Clear chat history for a transcript"""
     # Verify transcript belongs to user
-    db_user = get_user_by_email(db, user)
-    transcript = db.query(Transcript).filter(
+    transcript = await db.scalar(select(Transcript.id).filter(
         Transcript.id == transcript_id,
         Transcript.user_id == db_user.id
-    ).first()
+    ))
     
     if not transcript:
         raise HTTPException(status_code=404, detail="Transcript not found")
     
     # Delete all chat messages
-    db.query(ChatMessage).filter(ChatMessage.transcript_id == transcript_id).delete()
-    db.commit()
+    await db.execute(delete(ChatMessage).filter(ChatMessage.transcript_id == transcript_id))
+    await db.commit()
     
     return {"message": "Chat history cleared"}
 
@@ -1172,14 +1784,14 @@ async def clear_chat_history(
 @app.post("/account/change-password")
 async def change_password(
     password_data: PasswordChange,
-    user: str = Depends(authenticate_token),
-    db: Session = Depends(get_db)
+    user: CachedUser = Depends(current_user),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Change user password"""
-    db_user = get_user_by_email(db, user)
+    db_user = await db.get(User, user.id)
     
     # Verify current password
-    if not verify_password(password_data.current_password, db_user.hashed_password):
+    if not await password_hasher.verify(password_data.current_password, db_user.hashed_password):
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Current password is incorrect"
@@ -1193,8 +1805,9 @@ async def change_password(
         )
     
     # Update password
-    db_user.hashed_password = get_password_hash(password_data.new_password)
-    db.commit()
+    db_user.hashed_password = await password_hasher.hash(password_data.new_password)
+    await db.commit()
+    user_cache.invalidate(db_user.id)
     
     return {"status": "success", "message": "Password changed successfully"}
 
@@ -1202,21 +1815,21 @@ async def change_password(
 @app.post("/account/change-email")
 async def change_email(
     email_data: EmailChange,
-    user: str = Depends(authenticate_token),
-    db: Session = Depends(get_db)
+    user: CachedUser = Depends(current_user),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Change user email"""
-    db_user = get_user_by_email(db, user)
+    db_user = await db.get(User, user.id)
     
     # Verify password
-    if not verify_password(email_data.password, db_user.hashed_password):
+    if not await password_hasher.verify(email_data.password, db_user.hashed_password):
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Password is incorrect"
         )
     
     # Check if new email already exists
-    existing = db.query(User).filter(User.email == email_data.new_email).first()
+    existing = await db.scalar(select(User.id).filter(User.email == email_data.new_email))
     if existing:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -1225,11 +1838,13 @@ async def change_email(
     
     # Update email
     db_user.email = email_data.new_email
-    db.commit()
+    await db.commit()
+    # Tokens naming the old address stop working right away
+    user_cache.invalidate(db_user.id)
     
     # Generate new tokens with new email
-    access_token = create_access_token(email_data.new_email)
-    refresh_token = create_refresh_token(email_data.new_email)
+    access_token = create_access_token(email_data.new_email, db_user.id, db_user.is_active)
+    refresh_token = create_refresh_token(email_data.new_email, db_user.id)
     
     return {
         "status": "success",
@@ -1242,46 +1857,49 @@ async def change_email(
 
 @app.get("/account/export")
 async def export_all_data(
-    user: str = Depends(authenticate_token),
-    db: Session = Depends(get_db)
+    db_user: CachedUser = Depends(current_user),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Export all user transcripts as JSON"""
     import zipfile
     import io
     from fastapi.responses import StreamingResponse
     
-    db_user = get_user_by_email(db, user)
-    transcripts = db.query(Transcript).filter(Transcript.user_id == db_user.id).all()
-    
-    # Create ZIP file in memory
-    zip_buffer = io.BytesIO()
-    with zipfile.ZipFile(zip_buffer, 'w', zipfile.ZIP_DEFLATED) as zip_file:
-        for transcript in transcripts:
-            # Add text file
-            txt_filename = f"{transcript.filename}.txt"
-            zip_file.writestr(txt_filename, transcript.text_content or "")
+    transcripts = (await db.scalars(select(Transcript).filter(Transcript.user_id == db_user.id))).all()
+    
+    def build_zip():
+        # Create ZIP file in memory
+        zip_buffer = io.BytesIO()
+        with zipfile.ZipFile(zip_buffer, 'w', zipfile.ZIP_DEFLATED) as zip_file:
+            for transcript in transcripts:
+                # Add text file
+                txt_filename = f"{transcript.filename}.txt"
+                zip_file.writestr(txt_filename, transcript.text_content or "")
+                
+                # Add JSON file if available
+                if transcript.json_content:
+                    json_filename = f"{transcript.filename}.json"
+                    zip_file.writestr(json_filename, transcript.json_content)
             
-            # Add JSON file if available
-            if transcript.json_content:
-                json_filename = f"{transcript.filename}.json"
-                zip_file.writestr(json_filename, transcript.json_content)
-        
-        # Add metadata file
-        metadata = {
-            "exported_at": datetime.utcnow().isoformat(),
-            "user_email": db_user.email,
-            "total_transcripts": len(transcripts),
-            "transcripts": [
-                {
-                    "id": t.id,
-                    "filename": t.filename,
-                    "created_at": t.created_at.isoformat()
-                }
-                for t in transcripts
-            ]
-        }
-        zip_file.writestr("metadata.json", json.dumps(metadata, indent=2))
+            # Add metadata file
+            metadata = {
+                "exported_at": datetime.utcnow().isoformat(),
+                "user_email": db_user.email,
+                "total_transcripts": len(transcripts),
+                "transcripts": [
+                    {
+                        "id": t.id,
+                        "filename": t.filename,
+                        "created_at": t.created_at.isoformat()
+                    }
+                    for t in transcripts
+                ]
+            }
+            zip_file.writestr("metadata.json", json.dumps(metadata, indent=2))
+        return zip_buffer
     
+    # Decompressing and deflating every transcript is CPU work: off the event loop
+    zip_buffer = await run_in_threadpool(build_zip)
     zip_buffer.seek(0)
     
     return StreamingResponse(
@@ -1295,15 +1913,39 @@ async def export_all_data(
 
 @app.delete("/account")
 async def delete_account(
-    user: str = Depends(authenticate_token),
-    db: Session = Depends(get_db)
+    user: CachedUser = Depends(current_user),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Delete user account and all associated data"""
-    db_user = get_user_by_email(db, user)
-    
-    # Delete all user data (cascades will handle related records)
-    db.delete(db_user)
-    db.commit()
+    transcript_ids = select(Transcript.id).filter(Transcript.user_id == user.id)
+    files = (await db.execute(select(ResumableUpload.path).filter(ResumableUpload.user_id == user.id))).scalars().all()
+    for job in (await db.execute(select(TranscriptionJob.input_path, TranscriptionJob.audio_path).filter(
+        TranscriptionJob.user_id == user.id
+    ))).all():
+        files.extend(job)
+    
+    # Children first: SQLite does not enforce the foreign keys' ON DELETE clauses
+    for model, criterion in (
+        # Repeat uploads of the same audio must not be served this user's text any more
+        (TranscriptionCache, TranscriptionCache.transcript_db_id.in_(transcript_ids)),
+        (ChatMessage, ChatMessage.transcript_id.in_(transcript_ids)),
+        (SpeakerMapping, SpeakerMapping.transcript_id.in_(transcript_ids)),
+        (Utterance, Utterance.transcript_id.in_(transcript_ids)),
+        (TranscriptionJob, TranscriptionJob.user_id == user.id),
+        (ResumableUpload, ResumableUpload.user_id == user.id),
+        (PasswordResetToken, PasswordResetToken.user_id == user.id),
+        (UserSettings, UserSettings.user_id == user.id),
+        (Transcript, Transcript.user_id == user.id),
+        (User, User.id == user.id),
+    ):
+        await db.execute(delete(model).filter(criterion))
+    await db.commit()
+    user_cache.invalidate(user.id)
+    
+    # Staged and partial audio of unfinished uploads and jobs
+    for path in files:
+        if path and Path(path).exists():
+            Path(path).unlink()
     
     return {"status": "success", "message": "Account deleted successfully"}
 
@@ -1313,6 +1955,18 @@ def health():
     return {"status": "ok"}
 
 
+@app.get("/metrics")
+def metrics():
+    """Queue depth and wait times, for sizing nodes"""
+    return {
+        "conversion": conversion_executor.stats(),
+        "jobs": job_executor.stats(),
+        "remote": remote_slots.stats(),
+        "password_hashing": password_hasher.stats(),
+        "user_cache": user_cache.stats(),
+    }
+
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run("app:app", host="0.0.0.0", port=8000, reload=True)
@@ -1,16 +1,35 @@
 """
 Authentication utilities
 """
+import asyncio
 import bcrypt
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
 from datetime import datetime, timedelta
+from typing import NamedTuple
 import jwt
+import math
+import multiprocessing
 import os
+import threading
+import time
 
 SECRET_KEY = os.getenv("JWT_SECRET", "supersecret")
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 60 * 24  # 24 hours
 REFRESH_TOKEN_EXPIRE_DAYS = 7
 
+# Authenticated users kept in memory so most requests skip the users query.
+# Invalidation is per process: with several workers, the TTL bounds how long
+# another worker may still accept a deleted or renamed account
+USER_CACHE_TTL_SECONDS = float(os.getenv("USER_CACHE_TTL_SECONDS", "30"))
+USER_CACHE_SIZE = int(os.getenv("USER_CACHE_SIZE", "4096"))
+
+# bcrypt runs in worker processes so a login burst does not stall the event loop
+HASH_WORKERS = int(os.getenv("HASH_WORKERS", str(min(2, os.cpu_count() or 1))))  # simultaneous hashes
+HASH_QUEUE_SIZE = int(os.getenv("HASH_QUEUE_SIZE", "64"))  # hashes allowed to wait for a worker
+
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     """Verify a password against its hash"""
@@ -36,18 +55,18 @@ def create_token(data: dict, expires_delta: timedelta) -> str:
     return jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
 
 
-def create_access_token(username: str) -> str:
-    """Create an access token"""
+def create_access_token(username: str, user_id: int = None, is_active: bool = True) -> str:
+    """Create an access token (`uid`/`act` claims: the user's id and active flag)"""
     return create_token(
-        {"sub": username}, 
+        {"sub": username, "uid": user_id, "act": bool(is_active)}, 
         timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
     )
 
 
-def create_refresh_token(username: str) -> str:
+def create_refresh_token(username: str, user_id: int = None) -> str:
     """Create a refresh token"""
     return create_token(
-        {"sub": username}, 
+        {"sub": username, "uid": user_id}, 
         timedelta(days=REFRESH_TOKEN_EXPIRE_DAYS)
     )
 
@@ -55,3 +74,172 @@ def create_refresh_token(username: str) -> str:
 def decode_token(token: str) -> dict:
     """Decode and verify a JWT token"""
     return jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+
+
+class CachedUser(NamedTuple):
+    """What authenticated routes need to know about their user"""
+    id: int
+    email: str
+    is_active: bool
+    created_at: datetime
+
+
+class UserCache:
+    """LRU of CachedUser by user id, each entry trusted for `ttl` seconds"""
+
+    def __init__(self, ttl: float = USER_CACHE_TTL_SECONDS, size: int = USER_CACHE_SIZE):
+        self.ttl = ttl
+        self.size = size
+        self._entries = OrderedDict()  # user id -> (CachedUser, expires at)
+        self._lock = threading.Lock()
+        self._counters = {"hits": 0, "misses": 0, "invalidations": 0}
+
+    def get(self, user_id: int):
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is None or entry[1] < time.monotonic():
+                self._entries.pop(user_id, None)
+                self._counters["misses"] += 1
+                return None
+            self._entries.move_to_end(user_id)
+            self._counters["hits"] += 1
+            return entry[0]
+
+    def put(self, user: CachedUser):
+        if self.ttl <= 0:
+            return
+        with self._lock:
+            self._entries[user.id] = (user, time.monotonic() + self.ttl)
+            self._entries.move_to_end(user.id)
+            while len(self._entries) > self.size:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, user_id: int):
+        """Forget a user whose email, password, status or existence changed"""
+        with self._lock:
+            self._entries.pop(user_id, None)
+            self._counters["invalidations"] += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"size": len(self._entries), "ttl_seconds": self.ttl, **self._counters}
+
+
+user_cache = UserCache()
+
+
+def _timed(fn, *args):
+    """Runs in a hashing worker: (seconds spent, result)"""
+    started = time.perf_counter()
+    result = fn(*args)
+    return time.perf_counter() - started, result
+
+
+class HashQueueFull(Exception):
+    """Every hashing worker is busy and the wait queue is full"""
+
+    def __init__(self, retry_after: int):
+        super().__init__(f"Password hashing queue is full, retry in {retry_after}s")
+        self.retry_after = retry_after
+
+
+class PasswordHasher:
+    """
+    verify_password / get_password_hash for async handlers, on a bounded
+    process pool.
+
+    Each bcrypt call is 100-300 ms of CPU: inline it blocks every request of
+    the worker, on threads it still competes with them. At most `workers`
+    hashes run at once, `max_queue` more wait, and the next ones raise
+    HashQueueFull so the API answers 503 + Retry-After.
+    """
+
+    # Exponential moving average of the wait / hashing times
+    EWMA_ALPHA = 0.2
+
+    def __init__(self, workers: int = HASH_WORKERS, max_queue: int = HASH_QUEUE_SIZE):
+        self.workers = max(1, workers)
+        self.max_queue = max_queue
+        self._pool = None
+        self._admission = threading.BoundedSemaphore(self.workers + self.max_queue)
+        self._lock = threading.Lock()
+        self._pending = 0
+        self._counters = {"submitted": 0, "rejected": 0, "completed": 0, "failed": 0}
+        self._wait_avg = 0.0
+        self._wait_max = 0.0
+        self._run_avg = 0.25  # initial guess before the first hash
+
+    def pool(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._pool is None:
+                # spawn: forking a process that runs threads (uvicorn, job workers) is unsafe
+                self._pool = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    mp_context=multiprocessing.get_context("spawn")
+                )
+            return self._pool
+
+    async def verify(self, plain_password: str, hashed_password: str) -> bool:
+        return await self._run(verify_password, plain_password, hashed_password)
+
+    async def hash(self, password: str) -> str:
+        return await self._run(get_password_hash, password)
+
+    async def _run(self, fn, *args):
+        if not self._admission.acquire(blocking=False):
+            with self._lock:
+                self._counters["rejected"] += 1
+            raise HashQueueFull(self.retry_after())
+        started = time.monotonic()
+        with self._lock:
+            self._pending += 1
+            self._counters["submitted"] += 1
+
+        ran = None
+        try:
+            ran, result = await asyncio.wrap_future(self.pool().submit(_timed, fn, *args))
+            return result
+        except BrokenProcessPool:
+            # A worker died: the next hash starts a fresh pool
+            self.shutdown()
+            raise
+        finally:
+            with self._lock:
+                self._pending -= 1
+                if ran is None:
+                    self._counters["failed"] += 1
+                else:
+                    waited = time.monotonic() - started - ran
+                    self._wait_avg += self.EWMA_ALPHA * (waited - self._wait_avg)
+                    self._wait_max = max(self._wait_max, waited)
+                    self._run_avg += self.EWMA_ALPHA * (ran - self._run_avg)
+                    self._counters["completed"] += 1
+            self._admission.release()
+
+    def retry_after(self) -> int:
+        """Suggested delay (seconds) before a worker frees up"""
+        with self._lock:
+            rounds = math.ceil((self._pending + 1) / self.workers)
+            return int(min(60, max(1, math.ceil(rounds * self._run_avg))))
+
+    def shutdown(self):
+        with self._lock:
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.shutdown(wait=False, cancel_futures=True)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "workers": self.workers,
+                "running": min(self._pending, self.workers),
+                "queue_depth": max(0, self._pending - self.workers),
+                "max_queue": self.max_queue,
+                "wait_seconds_avg": round(self._wait_avg, 3),
+                "wait_seconds_max": round(self._wait_max, 3),
+                "run_seconds_avg": round(self._run_avg, 3),
+                **self._counters,
+            }
+
+
+password_hasher = PasswordHasher()
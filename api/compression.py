@@ -0,0 +1,76 @@
+"""
+Compressed storage for large JSON text columns
+
+AssemblyAI responses carry word-level timings and reach several MB for long
+meetings. They are stored compressed in the same Text column, behind a
+format marker, so existing plain rows stay readable side by side:
+
+    {"id": ...}           plain JSON (rows written before compression, small values)
+    gz1:<base64>          gzip
+    zs1:<base64>          zstd (needs the optional zstandard package)
+
+Base64 keeps the value valid text on SQLite and PostgreSQL without a
+column type change. Values are decompressed only when the attribute is read.
+"""
+import base64
+import gzip
+import importlib.util
+import os
+from typing import Optional
+
+GZIP_MARKER = "gz1:"
+ZSTD_MARKER = "zs1:"
+
+JSON_COMPRESSION = os.getenv("JSON_COMPRESSION", "auto").lower()  # auto (zstd if installed, else gzip), zstd, gzip, none
+COMPRESS_MIN_BYTES = int(os.getenv("COMPRESS_MIN_BYTES", "4096"))  # smaller values stay plain
+GZIP_LEVEL = 6
+ZSTD_LEVEL = 10
+
+
+def default_codec() -> Optional[str]:
+    """Codec used for new values: "zstd", "gzip", or None (store plain)"""
+    if JSON_COMPRESSION == "none":
+        return None
+    if JSON_COMPRESSION in ("auto", "zstd") and importlib.util.find_spec("zstandard") is not None:
+        return "zstd"
+    return "gzip"
+
+
+def is_compressed(stored: Optional[str]) -> bool:
+    return stored is not None and stored.startswith((GZIP_MARKER, ZSTD_MARKER))
+
+
+def compress_text(text: Optional[str], codec: Optional[str] = "default") -> Optional[str]:
+    """Stored form of `text`; already compressed values and small ones are returned unchanged"""
+    if codec == "default":
+        codec = default_codec()
+    if text is None or codec is None or is_compressed(text):
+        return text
+    data = text.encode("utf-8")
+    if len(data) < COMPRESS_MIN_BYTES:
+        return text
+
+    if codec == "zstd":
+        import zstandard
+
+        stored = ZSTD_MARKER + base64.b64encode(zstandard.ZstdCompressor(level=ZSTD_LEVEL).compress(data)).decode("ascii")
+    elif codec == "gzip":
+        stored = GZIP_MARKER + base64.b64encode(gzip.compress(data, compresslevel=GZIP_LEVEL)).decode("ascii")
+    else:
+        raise ValueError(f"Unknown compression codec {codec!r}")
+    # Incompressible content is not worth the decoding cost
+    return stored if len(stored) < len(data) else text
+
+
+def decompress_text(stored: Optional[str]) -> Optional[str]:
+    """Original text of a stored value, plain or compressed"""
+    if stored is None or not is_compressed(stored):
+        return stored
+    payload = base64.b64decode(stored.split(":", 1)[1])
+    if stored.startswith(GZIP_MARKER):
+        return gzip.decompress(payload).decode("utf-8")
+    try:
+        import zstandard
+    except ImportError:
+        raise RuntimeError("This row is zstd-compressed: pip install zstandard to read it")
+    return zstandard.ZstdDecompressor().decompress(payload).decode("utf-8")
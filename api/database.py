@@ -1,13 +1,18 @@
 """
 Database models and setup for user management
 """
-from sqlalchemy import create_engine, Column, Integer, String, DateTime, Boolean, Text, ForeignKey
+from sqlalchemy import create_engine, event, Column, Integer, Float, String, DateTime, Boolean, Text, ForeignKey, UniqueConstraint, Index
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker, relationship
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.orm import sessionmaker, relationship, synonym
 from datetime import datetime
 from pathlib import Path
+import json
 import os
 
+from api.compression import compress_text, decompress_text
+
 # Database setup - supports both SQLite (dev) and PostgreSQL (production)
 DATABASE_URL = os.getenv("DATABASE_URL")
 
@@ -42,6 +47,36 @@ else:
     )
 
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+# Async twin for the FastAPI endpoints (asyncpg / aiosqlite), so queries do not
+# block the event loop. The job workers, scripts and init_db keep the sync engine.
+ASYNC_DRIVERS = {"postgresql": "postgresql+asyncpg", "sqlite": "sqlite+aiosqlite"}
+
+
+def _async_url(url):
+    url = make_url(url)
+    url = url.set(drivername=ASYNC_DRIVERS.get(url.get_backend_name(), url.drivername))
+    if url.get_backend_name() == "postgresql" and "sslmode" in url.query:
+        # asyncpg spells libpq's sslmode "ssl"
+        url = url.update_query_dict({"ssl": url.query["sslmode"]}).difference_update_query(["sslmode"])
+    return url
+
+
+if DATABASE_URL:
+    async_engine = create_async_engine(
+        _async_url(DATABASE_URL),
+        pool_pre_ping=True,
+        pool_recycle=60,
+        pool_size=3,
+        max_overflow=5,
+        pool_timeout=30,
+        connect_args={"timeout": 10}
+    )
+else:
+    async_engine = create_async_engine(_async_url(SQLALCHEMY_DATABASE_URL))
+
+# expire_on_commit=False: attributes read after a commit must not trigger a (forbidden) lazy load
+AsyncSessionLocal = async_sessionmaker(async_engine, class_=AsyncSession, autoflush=False, expire_on_commit=False)
 Base = declarative_base()
 
 
@@ -60,22 +95,120 @@ class User(Base):
     settings = relationship("UserSettings", back_populates="user", uselist=False)
 
 
+def compressed_synonym(stored_attr: str):
+    """
+    Attribute reading and writing the text in `stored_attr` through
+    api/compression.py: compressed on assignment, decompressed on first read.
+    """
+    cache_attr = f"_{stored_attr}_decoded"
+
+    def get(self):
+        stored = getattr(self, stored_attr)
+        cached = self.__dict__.get(cache_attr)
+        if cached is not None and cached[0] is stored:
+            return cached[1]
+        text = decompress_text(stored)
+        self.__dict__[cache_attr] = (stored, text)
+        return text
+
+    def set(self, value):
+        setattr(self, stored_attr, compress_text(value))
+
+    return synonym(stored_attr, descriptor=property(get, set))
+
+
 class Transcript(Base):
     """Transcript model for storing audio transcriptions"""
     __tablename__ = "transcripts"
+    __table_args__ = (
+        # /transcripts/list: a user's transcripts by date (keyset pagination)
+        Index("ix_transcripts_user_created", "user_id", "created_at"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     transcript_id = Column(String, unique=True, index=True, nullable=False)  # e.g., "uid_filename"
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
     filename = Column(String, nullable=False)
     text_content = Column(Text, nullable=False)  # Full transcript text
-    json_content = Column(Text, nullable=True)  # Full JSON from AssemblyAI
+    json_content_stored = Column("json_content", Text, nullable=True)  # Full JSON from AssemblyAI, maybe compressed
+    json_content = compressed_synonym("json_content_stored")
+    duration = Column(Float, nullable=True)  # audio length in seconds
+    # Shown by /transcripts/list, computed on insert so listing never reads the texts (see fill_list_metadata)
+    word_count = Column(Integer, nullable=True)
+    preview = Column(Text, nullable=True)
+    speaker_count = Column(Integer, nullable=True)
     created_at = Column(DateTime, default=datetime.utcnow)
     
     # Relationships
     user = relationship("User", back_populates="transcripts")
     chat_messages = relationship("ChatMessage", back_populates="transcript", cascade="all, delete-orphan")
     speaker_mappings = relationship("SpeakerMapping", back_populates="transcript", cascade="all, delete-orphan")
+    utterances = relationship("Utterance", back_populates="transcript", cascade="all, delete-orphan",
+                              order_by="Utterance.idx")
+
+
+class Utterance(Base):
+    """One speaker turn of a transcript, so pages and time ranges are read without parsing json_content"""
+    __tablename__ = "utterances"
+    __table_args__ = (
+        UniqueConstraint("transcript_id", "idx"),
+        Index("ix_utterances_transcript_start", "transcript_id", "start_ms"),
+    )
+
+    id = Column(Integer, primary_key=True)
+    transcript_id = Column(Integer, ForeignKey("transcripts.id", ondelete="CASCADE"), nullable=False)
+    idx = Column(Integer, nullable=False)  # position in the transcript
+    speaker = Column(String, nullable=True)  # original label, e.g. "A" (see SpeakerMapping)
+    start_ms = Column(Integer, nullable=False)
+    end_ms = Column(Integer, nullable=False)
+    text = Column(Text, nullable=False)
+
+    transcript = relationship("Transcript", back_populates="utterances")
+
+    def to_dict(self) -> dict:
+        """Same keys as an AssemblyAI utterance"""
+        return {"idx": self.idx, "speaker": self.speaker, "start": self.start_ms, "end": self.end_ms, "text": self.text}
+
+
+def utterances_from_response(response) -> list:
+    """Utterance rows for an AssemblyAI-style response (dict or JSON text)"""
+    if isinstance(response, str):
+        response = json.loads(response)
+    return [
+        Utterance(
+            idx=idx,
+            speaker=utt.get("speaker"),
+            start_ms=int(utt.get("start") or 0),
+            end_ms=int(utt.get("end") or 0),
+            text=utt.get("text") or ""
+        )
+        for idx, utt in enumerate((response or {}).get("utterances") or [])
+    ]
+
+
+PREVIEW_LENGTH = 150
+
+
+def fill_list_metadata(transcript: Transcript, speakers=None):
+    """
+    Compute the list columns from the transcript's text and utterances.
+    `speakers` overrides the speaker labels (e.g. read from the utterances
+    table by a backfill); otherwise they come from loaded utterances.
+    """
+    text = transcript.text_content or ""
+    transcript.word_count = len(text.split())
+    transcript.preview = text[:PREVIEW_LENGTH] + "..." if len(text) > PREVIEW_LENGTH else text
+    if speakers is None:
+        # Only utterances already in memory: a lazy load is not allowed during a flush
+        utterances = transcript.__dict__.get("utterances")
+        speakers = [utt.speaker for utt in utterances] if utterances else None
+    transcript.speaker_count = len({speaker for speaker in speakers if speaker}) if speakers else None
+
+
+@event.listens_for(Transcript, "before_insert")
+def _fill_list_metadata_on_insert(mapper, connection, transcript):
+    if transcript.word_count is None:
+        fill_list_metadata(transcript)
 
 
 class ChatMessage(Base):
@@ -120,6 +253,77 @@ class PasswordResetToken(Base):
     user = relationship("User")
 
 
+class TranscriptionJob(Base):
+    """Background transcription job, tracked through each pipeline stage"""
+    __tablename__ = "transcription_jobs"
+
+    id = Column(Integer, primary_key=True, index=True)
+    job_id = Column(String, unique=True, index=True, nullable=False)  # public id returned to the client
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
+    filename = Column(String, nullable=False)
+    quality = Column(String, default="high")
+    status = Column(String, default="queued")  # queued/converting/uploading/transcribing/saving/completed/error
+    batch_id = Column(String, nullable=True, index=True)  # set for jobs submitted through /transcribe/batch
+    input_path = Column(String, nullable=True)  # staged upload, removed once the job finishes
+    content_hash = Column(String, nullable=True, index=True)  # SHA-256 of the uploaded audio
+    duration = Column(Float, nullable=True)  # audio length in seconds, probed at ingest (drives scheduling and ETAs)
+    audio_path = Column(String, nullable=True)  # converted audio, kept until the job finishes
+    upload_url = Column(String, nullable=True)  # AssemblyAI upload URL, so a resumed job is not uploaded twice
+    remote_job_id = Column(String, nullable=True)  # AssemblyAI transcript id
+    # Long recordings: JSON list of chunks ({"path", "start", "end", "id"}), each id saved once submitted
+    remote_chunks = Column(Text, nullable=True)
+    worker_id = Column(String, nullable=True)  # process holding the job lease
+    heartbeat_at = Column(DateTime, nullable=True)  # lease renewal; stale leases are taken over on restart
+    transcript_db_id = Column(Integer, ForeignKey("transcripts.id", ondelete="SET NULL"), nullable=True)
+    error = Column(Text, nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    # Relationships
+    user = relationship("User")
+    transcript = relationship("Transcript")
+
+
+class TranscriptionCache(Base):
+    """
+    AssemblyAI results indexed by audio content, so repeated uploads are not
+    re-transcribed. An entry points at the transcript the result was stored
+    in rather than keeping a copy, and is deleted with it.
+    """
+    __tablename__ = "transcription_cache"
+    __table_args__ = (UniqueConstraint("content_hash", "settings_key"),)
+
+    id = Column(Integer, primary_key=True, index=True)
+    content_hash = Column(String, nullable=False, index=True)  # SHA-256 of the uploaded audio
+    settings_key = Column(String, nullable=False)  # transcription settings that affect the result
+    remote_job_id = Column(String, nullable=True)  # AssemblyAI transcript id
+    transcript_db_id = Column(Integer, ForeignKey("transcripts.id", ondelete="CASCADE"), nullable=False, index=True)
+    hits = Column(Integer, default=0)
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+    transcript = relationship("Transcript")
+
+
+class ResumableUpload(Base):
+    """Upload sent in chunks, so a dropped connection resumes from the last stored byte"""
+    __tablename__ = "resumable_uploads"
+
+    id = Column(Integer, primary_key=True, index=True)
+    upload_id = Column(String, unique=True, index=True, nullable=False)
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
+    filename = Column(String, nullable=False)
+    quality = Column(String, default="high")
+    size = Column(Integer, nullable=False)  # declared total length in bytes
+    offset = Column(Integer, default=0)  # bytes received so far
+    path = Column(String, nullable=False)  # partial file on disk
+    job_id = Column(String, nullable=True)  # TranscriptionJob started once the upload is complete
+    created_at = Column(DateTime, default=datetime.utcnow)
+    expires_at = Column(DateTime, nullable=False)
+
+    # Relationships
+    user = relationship("User")
+
+
 class UserSettings(Base):
     """User settings for customizing the application"""
     __tablename__ = "user_settings"
@@ -150,6 +354,9 @@ class UserSettings(Base):
 def init_db():
     """Initialize database and create tables"""
     Base.metadata.create_all(bind=engine)
+    # Full-text index: FTS5 tables and triggers (SQLite) or GIN indexes (PostgreSQL)
+    from api.search import install_search_index
+    install_search_index(engine)
 
 
 def get_db():
@@ -159,3 +366,9 @@ def get_db():
         yield db
     finally:
         db.close()
+
+
+async def get_async_db():
+    """Dependency for getting an async database session"""
+    async with AsyncSessionLocal() as db:
+        yield db
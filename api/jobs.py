@@ -0,0 +1,772 @@
+"""
+Background transcription job queue
+
+POST /transcribe only stages the upload and records a TranscriptionJob row;
+the conversion, AssemblyAI round-trip and database insert run on a worker
+pool so HTTP workers are released immediately.
+
+Each stage is persisted on the job (converted audio path, upload URL,
+AssemblyAI id, or the id of each chunk of a long recording), and the process running a job holds a lease on it, renewed
+by a heartbeat. When a process dies, its jobs' leases lapse and another
+process - or the same one after a restart - resumes them from the last
+stage instead of uploading and paying again.
+
+Jobs are dispatched fairly across users (or shortest first, or by
+deadline) rather than first come, first served, weighed by the audio
+duration probed at ingest, and the number of jobs with AssemblyAI at once
+is capped for the whole process (see api/scheduler.py).
+"""
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import BinaryIO
+import threading
+import asyncio
+import shutil
+import socket
+import uuid
+import json
+import os
+
+from utils.convert import (
+    prepare_audio, split_audio, probe_media, plan_conversion, iter_mp3_chunks, estimate_mp3_duration,
+    ConversionExecutor, ConversionTicket
+)
+from sqlalchemy import func, or_
+from sqlalchemy.exc import IntegrityError
+
+from scripts.transcribe import upload_stream, settings_key, transcribe_chunked
+from scripts.backends import select_backend, transcribe_routed, AssemblyAIBackend
+from scripts.export import transcript_json
+from api.database import SessionLocal, Transcript, TranscriptionJob, TranscriptionCache, utterances_from_response
+from api.scheduler import FairExecutor, FairSemaphore
+
+INPUT_DIR = Path("inputs")
+OUTPUT_DIR = Path("outputs")
+
+QUALITY_PRESETS = {
+    "high": "128k",
+    "medium": "96k",
+    "low": "64k"
+}
+
+# Pool sizing - all configurable from the environment
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "8"))  # jobs in flight per process
+CONVERT_CONCURRENCY = int(os.getenv("CONVERT_CONCURRENCY", str(os.cpu_count() or 1)))  # simultaneous ffmpeg runs
+CONVERT_QUEUE_SIZE = int(os.getenv("CONVERT_QUEUE_SIZE", "32"))  # conversions allowed to wait for a slot
+UPLOAD_CONCURRENCY = int(os.getenv("UPLOAD_CONCURRENCY", "4"))  # simultaneous AssemblyAI uploads
+MAX_REMOTE_JOBS = int(os.getenv("MAX_REMOTE_JOBS", "16"))  # jobs (and chunks) with AssemblyAI at once per process
+GUEST_WEIGHT = float(os.getenv("GUEST_WEIGHT", "0.25"))  # share of all guests together, relative to one user
+SCHEDULER_MODE = os.getenv("SCHEDULER_MODE", "fair").lower()  # fair, sjf or deadline (see api/scheduler.py)
+DEADLINE_BASE_SECONDS = float(os.getenv("DEADLINE_BASE_SECONDS", "60"))  # deadline mode: due after base +
+DEADLINE_FACTOR = float(os.getenv("DEADLINE_FACTOR", "0.5"))  # factor * audio seconds
+
+# Recordings longer than this are split at silences and transcribed in parallel (0 disables)
+LONG_AUDIO_SECONDS = float(os.getenv("LONG_AUDIO_SECONDS", "1800"))
+LONG_AUDIO_CHUNKS = int(os.getenv("LONG_AUDIO_CHUNKS", "4"))
+CHUNK_OVERLAP_SECONDS = float(os.getenv("CHUNK_OVERLAP_SECONDS", "10"))
+
+# Stream ffmpeg output straight into the AssemblyAI upload instead of converting to a file first
+PIPELINED_UPLOAD = os.getenv("PIPELINED_UPLOAD", "false").lower() == "true"
+
+BATCH_MAX_FILES = int(os.getenv("BATCH_MAX_FILES", "50"))
+BATCH_REMOTE_WORKERS = int(os.getenv("BATCH_REMOTE_WORKERS", str(UPLOAD_CONCURRENCY)))  # files in AssemblyAI at once per batch
+
+# Job leases (crash recovery)
+WORKER_ID = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:6]}"
+JOB_LEASE_SECONDS = int(os.getenv("JOB_LEASE_SECONDS", "120"))  # silence after which a job is taken over
+JOB_HEARTBEAT_SECONDS = JOB_LEASE_SECONDS / 4
+FINISHED_STATUSES = ("completed", "error")
+
+job_executor = FairExecutor(workers=JOB_WORKERS, name="transcribe-job", policy=SCHEDULER_MODE,
+                            deadline_base=DEADLINE_BASE_SECONDS, deadline_factor=DEADLINE_FACTOR)
+remote_slots = FairSemaphore(MAX_REMOTE_JOBS, name="remote", policy=SCHEDULER_MODE,
+                             deadline_base=DEADLINE_BASE_SECONDS, deadline_factor=DEADLINE_FACTOR)
+_upload_slots = threading.BoundedSemaphore(UPLOAD_CONCURRENCY)
+
+# Every guest request shares one low-weight flow
+GUEST_FLOW = "guest"
+
+# Shared by the job workers and the endpoints that convert inline
+conversion_executor = ConversionExecutor(slots=CONVERT_CONCURRENCY, max_queue=CONVERT_QUEUE_SIZE)
+
+
+def build_transcript_text(job) -> str:
+    """Extract full text from a finished job, with speaker labels"""
+    # Always use utterances format for consistency with speaker mappings
+    if hasattr(job, 'utterances') and job.utterances:
+        return "\n".join([f"{utt.speaker}: {utt.text}" for utt in job.utterances])
+    # Fallback to plain text if no utterances
+    return job.text if hasattr(job, 'text') else ""
+
+
+def user_flow(user_id) -> str:
+    return f"user:{user_id}"
+
+
+def remote_slot_for(flow: str, item_id: str = None, weight: float = 1.0):
+    """Factory for the backends' `remote_slot(duration)` argument"""
+    return lambda duration=None: remote_slots.slot(flow, item_id=item_id, weight=weight, cost=duration)
+
+
+def probe_duration(input_path: Path, content_hash: str = None):
+    """Audio length in seconds, or None when ffprobe cannot tell (the job is then scheduled as average)"""
+    try:
+        return probe_media(input_path, content_hash).get("duration")
+    except (RuntimeError, OSError, ValueError):
+        return None
+
+
+def queue_info(job_id: str, batch_id: str = None) -> dict:
+    """
+    Where a job waits, if it does: for a worker (queued) or for an
+    AssemblyAI slot. Positions count the entries served first (0 = next).
+    eta_seconds adds the job's own expected run time to the wait.
+    """
+    dispatch_id = batch_id or job_id
+    for stage, scheduler, item_id in (("dispatch", job_executor, dispatch_id), ("remote", remote_slots, job_id)):
+        position = scheduler.position(item_id)
+        if position is not None:
+            return {
+                "queue_stage": stage,
+                "queue_position": position,
+                "estimated_wait_seconds": scheduler.estimated_wait(item_id),
+                "eta_seconds": scheduler.eta(item_id),
+            }
+    eta = remote_slots.eta(job_id)
+    if eta is None and batch_id is None:
+        eta = job_executor.eta(dispatch_id)
+    return {} if eta is None else {"eta_seconds": eta}
+
+
+def job_to_dict(job: TranscriptionJob) -> dict:
+    """Serialize a job for the status endpoint"""
+    data = {
+        "job_id": job.job_id,
+        "status": job.status,
+        "filename": job.filename,
+        "duration": job.duration,
+        "created_at": job.created_at.isoformat() if job.created_at else None,
+        "updated_at": job.updated_at.isoformat() if job.updated_at else None,
+    }
+    if job.status not in FINISHED_STATUSES:
+        data.update(queue_info(job.job_id, job.batch_id))
+    if job.status == "completed" and job.transcript:
+        transcript_id = job.transcript.transcript_id
+        data.update({
+            "id": transcript_id,
+            "text_file": f"/transcripts/{transcript_id}?format=txt",
+            "json_file": f"/transcripts/{transcript_id}?format=json",
+            "database_id": job.transcript.id
+        })
+    if job.status == "error":
+        data["error"] = job.error
+    return data
+
+
+def enqueue_job(job_id: str, user_id: int, body: BinaryIO = None, ticket: ConversionTicket = None,
+                duration: float = None):
+    """
+    Hand a persisted job over to the worker pool, in its owner's queue.
+    `body` is the request body of a streamed upload (STREAM_CONVERSION),
+    which the worker pipes through ffmpeg into the AssemblyAI upload and
+    then closes; without it the staged upload at job.input_path is
+    converted. Either way the conversion uses the queue place reserved by
+    the endpoint (`ticket`). `duration` (seconds of audio) orders and
+    weighs the job.
+    """
+    _lease_jobs(TranscriptionJob.job_id == job_id)
+    job_executor.submit(run_job, job_id, body, ticket, flow=user_flow(user_id), item_id=job_id, cost=duration)
+
+
+async def queue_staged_job(db, job: TranscriptionJob, ticket: ConversionTicket = None) -> bool:
+    """
+    Start a job whose upload is staged at job.input_path: answer it from the
+    dedup cache, or commit it and queue it. Returns True when the job was
+    queued and took over `ticket`. `db` is the endpoint's AsyncSession.
+    """
+    cached = await db.run_sync(find_cached_result, job.content_hash)
+    if cached:
+        input_path = Path(job.input_path) if job.input_path else None
+        if input_path and input_path.exists():
+            input_path.unlink()
+        await db.run_sync(complete_from_cache, job, cached)
+        return False
+    await db.commit()
+    # The lease is written through the sync engine: off the event loop
+    await asyncio.to_thread(enqueue_job, job.job_id, job.user_id, ticket=ticket, duration=job.duration)
+    return True
+
+
+def enqueue_batch(batch_id: str, user_id: int, durations: list, ticket: ConversionTicket = None):
+    """Hand a persisted batch over to the worker pool (see run_batch); `durations` are its files' lengths"""
+    _lease_jobs(TranscriptionJob.batch_id == batch_id)
+    # Weighed as all of its audio, so a batch does not jump ahead of its owner's other uploads
+    cost = sum(job_executor.default_cost if duration is None else duration for duration in durations)
+    job_executor.submit(run_batch, batch_id, ticket, flow=user_flow(user_id), item_id=batch_id, cost=cost)
+
+
+def _lease_jobs(criterion):
+    """Take the lease on freshly queued jobs for this process"""
+    db = SessionLocal()
+    try:
+        db.query(TranscriptionJob).filter(criterion).update(
+            {TranscriptionJob.worker_id: WORKER_ID, TranscriptionJob.heartbeat_at: datetime.utcnow()},
+            synchronize_session=False
+        )
+        db.commit()
+    finally:
+        db.close()
+
+
+def _stale_lease(now: datetime):
+    """Unfinished jobs whose owner stopped renewing its lease"""
+    last_seen = func.coalesce(TranscriptionJob.heartbeat_at, TranscriptionJob.updated_at)
+    return last_seen < now - timedelta(seconds=JOB_LEASE_SECONDS)
+
+
+def claim_job(db, job_id: str) -> bool:
+    """Atomically take a job that is ours, unowned, or whose lease lapsed"""
+    now = datetime.utcnow()
+    claimed = db.query(TranscriptionJob).filter(
+        TranscriptionJob.job_id == job_id,
+        TranscriptionJob.status.notin_(FINISHED_STATUSES),
+        or_(TranscriptionJob.worker_id.is_(None), TranscriptionJob.worker_id == WORKER_ID, _stale_lease(now))
+    ).update(
+        {TranscriptionJob.worker_id: WORKER_ID, TranscriptionJob.heartbeat_at: now},
+        synchronize_session=False
+    )
+    db.commit()
+    return claimed == 1
+
+
+def recover_jobs() -> int:
+    """Resume unfinished jobs whose process died; returns how many were adopted"""
+    db = SessionLocal()
+    adopted = 0
+    try:
+        orphans = db.query(TranscriptionJob.job_id, TranscriptionJob.user_id, TranscriptionJob.duration).filter(
+            TranscriptionJob.status.notin_(FINISHED_STATUSES),
+            or_(TranscriptionJob.worker_id.is_(None), TranscriptionJob.worker_id != WORKER_ID),
+            _stale_lease(datetime.utcnow())
+        ).all()
+        for job_id, user_id, duration in orphans:
+            if claim_job(db, job_id):
+                print(f"🔁 Adopting job {job_id} left unfinished by another process")
+                job_executor.submit(run_job, job_id, flow=user_flow(user_id), item_id=job_id, cost=duration)
+                adopted += 1
+    finally:
+        db.close()
+    return adopted
+
+
+def _heartbeat_loop(stop: threading.Event):
+    while True:
+        db = SessionLocal()
+        try:
+            db.query(TranscriptionJob).filter(
+                TranscriptionJob.worker_id == WORKER_ID,
+                TranscriptionJob.status.notin_(FINISHED_STATUSES)
+            ).update(
+                # Leave updated_at alone: it reports progress, not liveness
+                {TranscriptionJob.heartbeat_at: datetime.utcnow(), TranscriptionJob.updated_at: TranscriptionJob.updated_at},
+                synchronize_session=False
+            )
+            db.commit()
+        except Exception as e:
+            print(f"⚠️  Job heartbeat failed: {e}")
+            db.rollback()
+        finally:
+            db.close()
+
+        try:
+            recover_jobs()
+        except Exception as e:
+            print(f"⚠️  Job recovery failed: {e}")
+
+        if stop.wait(JOB_HEARTBEAT_SECONDS):
+            return
+
+
+_heartbeat_stop = threading.Event()
+
+
+def start_job_recovery():
+    """Start renewing this process's leases and adopting orphaned jobs (call once at startup)"""
+    _heartbeat_stop.clear()
+    threading.Thread(target=_heartbeat_loop, args=(_heartbeat_stop,), daemon=True, name="job-heartbeat").start()
+
+
+def stop_job_recovery():
+    _heartbeat_stop.set()
+
+
+def _base_name(job: TranscriptionJob) -> str:
+    """Public transcript id, e.g. "uid_filename" """
+    if job.input_path:
+        return Path(job.input_path).stem
+    return f"{job.job_id[:8]}_{Path(job.filename).stem}"
+
+
+def _set_status(db, job: TranscriptionJob, status: str, **fields):
+    job.status = status
+    for key, value in fields.items():
+        setattr(job, key, value)
+    db.commit()
+
+
+def _update_job(job_id: str, status: str, **fields):
+    """Update a job from a thread that does not own its session"""
+    db = SessionLocal()
+    try:
+        job = db.query(TranscriptionJob).filter(TranscriptionJob.job_id == job_id).first()
+        if job:
+            _set_status(db, job, status, **fields)
+    finally:
+        db.close()
+
+
+def find_cached_result(db, content_hash: str):
+    """Look up a previous AssemblyAI result for the same audio and settings"""
+    if not content_hash:
+        return None
+    # The join skips entries whose transcript went away outside the API (no FK enforcement on SQLite)
+    return db.query(TranscriptionCache).join(TranscriptionCache.transcript).filter(
+        TranscriptionCache.content_hash == content_hash,
+        TranscriptionCache.settings_key == settings_key()
+    ).first()
+
+
+def remember_result(db, content_hash: str, remote_job_id: str, transcript_db_id: int):
+    """Index a stored transcript by content hash; a concurrent insert of the same audio wins"""
+    if not content_hash or find_cached_result(db, content_hash):
+        return
+    try:
+        db.add(TranscriptionCache(
+            content_hash=content_hash,
+            settings_key=settings_key(),
+            remote_job_id=remote_job_id,
+            transcript_db_id=transcript_db_id
+        ))
+        db.commit()
+    except IntegrityError:
+        db.rollback()
+
+
+def complete_from_cache(db, job: TranscriptionJob, cached: TranscriptionCache) -> Transcript:
+    """Store a repeat upload straight from the cached result - no conversion, no billing"""
+    cached.hits = (cached.hits or 0) + 1
+    source = cached.transcript
+    new_transcript = Transcript(
+        transcript_id=_base_name(job),
+        user_id=job.user_id,
+        filename=job.filename,
+        text_content=source.text_content,
+        # Copied in stored (compressed) form
+        json_content=source.json_content_stored,
+        duration=job.duration or source.duration,
+        utterances=utterances_from_response(source.json_content)
+    )
+    db.add(new_transcript)
+    db.flush()
+    _set_status(db, job, "completed", transcript_db_id=new_transcript.id, remote_job_id=cached.remote_job_id)
+    print(f"♻️  Job {job.job_id} served from cache ({job.content_hash[:12]})")
+    return new_transcript
+
+
+def pipelined_upload_info(input_path: Path, content_hash: str, bitrate: str):
+    """
+    Probe info when the upload needs a real transcode that can overlap with
+    the AssemblyAI upload; None when prepare_audio should handle it (pass
+    through, remux, long recordings split into chunks, unreadable probe).
+    """
+    try:
+        info = probe_media(input_path, content_hash)
+        if plan_conversion(info, bitrate) != "transcode":
+            return None
+    except (RuntimeError, OSError, ValueError):
+        return None
+    if is_long_audio(info.get("duration")):
+        return None
+    return info
+
+
+def is_long_audio(duration) -> bool:
+    """Whether a recording is split at silences and transcribed in chunks"""
+    return bool(LONG_AUDIO_SECONDS and LONG_AUDIO_CHUNKS > 1 and (duration or 0) >= LONG_AUDIO_SECONDS)
+
+
+def convert_and_upload(source, bitrate: str, api_key: str) -> str:
+    """
+    Encode to MP3 while the output is being uploaded; returns the AssemblyAI
+    upload URL. `source` is a path or an open request body (piped to ffmpeg).
+    """
+    return upload_stream(iter_mp3_chunks(source, bitrate), api_key)
+
+
+def stage_body(job: TranscriptionJob, body: BinaryIO) -> Path:
+    """Write a streamed upload to inputs/ when it has to be converted from a file after all"""
+    input_path = INPUT_DIR / f"{job.job_id[:8]}_{job.filename}"
+    body.seek(0)
+    with open(input_path, "wb") as buffer:
+        shutil.copyfileobj(body, buffer)
+    return input_path
+
+
+def resumable_chunks(job: TranscriptionJob):
+    """
+    The chunk plan of a long recording split before a restart, when every
+    chunk was either submitted (id saved) or still has its file on disk;
+    None otherwise (the recording is then split and every chunk sent again).
+    """
+    if not job.remote_chunks:
+        return None
+    plan = json.loads(job.remote_chunks)
+    if all(chunk["id"] or Path(chunk["path"]).exists() for chunk in plan):
+        return plan
+    print(f"⚠️  Job {job.job_id}: chunks of the previous attempt are lost, the recording is sent again")
+    return None
+
+
+def _save_chunk_plan(job_id: str, plan: list):
+    """Record chunk ids as they are submitted, from the chunk threads (own session)"""
+    db = SessionLocal()
+    try:
+        db.query(TranscriptionJob).filter(TranscriptionJob.job_id == job_id).update(
+            {TranscriptionJob.remote_chunks: json.dumps(plan)}, synchronize_session=False
+        )
+        db.commit()
+    finally:
+        db.close()
+
+
+def transcribe_prepared(audio, duration: float, api_key: str, chunk_stem: Path, report, remote_slot=None,
+                        job_id: str = None, chunk_plan: list = None):
+    """
+    Transcribe prepared audio (a path, an in-memory MP3, or the URL of an
+    already uploaded file) with the backend chosen for its duration.
+    Only paths are split: run_job stages long streamed uploads as files first.
+    Recordings longer than LONG_AUDIO_SECONDS are split and sent to
+    AssemblyAI in parallel. `report(status, **fields)` records progress and
+    `remote_slot` (see remote_slot_for) gates the AssemblyAI stage.
+    With `job_id`, the chunks and their AssemblyAI ids are saved on the job
+    as they are submitted; `chunk_plan` (see resumable_chunks) resumes them
+    after a restart instead of splitting, uploading and paying again.
+    """
+    long_audio = isinstance(audio, Path) and is_long_audio(duration)
+    if chunk_plan or long_audio:
+        if not api_key:
+            raise RuntimeError("AAI_API_KEY missing in .env")
+        if chunk_plan:
+            chunks = [(Path(chunk["path"]), chunk["start"], float("inf") if chunk["end"] is None else chunk["end"])
+                      for chunk in chunk_plan]
+        else:
+            chunks = conversion_executor.run(
+                split_audio, audio, chunk_stem, duration, LONG_AUDIO_CHUNKS, overlap=CHUNK_OVERLAP_SECONDS
+            )
+            chunk_plan = [{"path": str(path), "start": start, "end": None if end == float("inf") else end, "id": None}
+                          for path, start, end in chunks]
+            if job_id:
+                _save_chunk_plan(job_id, chunk_plan)
+        plan_lock = threading.Lock()
+
+        def on_submit(index, remote_id):
+            with plan_lock:
+                chunk_plan[index]["id"] = remote_id
+                if job_id:
+                    _save_chunk_plan(job_id, chunk_plan)
+
+        try:
+            report("uploading")
+            remote = transcribe_chunked(chunks, api_key, upload_slots=_upload_slots, remote_slot=remote_slot,
+                                        remote_ids=[chunk["id"] for chunk in chunk_plan], on_submit=on_submit)
+        finally:
+            for path, _, _ in chunks:
+                if path.exists():
+                    path.unlink()
+        report("transcribing", remote_job_id=remote.id)
+        return remote
+
+    return transcribe_routed(audio, duration, api_key, report, upload_slots=_upload_slots, remote_slot=remote_slot)
+
+
+def _result_duration(remote):
+    """Audio length reported by the transcription backend, in seconds"""
+    return (getattr(remote, "json_response", None) or {}).get("audio_duration")
+
+
+def run_job(job_id: str, body: BinaryIO = None, ticket: ConversionTicket = None):
+    """Run a job through conversion, transcription and storage (`body`: see enqueue_job)"""
+    db = SessionLocal()
+    job = None
+    audio = input_path = mp3_path = None
+    try:
+        job = db.query(TranscriptionJob).filter(TranscriptionJob.job_id == job_id).first()
+        if not job:
+            print(f"⚠️  Job {job_id} not found, skipping")
+            return
+        if not claim_job(db, job_id):
+            print(f"⚠️  Job {job_id} is finished or owned by another process, skipping")
+            job = None
+            return
+        db.refresh(job)
+
+        api_key = os.getenv("AAI_API_KEY")
+        input_path = Path(job.input_path) if job.input_path else None
+        mp3_path = Path(job.audio_path) if job.audio_path else None
+
+        # An identical upload may have finished while this one was queued
+        cached = find_cached_result(db, job.content_hash)
+        if cached:
+            complete_from_cache(db, job, cached)
+            return
+
+        base_name = _base_name(job)
+
+        def report(status, **fields):
+            _set_status(db, job, status, **fields)
+
+        bitrate = QUALITY_PRESETS.get(job.quality, "128k")
+        remote_slot = remote_slot_for(user_flow(job.user_id), job_id)
+        duration = job.duration
+        remote = None
+        chunk_plan = resumable_chunks(job)
+        if chunk_plan:
+            # Split before a restart: submitted chunks are followed, only the others are uploaded
+            print(f"🔁 Resuming the {len(chunk_plan)} chunks of job {job_id}")
+        elif job.remote_job_id and not job.remote_job_id.startswith("local_") and "," not in job.remote_job_id:
+            # Submitted before a restart: follow the existing AssemblyAI job
+            remote = AssemblyAIBackend(api_key, remote_slot=remote_slot).resume(job.remote_job_id, duration)
+        elif job.upload_url:
+            # Uploaded before a restart: submit the stored URL
+            audio = job.upload_url
+        elif mp3_path and mp3_path.exists():
+            # Converted before a restart
+            duration = duration or estimate_mp3_duration(mp3_path.stat().st_size, bitrate)
+        elif body is None and not (input_path and input_path.exists()):
+            # Streamed uploads only ever lived in the process that received them
+            raise RuntimeError("The upload was lost in a server restart, please upload the file again")
+        else:
+            mp3_path = None
+
+        if remote is None and audio is None and mp3_path is None and not chunk_plan and body is not None:
+            # Streamed upload: one file for AssemblyAI is converted straight into its upload
+            if duration is not None and not is_long_audio(duration) \
+                    and select_backend(duration, api_key).name == "assemblyai":
+                _set_status(db, job, "uploading")
+                try:
+                    with _upload_slots:
+                        audio = conversion_executor.run(convert_and_upload, body, bitrate, api_key, ticket=ticket)
+                    _set_status(db, job, "uploading", upload_url=audio)
+                except RuntimeError as e:
+                    # Inputs that need seeking (e.g. m4a with a trailing moov atom) cannot be piped
+                    print(f"⚠️  Streaming conversion failed, staging upload instead: {e}")
+                ticket = None
+            if audio is None:
+                # Long recordings are split at silences, the local engine and unpipeable inputs read files
+                input_path = stage_body(job, body)
+                _set_status(db, job, job.status, input_path=str(input_path))
+
+        if remote is None and audio is None and mp3_path is None and not chunk_plan and PIPELINED_UPLOAD:
+            media_info = pipelined_upload_info(input_path, job.content_hash, bitrate)
+            # Only AssemblyAI can take the audio as an upload URL
+            if media_info is not None and select_backend(media_info.get("duration"), api_key).name == "assemblyai":
+                # Conversion and upload overlap: audio becomes the uploaded file's URL
+                _set_status(db, job, "uploading")
+                with _upload_slots:
+                    audio = conversion_executor.run(convert_and_upload, input_path, bitrate, api_key, ticket=ticket)
+                ticket = None
+                duration = media_info.get("duration") or duration
+                _set_status(db, job, "uploading", upload_url=audio, duration=duration)
+
+        if remote is None and audio is None and mp3_path is None and not chunk_plan:
+            _set_status(db, job, "converting")
+            # Already speech-ready uploads are passed through or remuxed, not re-encoded
+            mp3_path, media_info = conversion_executor.run(
+                prepare_audio, input_path, OUTPUT_DIR / base_name, bitrate=bitrate, ticket=ticket
+            )
+            ticket = None
+            duration = media_info.get("duration") or estimate_mp3_duration(mp3_path.stat().st_size, bitrate)
+            _set_status(db, job, "converting", audio_path=str(mp3_path), duration=duration)
+
+        if remote is None:
+            remote = transcribe_prepared(mp3_path if audio is None else audio, duration, api_key,
+                                         OUTPUT_DIR / base_name, report, remote_slot=remote_slot,
+                                         job_id=job_id, chunk_plan=chunk_plan)
+
+        new_transcript = Transcript(
+            transcript_id=base_name,
+            user_id=job.user_id,
+            filename=job.filename,
+            text_content=build_transcript_text(remote),
+            json_content=transcript_json(remote),
+            duration=_result_duration(remote) or duration,
+            utterances=utterances_from_response(getattr(remote, "json_response", None))
+        )
+        db.add(new_transcript)
+        db.flush()
+        _set_status(db, job, "completed", transcript_db_id=new_transcript.id)
+        print(f"✅ Job {job_id} stored as transcript {new_transcript.id}")
+
+        # Local results lack speaker labels: never serve them in place of an AssemblyAI result
+        if remote.backend == "assemblyai":
+            remember_result(db, job.content_hash, remote.id, new_transcript.id)
+    except Exception as e:
+        print(f"❌ Job {job_id} failed: {e}")
+        db.rollback()
+        if job is not None:
+            _set_status(db, job, "error", error=str(e))
+    finally:
+        if ticket is not None:
+            # The job ended before reaching conversion
+            conversion_executor.cancel(ticket)
+        # Cleanup: delete audio files (transcript is saved in database)
+        try:
+            for path in (input_path, mp3_path):
+                if path and path.exists():
+                    path.unlink()
+        except Exception as cleanup_error:
+            print(f"Warning: Failed to cleanup files: {cleanup_error}")
+        if body is not None:
+            body.close()
+        db.close()
+
+
+def batch_to_dict(batch_id: str, jobs: list) -> dict:
+    """Serialize a batch and the progress of each of its files"""
+    counts = {}
+    for job in jobs:
+        counts[job.status] = counts.get(job.status, 0) + 1
+    finished = counts.get("completed", 0) + counts.get("error", 0)
+    return {
+        "batch_id": batch_id,
+        "status": "completed" if finished == len(jobs) else "processing",
+        "total": len(jobs),
+        "counts": counts,
+        "jobs": [job_to_dict(job) for job in jobs],
+    }
+
+
+def run_batch(batch_id: str, ticket: ConversionTicket = None):
+    """
+    Run every job of a batch as a two-stage pipeline.
+
+    Files are converted one after another on the conversion executor and
+    each converted file immediately moves on to upload + transcription on a
+    small per-batch pool, so file N+1 converts while file N is with
+    AssemblyAI. Transcripts are then stored in a single transaction.
+    """
+    db = SessionLocal()
+    api_key = os.getenv("AAI_API_KEY")
+    prepared = []  # paths to clean up
+    results = {}  # job_id -> (text_content, json_content, remote_job_id, cacheable, duration, utterances)
+    try:
+        jobs = db.query(TranscriptionJob).filter(
+            TranscriptionJob.batch_id == batch_id
+        ).order_by(TranscriptionJob.id).all()
+        flow = user_flow(jobs[0].user_id) if jobs else None
+
+        def transcribe(job_id: str, audio_path: Path, duration: float, stem: Path):
+            try:
+                remote = transcribe_prepared(audio_path, duration, api_key, stem,
+                                             lambda status, **fields: _update_job(job_id, status, **fields),
+                                             remote_slot=remote_slot_for(flow, job_id), job_id=job_id)
+                _update_job(job_id, "saving")
+                json_content = transcript_json(remote)
+                return (build_transcript_text(remote), json_content, remote.id, remote.backend == "assemblyai",
+                        _result_duration(remote) or duration,
+                        utterances_from_response(getattr(remote, "json_response", None)))
+            except Exception as e:
+                print(f"❌ Job {job_id} failed: {e}")
+                _update_job(job_id, "error", error=str(e))
+                return None
+
+        with ThreadPoolExecutor(max_workers=max(1, BATCH_REMOTE_WORKERS),
+                                thread_name_prefix=f"batch-{batch_id[:8]}") as remote_pool:
+            pending = {}
+            for job in jobs:
+                cached = find_cached_result(db, job.content_hash)
+                if cached:
+                    cached.hits = (cached.hits or 0) + 1
+                    source = cached.transcript
+                    results[job.job_id] = (source.text_content, source.json_content_stored, cached.remote_job_id, False,
+                                           job.duration or source.duration,
+                                           utterances_from_response(source.json_content))
+                    continue
+                try:
+                    bitrate = QUALITY_PRESETS.get(job.quality, "128k")
+                    input_path = Path(job.input_path)
+                    _set_status(db, job, "converting")
+                    audio_path, media_info = conversion_executor.run(
+                        prepare_audio, input_path, OUTPUT_DIR / _base_name(job), bitrate=bitrate,
+                        content_hash=job.content_hash, ticket=ticket
+                    )
+                    ticket = None
+                    prepared.append(audio_path)
+                    duration = media_info.get("duration") or estimate_mp3_duration(audio_path.stat().st_size, bitrate)
+                    _set_status(db, job, "converting", audio_path=str(audio_path), duration=duration)
+                except Exception as e:
+                    print(f"❌ Job {job.job_id} failed: {e}")
+                    db.rollback()
+                    _set_status(db, job, "error", error=str(e))
+                    continue
+                pending[job.job_id] = remote_pool.submit(
+                    transcribe, job.job_id, audio_path, duration, OUTPUT_DIR / _base_name(job)
+                )
+
+            for job_id, future in pending.items():
+                result = future.result()
+                if result:
+                    results[job_id] = result
+
+        # Statuses were written by other sessions while the pipeline ran
+        db.expire_all()
+        transcripts = {}
+        for job in jobs:
+            if job.job_id not in results:
+                continue
+            text_content, json_content = results[job.job_id][:2]
+            transcripts[job.job_id] = Transcript(
+                transcript_id=_base_name(job),
+                user_id=job.user_id,
+                filename=job.filename,
+                text_content=text_content,
+                json_content=json_content,
+                duration=results[job.job_id][4],
+                utterances=results[job.job_id][5]
+            )
+            db.add(transcripts[job.job_id])
+        db.flush()
+        for job in jobs:
+            if job.job_id in transcripts:
+                job.status = "completed"
+                job.transcript_db_id = transcripts[job.job_id].id
+                job.remote_job_id = results[job.job_id][2]
+        db.commit()
+        print(f"✅ Batch {batch_id}: {len(transcripts)}/{len(jobs)} transcripts stored")
+
+        for job in jobs:
+            if job.job_id in transcripts and results[job.job_id][3]:
+                remember_result(db, job.content_hash, results[job.job_id][2], transcripts[job.job_id].id)
+    except Exception as e:
+        print(f"❌ Batch {batch_id} failed: {e}")
+        db.rollback()
+        for job in db.query(TranscriptionJob).filter(
+            TranscriptionJob.batch_id == batch_id,
+            TranscriptionJob.status != "error"
+        ).all():
+            job.status = "error"
+            job.error = str(e)
+        db.commit()
+    finally:
+        if ticket is not None:
+            conversion_executor.cancel(ticket)
+        try:
+            for job in db.query(TranscriptionJob).filter(TranscriptionJob.batch_id == batch_id).all():
+                prepared.append(Path(job.input_path) if job.input_path else None)
+            for path in prepared:
+                if path and path.exists():
+                    path.unlink()
+        except Exception as cleanup_error:
+            print(f"Warning: Failed to cleanup files: {cleanup_error}")
+        db.close()
@@ -0,0 +1,78 @@
+"""
+Request body size limits enforced while the body streams in
+
+Starlette spools a multipart upload entirely before the endpoint runs, so a
+size check in the endpoint comes too late: the body has already been read.
+The middleware below counts bytes as they arrive and rejects the request as
+soon as it crosses the limit for its route, or straight away when the
+declared Content-Length is already too big.
+"""
+import re
+
+from fastapi import HTTPException
+from fastapi.responses import JSONResponse
+
+# Room for multipart boundaries and form fields around the file itself
+MULTIPART_OVERHEAD = 64 * 1024
+
+
+class UploadTooLarge(HTTPException):
+    """Raised mid-body; an HTTPException so FastAPI's body parsing re-raises it as is"""
+
+    def __init__(self, payload: dict):
+        super().__init__(status_code=413, detail=payload["error"])
+        self.payload = payload
+
+
+def too_large_payload(limit: int) -> dict:
+    return {"error": f"Request body too large. Maximum size is {limit / (1024 * 1024):g}MB."}
+
+
+class UploadSizeLimitMiddleware:
+    """
+    ASGI middleware capping request bodies per route.
+
+    `rules` is a list of (method, path regex, limit in bytes, error payload);
+    the first match wins and `default_limit` covers every other request.
+    A payload of None uses the generic message.
+    """
+
+    def __init__(self, app, rules, default_limit: int):
+        self.app = app
+        self.rules = [(method, re.compile(pattern), limit, payload) for method, pattern, limit, payload in rules]
+        self.default_limit = default_limit
+
+    def limit_for(self, method: str, path: str):
+        for rule_method, pattern, limit, payload in self.rules:
+            if rule_method == method and pattern.fullmatch(path):
+                return limit, payload or too_large_payload(limit)
+        return self.default_limit, too_large_payload(self.default_limit)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        limit, payload = self.limit_for(scope["method"], scope["path"])
+
+        # Honest clients announce the size: refuse before reading anything
+        for name, value in scope.get("headers", []):
+            if name == b"content-length":
+                if value.isdigit() and int(value) > limit:
+                    response = JSONResponse(status_code=413, content=payload, headers={"Connection": "close"})
+                    await response(scope, receive, send)
+                    return
+                break
+
+        received = 0
+
+        async def limited_receive():
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > limit:
+                    raise UploadTooLarge(payload)
+            return message
+
+        await self.app(scope, limited_receive, send)
@@ -0,0 +1,268 @@
+"""
+Scheduling for transcription work
+
+Work is queued per flow (one user, or all guests together). The cost of an
+entry is the length of its audio in seconds, and the queue serves entries in
+one of three orders (SCHEDULER_MODE):
+
+- fair (default): weighted fair queuing. Each entry gets the virtual tag
+      tag = max(virtual clock, flow's previous tag) + cost / weight
+  and the smallest tag goes first, so users share the service in audio
+  time: a user with 40 uploads is interleaved with everyone else, and a
+  short memo only waits behind as much audio as the other users queued.
+- sjf: shortest job first, across all users. Best mean wait, but a steady
+  stream of short memos can hold a long recording back indefinitely.
+- deadline: earliest deadline first, a job being due
+      deadline_base + deadline_factor * cost
+  seconds after it was queued. Short jobs are due sooner, and a long job
+  eventually becomes the most urgent one, so nothing starves.
+
+- FairExecutor runs queued callables on a fixed number of threads (job dispatch)
+- FairSemaphore grants a fixed number of slots to blocking callers in the
+  same order (concurrent AssemblyAI jobs)
+
+Both learn the service time per second of audio and use it to estimate
+waits and ETAs for the status API.
+"""
+import heapq
+import itertools
+import threading
+import time
+from concurrent.futures import Future
+from contextlib import contextmanager
+from typing import Optional
+
+POLICIES = ("fair", "sjf", "deadline")
+
+# Flows whose history is behind the virtual clock are forgotten past this many
+_MAX_FLOWS = 4096
+
+
+class FairQueue:
+    """Pending entries ordered by scheduling tag. Not thread-safe: owners lock around it."""
+
+    def __init__(self, policy: str = "fair", deadline_base: float = 60.0, deadline_factor: float = 0.5):
+        if policy not in POLICIES:
+            raise ValueError(f"Unknown scheduling policy {policy!r}, expected one of {', '.join(POLICIES)}")
+        self.policy = policy
+        self.deadline_base = deadline_base
+        self.deadline_factor = deadline_factor
+        self._heap = []
+        self._by_item = {}  # item id -> entry (for positions)
+        self._last_tag = {}  # flow -> tag of its latest entry (fair policy)
+        self._clock = 0.0
+        self._seq = itertools.count()
+
+    def __len__(self):
+        return len(self._heap)
+
+    def _tag(self, flow: str, weight: float, cost: float):
+        """(tag, start) for a new entry"""
+        weight = max(weight, 1e-6)
+        if self.policy == "sjf":
+            return cost / weight, 0.0
+        if self.policy == "deadline":
+            return time.monotonic() + (self.deadline_base + self.deadline_factor * cost) / weight, 0.0
+
+        start = max(self._clock, self._last_tag.get(flow, 0.0))
+        tag = start + cost / weight
+        self._last_tag[flow] = tag
+        if len(self._last_tag) > _MAX_FLOWS:
+            self._last_tag = {f: t for f, t in self._last_tag.items() if t > self._clock}
+        return tag, start
+
+    def push(self, flow: str, cost: float, payload=None, item_id: str = None, weight: float = 1.0) -> list:
+        tag, start = self._tag(flow, weight, cost)
+        entry = [tag, next(self._seq), start, item_id, cost, payload]
+        heapq.heappush(self._heap, entry)
+        if item_id is not None:
+            self._by_item[item_id] = entry
+        return entry
+
+    def peek(self) -> Optional[list]:
+        return self._heap[0] if self._heap else None
+
+    def pop(self) -> list:
+        entry = heapq.heappop(self._heap)
+        # Start-time fair queuing: the clock follows the entry being served
+        self._clock = max(self._clock, entry[2])
+        if entry[3] is not None and self._by_item.get(entry[3]) is entry:
+            del self._by_item[entry[3]]
+        return entry
+
+    def ahead(self, item_id: str) -> Optional[list]:
+        """Costs of the entries served before `item_id`, in order (None if it is not queued)"""
+        entry = self._by_item.get(item_id)
+        if entry is None:
+            return None
+        return [other[4] for other in sorted(self._heap) if other[:2] < entry[:2]]
+
+    def cost(self, item_id: str) -> Optional[float]:
+        entry = self._by_item.get(item_id)
+        return entry[4] if entry else None
+
+
+class _Stats:
+    """Slot accounting and service-time learning shared by the executor and the semaphore"""
+
+    EWMA_ALPHA = 0.2
+
+    def __init__(self, slots: int, seconds_per_cost: float):
+        self.slots = slots
+        self.running = {}  # token -> (item id, start time, expected seconds)
+        self.completed = 0
+        self.seconds_per_cost = seconds_per_cost
+
+    def start(self, item_id: str, cost: float) -> object:
+        token = object()
+        self.running[token] = (item_id, time.monotonic(), self.expected(cost))
+        return token
+
+    def finish(self, token, cost: float):
+        _, started, _ = self.running.pop(token)
+        self.completed += 1
+        if cost > 0:
+            rate = (time.monotonic() - started) / cost
+            self.seconds_per_cost += self.EWMA_ALPHA * (rate - self.seconds_per_cost)
+
+    def expected(self, cost: float) -> float:
+        return cost * self.seconds_per_cost
+
+    def remaining(self, item_id: str) -> Optional[float]:
+        now = time.monotonic()
+        for running_id, started, expected in self.running.values():
+            if running_id == item_id:
+                return max(0.0, expected - (now - started))
+        return None
+
+    def estimated_wait(self, ahead: list) -> float:
+        """Seconds until a slot is free for an entry queued behind `ahead` (their costs)"""
+        now = time.monotonic()
+        free_at = [max(0.0, expected - (now - started)) for _, started, expected in self.running.values()]
+        free_at += [0.0] * max(0, self.slots - len(free_at))
+        heapq.heapify(free_at)
+        for cost in ahead:
+            heapq.heapreplace(free_at, free_at[0] + self.expected(cost))
+        return round(free_at[0], 1)
+
+    def snapshot(self) -> dict:
+        return {
+            "slots": self.slots,
+            "running": len(self.running),
+            "completed": self.completed,
+            "seconds_per_audio_second": round(self.seconds_per_cost, 4),
+        }
+
+
+class _Scheduled:
+    """Queue + stats under one lock, and the estimates derived from them"""
+
+    def __init__(self, slots: int, policy: str, default_cost: float, seconds_per_cost: float,
+                 deadline_base: float, deadline_factor: float):
+        self.default_cost = default_cost
+        self._queue = FairQueue(policy, deadline_base, deadline_factor)
+        self._cond = threading.Condition()
+        self._stats = _Stats(slots, seconds_per_cost)
+
+    def _cost(self, cost: Optional[float]) -> float:
+        """Unknown durations count as `default_cost` seconds"""
+        return self.default_cost if cost is None else cost
+
+    def position(self, item_id: str) -> Optional[int]:
+        """Entries served before `item_id` (0 = next; None if it is not queued)"""
+        with self._cond:
+            ahead = self._queue.ahead(item_id)
+            return None if ahead is None else len(ahead)
+
+    def estimated_wait(self, item_id: str) -> Optional[float]:
+        """Seconds before `item_id` starts (None if it is not queued)"""
+        with self._cond:
+            ahead = self._queue.ahead(item_id)
+            return None if ahead is None else self._stats.estimated_wait(ahead)
+
+    def eta(self, item_id: str) -> Optional[float]:
+        """Seconds before `item_id` is done here, queued or running (None if unknown to us)"""
+        with self._cond:
+            ahead = self._queue.ahead(item_id)
+            if ahead is not None:
+                cost = self._queue.cost(item_id)
+                return round(self._stats.estimated_wait(ahead) + self._stats.expected(cost), 1)
+            remaining = self._stats.remaining(item_id)
+            return None if remaining is None else round(remaining, 1)
+
+    def stats(self) -> dict:
+        with self._cond:
+            return {"policy": self._queue.policy, "queued": len(self._queue), **self._stats.snapshot()}
+
+
+class FairExecutor(_Scheduled):
+    """Runs submitted callables on `workers` threads, taking the next one in scheduling order"""
+
+    def __init__(self, workers: int, name: str = "fair", policy: str = "fair", default_cost: float = 300.0,
+                 seconds_per_cost: float = 0.4, deadline_base: float = 60.0, deadline_factor: float = 0.5):
+        super().__init__(workers, policy, default_cost, seconds_per_cost, deadline_base, deadline_factor)
+        for index in range(workers):
+            threading.Thread(target=self._worker, daemon=True, name=f"{name}-{index}").start()
+
+    def submit(self, fn, *args, flow: str, item_id: str = None, weight: float = 1.0, cost: float = None,
+               **kwargs) -> Future:
+        """`cost` is the audio length in seconds (None = unknown)"""
+        future = Future()
+        with self._cond:
+            self._queue.push(flow, self._cost(cost), (future, fn, args, kwargs), item_id=item_id, weight=weight)
+            self._cond.notify()
+        return future
+
+    def _worker(self):
+        while True:
+            with self._cond:
+                while not len(self._queue):
+                    self._cond.wait()
+                entry = self._queue.pop()
+                cost = entry[4]
+                token = self._stats.start(entry[3], cost)
+
+            future, fn, args, kwargs = entry[5]
+            if future.set_running_or_notify_cancel():
+                try:
+                    future.set_result(fn(*args, **kwargs))
+                except BaseException as e:
+                    future.set_exception(e)
+            with self._cond:
+                self._stats.finish(token, cost)
+
+
+class FairSemaphore(_Scheduled):
+    """At most `slots` holders at once; waiters are admitted in scheduling order"""
+
+    def __init__(self, slots: int, name: str = "fair", policy: str = "fair", default_cost: float = 300.0,
+                 seconds_per_cost: float = 0.3, deadline_base: float = 60.0, deadline_factor: float = 0.5):
+        super().__init__(slots, policy, default_cost, seconds_per_cost, deadline_base, deadline_factor)
+        self.name = name
+
+    def acquire(self, flow: str, item_id: str = None, weight: float = 1.0, cost: float = None):
+        """Block until a slot is granted; returns the token for release()"""
+        cost = self._cost(cost)
+        with self._cond:
+            entry = self._queue.push(flow, cost, item_id=item_id, weight=weight)
+            while len(self._stats.running) >= self._stats.slots or self._queue.peek() is not entry:
+                self._cond.wait()
+            self._queue.pop()
+            token = self._stats.start(item_id, cost)
+            # The next waiter may be admissible too
+            self._cond.notify_all()
+        return token, cost
+
+    def release(self, grant):
+        token, cost = grant
+        with self._cond:
+            self._stats.finish(token, cost)
+            self._cond.notify_all()
+
+    @contextmanager
+    def slot(self, flow: str, item_id: str = None, weight: float = 1.0, cost: float = None):
+        grant = self.acquire(flow, item_id=item_id, weight=weight, cost=cost)
+        try:
+            yield
+        finally:
+            self.release(grant)
@@ -0,0 +1,233 @@
+"""
+Full-text search across a user's transcripts
+
+- SQLite (dev): FTS5 external-content tables over transcripts (filename +
+  text) and utterances. Triggers keep them in step with every insert,
+  rename and delete, whichever code path makes it.
+- PostgreSQL: a stored generated tsvector column (search_vector) on both
+  tables, GIN-indexed. The database keeps it up to date by itself, and
+  ranking reads it instead of re-tokenizing every matching text.
+
+Transcripts are ranked on the whole text, then the matching utterances of
+the returned page give timestamps to jump to. Other databases, or SQLite
+builds without FTS5, fall back to LIKE scans.
+"""
+import os
+import re
+
+from sqlalchemy import bindparam, text
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import load_only
+
+from api.database import Transcript, Utterance
+
+# Text search configuration (PostgreSQL): "simple" does no stemming, which suits mixed-language audio
+SEARCH_TS_CONFIG = os.getenv("SEARCH_TS_CONFIG", "simple")
+MATCHES_PER_TRANSCRIPT = 5
+HIGHLIGHT_START = "<mark>"
+HIGHLIGHT_STOP = "</mark>"
+
+SQLITE_SETUP = [
+    """CREATE VIRTUAL TABLE transcripts_fts USING fts5(
+        filename, text_content, content='transcripts', content_rowid='id', tokenize='unicode61 remove_diacritics 2'
+    )""",
+    """CREATE TRIGGER transcripts_fts_insert AFTER INSERT ON transcripts BEGIN
+        INSERT INTO transcripts_fts(rowid, filename, text_content) VALUES (new.id, new.filename, new.text_content);
+    END""",
+    """CREATE TRIGGER transcripts_fts_delete AFTER DELETE ON transcripts BEGIN
+        INSERT INTO transcripts_fts(transcripts_fts, rowid, filename, text_content)
+        VALUES ('delete', old.id, old.filename, old.text_content);
+    END""",
+    """CREATE TRIGGER transcripts_fts_update AFTER UPDATE OF filename, text_content ON transcripts BEGIN
+        INSERT INTO transcripts_fts(transcripts_fts, rowid, filename, text_content)
+        VALUES ('delete', old.id, old.filename, old.text_content);
+        INSERT INTO transcripts_fts(rowid, filename, text_content) VALUES (new.id, new.filename, new.text_content);
+    END""",
+    """CREATE VIRTUAL TABLE utterances_fts USING fts5(
+        text, content='utterances', content_rowid='id', tokenize='unicode61 remove_diacritics 2'
+    )""",
+    """CREATE TRIGGER utterances_fts_insert AFTER INSERT ON utterances BEGIN
+        INSERT INTO utterances_fts(rowid, text) VALUES (new.id, new.text);
+    END""",
+    """CREATE TRIGGER utterances_fts_delete AFTER DELETE ON utterances BEGIN
+        INSERT INTO utterances_fts(utterances_fts, rowid, text) VALUES ('delete', old.id, old.text);
+    END""",
+    """CREATE TRIGGER utterances_fts_update AFTER UPDATE OF text ON utterances BEGIN
+        INSERT INTO utterances_fts(utterances_fts, rowid, text) VALUES ('delete', old.id, old.text);
+        INSERT INTO utterances_fts(rowid, text) VALUES (new.id, new.text);
+    END""",
+    # Index the rows that existed before the tables
+    "INSERT INTO transcripts_fts(transcripts_fts) VALUES ('rebuild')",
+    "INSERT INTO utterances_fts(utterances_fts) VALUES ('rebuild')",
+]
+
+
+def _ts_config() -> str:
+    # Inlined in the SQL: a generated column needs a literal (immutable) configuration
+    if not re.fullmatch(r"\w+", SEARCH_TS_CONFIG):
+        raise ValueError(f"Invalid SEARCH_TS_CONFIG {SEARCH_TS_CONFIG!r}")
+    return SEARCH_TS_CONFIG
+
+
+def _transcript_vector() -> str:
+    return f"to_tsvector('{_ts_config()}', coalesce(filename, '') || ' ' || text_content)"
+
+
+def _utterance_vector() -> str:
+    return f"to_tsvector('{_ts_config()}', text)"
+
+
+def install_search_index(engine):
+    """Create the search index if missing (called by init_db; cheap when it exists)"""
+    dialect = engine.dialect.name
+    if dialect == "sqlite":
+        with engine.connect() as conn:
+            if conn.execute(text("SELECT 1 FROM sqlite_master WHERE name = 'transcripts_fts'")).first():
+                return
+        try:
+            with engine.begin() as conn:
+                for statement in SQLITE_SETUP:
+                    conn.execute(text(statement))
+            print("🔎 Full-text search index created")
+        except OperationalError as e:
+            print(f"⚠️  SQLite FTS5 unavailable, search falls back to LIKE scans: {e}")
+    elif dialect == "postgresql":
+        with engine.begin() as conn:
+            for table, vector in (("transcripts", _transcript_vector()), ("utterances", _utterance_vector())):
+                # Filled for existing rows when added (one table rewrite), then kept up to date by PostgreSQL 12+
+                conn.execute(text(
+                    f"ALTER TABLE {table} ADD COLUMN IF NOT EXISTS search_vector tsvector "
+                    f"GENERATED ALWAYS AS ({vector}) STORED"
+                ))
+                conn.execute(text(
+                    f"CREATE INDEX IF NOT EXISTS ix_{table}_search_vector ON {table} USING GIN (search_vector)"
+                ))
+                # Expression index of earlier versions, superseded by the column's
+                conn.execute(text(f"DROP INDEX IF EXISTS ix_{table}_search"))
+
+
+def _terms(query: str) -> list:
+    # Words only: nothing from the user reaches the query syntax of either engine
+    return re.findall(r"\w+", query)[:16]
+
+
+def _fts5_available(db) -> bool:
+    return db.execute(text("SELECT 1 FROM sqlite_master WHERE name = 'transcripts_fts'")).first() is not None
+
+
+def _search_sqlite(db, user_id: int, terms: list, limit: int, offset: int):
+    # Every word must appear; the last one may be a prefix (search as you type)
+    match = " ".join(f'"{term}"' for term in terms) + "*"
+    hits = db.execute(text(f"""
+        SELECT t.id, snippet(transcripts_fts, 1, :start, :stop, '…', 16) AS snippet
+        FROM transcripts_fts JOIN transcripts t ON t.id = transcripts_fts.rowid
+        WHERE transcripts_fts MATCH :match AND t.user_id = :user_id
+        ORDER BY transcripts_fts.rank
+        LIMIT :limit OFFSET :offset
+    """), {"match": match, "user_id": user_id, "limit": limit, "offset": offset,
+           "start": HIGHLIGHT_START, "stop": HIGHLIGHT_STOP}).all()
+    if not hits:
+        return [], []
+
+    matches = db.execute(text("""
+        SELECT u.transcript_id, u.idx, u.speaker, u.start_ms, u.end_ms,
+               snippet(utterances_fts, 0, :start, :stop, '…', 24) AS snippet
+        FROM utterances_fts JOIN utterances u ON u.id = utterances_fts.rowid
+        WHERE utterances_fts MATCH :match AND u.transcript_id IN :ids
+        ORDER BY u.transcript_id, u.start_ms
+    """).bindparams(bindparam("ids", expanding=True)), {
+        "match": match, "ids": [hit.id for hit in hits], "start": HIGHLIGHT_START, "stop": HIGHLIGHT_STOP
+    }).all()
+    return hits, matches
+
+
+def _search_postgres(db, user_id: int, terms: list, limit: int, offset: int):
+    tsquery = " & ".join(terms) + ":*"
+    config = _ts_config()
+    headline = f"'MaxFragments=2, MaxWords=24, MinWords=8, StartSel={HIGHLIGHT_START}, StopSel={HIGHLIGHT_STOP}'"
+    # Headlines are computed for the page only, not for every match
+    hits = db.execute(text(f"""
+        WITH q AS (SELECT to_tsquery('{config}', :tsquery) AS query),
+        ranked AS (
+            SELECT t.id, ts_rank(t.search_vector, q.query) AS rank
+            FROM transcripts t, q
+            WHERE t.user_id = :user_id AND t.search_vector @@ q.query
+            ORDER BY rank DESC
+            LIMIT :limit OFFSET :offset
+        )
+        SELECT ranked.id, ts_headline('{config}', t.text_content, q.query, {headline}) AS snippet
+        FROM ranked JOIN transcripts t ON t.id = ranked.id, q
+        ORDER BY ranked.rank DESC
+    """), {"tsquery": tsquery, "user_id": user_id, "limit": limit, "offset": offset}).all()
+    if not hits:
+        return [], []
+
+    matches = db.execute(text(f"""
+        SELECT u.transcript_id, u.idx, u.speaker, u.start_ms, u.end_ms,
+               ts_headline('{config}', u.text, to_tsquery('{config}', :tsquery), {headline}) AS snippet
+        FROM utterances u
+        WHERE u.transcript_id IN :ids AND u.search_vector @@ to_tsquery('{config}', :tsquery)
+        ORDER BY u.transcript_id, u.start_ms
+    """).bindparams(bindparam("ids", expanding=True)), {
+        "tsquery": tsquery, "ids": [hit.id for hit in hits]
+    }).all()
+    return hits, matches
+
+
+def _search_like(db, user_id: int, terms: list, limit: int, offset: int):
+    """Unindexed fallback: every word must appear in the filename or the text"""
+    query = db.query(Transcript.id, Transcript.preview).filter(Transcript.user_id == user_id)
+    for term in terms:
+        query = query.filter((Transcript.text_content.ilike(f"%{term}%")) | (Transcript.filename.ilike(f"%{term}%")))
+    hits = query.order_by(Transcript.created_at.desc()).limit(limit).offset(offset).all()
+    if not hits:
+        return [], []
+
+    utterances = db.query(Utterance).filter(Utterance.transcript_id.in_([hit.id for hit in hits]))
+    for term in terms:
+        utterances = utterances.filter(Utterance.text.ilike(f"%{term}%"))
+    matches = [(u.transcript_id, u.idx, u.speaker, u.start_ms, u.end_ms, u.text)
+               for u in utterances.order_by(Utterance.transcript_id, Utterance.start_ms)]
+    return hits, matches
+
+
+def search_transcripts(db, user_id: int, query: str, limit: int = 20, offset: int = 0) -> list:
+    """
+    Transcripts of `user_id` matching every word of `query`, best first,
+    each with a highlighted snippet and up to MATCHES_PER_TRANSCRIPT
+    matching utterances (timestamps in ms).
+    """
+    terms = _terms(query)
+    if not terms:
+        return []
+
+    dialect = db.get_bind().dialect.name
+    if dialect == "sqlite" and _fts5_available(db):
+        hits, matches = _search_sqlite(db, user_id, terms, limit, offset)
+    elif dialect == "postgresql":
+        hits, matches = _search_postgres(db, user_id, terms, limit, offset)
+    else:
+        hits, matches = _search_like(db, user_id, terms, limit, offset)
+
+    by_transcript = {}
+    for transcript_id, idx, speaker, start_ms, end_ms, snippet in matches:
+        found = by_transcript.setdefault(transcript_id, [])
+        if len(found) < MATCHES_PER_TRANSCRIPT:
+            found.append({"idx": idx, "speaker": speaker, "start": start_ms, "end": end_ms, "snippet": snippet})
+
+    transcripts = {t.id: t for t in db.query(Transcript).options(load_only(
+        Transcript.id, Transcript.transcript_id, Transcript.filename, Transcript.created_at, Transcript.duration
+    )).filter(Transcript.id.in_([hit[0] for hit in hits]))}
+
+    return [
+        {
+            "id": hit[0],
+            "transcript_id": transcripts[hit[0]].transcript_id,
+            "filename": transcripts[hit[0]].filename,
+            "created_at": transcripts[hit[0]].created_at.isoformat(),
+            "duration": transcripts[hit[0]].duration,
+            "snippet": hit[1],
+            "matches": by_transcript.get(hit[0], []),
+        }
+        for hit in hits if hit[0] in transcripts
+    ]
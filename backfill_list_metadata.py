@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""
+Compute the /transcripts/list columns (word_count, preview, speaker_count,
+duration) for transcripts stored before they existed
+
+Walks the transcripts by id in batches, one transaction per batch, and only
+touches rows still missing a word or speaker count, so it can be
+interrupted and run again. Speaker counts come from the utterances table
+when it is filled (backfill_utterances.py), otherwise from the stored
+JSON, which also provides the duration.
+
+Usage:
+    python backfill_list_metadata.py [--batch-size 200]
+"""
+import argparse
+import json
+import sys
+import time
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.append(str(Path(__file__).resolve().parent))
+
+from sqlalchemy import or_
+from sqlalchemy.orm import load_only
+
+from api.database import SessionLocal, Transcript, Utterance, fill_list_metadata
+
+
+def backfill(batch_size: int) -> int:
+    done = 0
+    last_id = 0
+    db = SessionLocal()
+    try:
+        while True:
+            batch = db.query(Transcript).options(load_only(
+                Transcript.id, Transcript.text_content, Transcript.duration, Transcript.word_count
+            )).filter(
+                Transcript.id > last_id,
+                # The list endpoint fills word counts of old rows, but not their speakers
+                or_(Transcript.word_count.is_(None), Transcript.speaker_count.is_(None))
+            ).order_by(Transcript.id).limit(batch_size).all()
+            if not batch:
+                break
+            last_id = batch[-1].id
+
+            speakers = {}
+            for transcript_id, speaker in db.query(Utterance.transcript_id, Utterance.speaker).filter(
+                Utterance.transcript_id.in_([t.id for t in batch])
+            ).distinct():
+                speakers.setdefault(transcript_id, []).append(speaker)
+
+            for transcript in batch:
+                labels = speakers.get(transcript.id)
+                if labels is None or transcript.duration is None:
+                    try:
+                        # Deferred column: loaded (and decompressed) for this row only
+                        data = json.loads(transcript.json_content or "null") or {}
+                    except (json.JSONDecodeError, RuntimeError):
+                        data = {}
+                    if labels is None:
+                        labels = [utt.get("speaker") for utt in data.get("utterances") or []]
+                    if transcript.duration is None:
+                        transcript.duration = data.get("audio_duration")
+                fill_list_metadata(transcript, speakers=labels)
+            db.commit()
+            db.expunge_all()
+            done += len(batch)
+            print(f"   {done} transcripts updated")
+    finally:
+        db.close()
+    return done
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Backfill the transcript list columns")
+    parser.add_argument("--batch-size", type=int, default=200, help="transcripts per transaction")
+    args = parser.parse_args()
+
+    print("🔄 Backfilling transcript list metadata...")
+    started = time.perf_counter()
+    done = backfill(args.batch_size)
+    print(f"✅ {done} transcripts updated in {time.perf_counter() - started:.1f}s")
+
+
+if __name__ == "__main__":
+    try:
+        main()
+    except Exception as e:
+        print(f"❌ Backfill failed: {e}")
+        sys.exit(1)
@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+"""
+Fill the utterances table for transcripts stored before it existed
+
+New transcripts get their utterance rows at ingest; this walks the older
+ones by id in batches, one transaction per batch, skipping transcripts that
+already have rows, so it can be interrupted and run again. (The utterances
+endpoint also fills a transcript's rows on first read.)
+
+Usage:
+    python backfill_utterances.py [--batch-size 100]
+"""
+import argparse
+import json
+import sys
+import time
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.append(str(Path(__file__).resolve().parent))
+
+from api.database import SessionLocal, Transcript, Utterance, init_db, utterances_from_response
+
+
+def backfill(batch_size: int) -> dict:
+    stats = {"transcripts": 0, "filled": 0, "utterances": 0, "unreadable": 0}
+    last_id = 0
+    db = SessionLocal()
+    try:
+        while True:
+            batch = db.query(Transcript).filter(
+                Transcript.id > last_id,
+                Transcript.json_content_stored.isnot(None),
+                ~db.query(Utterance.id).filter(Utterance.transcript_id == Transcript.id).exists()
+            ).order_by(Transcript.id).limit(batch_size).all()
+            if not batch:
+                break
+            last_id = batch[-1].id
+
+            for transcript in batch:
+                stats["transcripts"] += 1
+                try:
+                    rows = utterances_from_response(transcript.json_content)
+                except (json.JSONDecodeError, RuntimeError):
+                    stats["unreadable"] += 1
+                    continue
+                if rows:
+                    db.add_all(Utterance(transcript_id=transcript.id, idx=row.idx, speaker=row.speaker,
+                                         start_ms=row.start_ms, end_ms=row.end_ms, text=row.text) for row in rows)
+                    stats["filled"] += 1
+                    stats["utterances"] += len(rows)
+            db.commit()
+            # Drop the batch's decompressed JSON before loading the next one
+            db.expunge_all()
+            print(f"   {stats['transcripts']} transcripts scanned, {stats['utterances']} utterances stored")
+    finally:
+        db.close()
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Backfill the utterances table")
+    parser.add_argument("--batch-size", type=int, default=100, help="transcripts per transaction")
+    args = parser.parse_args()
+
+    # Creates the utterances table if migrate_db.py was not run yet
+    init_db()
+    print("🔄 Backfilling utterances...")
+    started = time.perf_counter()
+    stats = backfill(args.batch_size)
+    print(f"✅ {stats['filled']}/{stats['transcripts']} transcripts filled with {stats['utterances']} utterances "
+          f"in {time.perf_counter() - started:.1f}s ({stats['unreadable']} unreadable)")
+
+
+if __name__ == "__main__":
+    try:
+        main()
+    except Exception as e:
+        print(f"❌ Backfill failed: {e}")
+        sys.exit(1)
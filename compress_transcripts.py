@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""
+Compress the stored AssemblyAI JSON of existing rows (see api/compression.py)
+
+Rows are rewritten in batches, each in its own transaction, walking the
+tables by id so the job can be stopped and started again at any time:
+rows already compressed are skipped. Works against SQLite and PostgreSQL
+(DATABASE_URL).
+
+Usage:
+    python compress_transcripts.py [--batch-size 200] [--dry-run]
+
+PostgreSQL only hands the space back to the OS after VACUUM FULL (or
+pg_repack); SQLite after VACUUM.
+"""
+import argparse
+import sys
+import time
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.append(str(Path(__file__).resolve().parent))
+
+from api.compression import compress_text, default_codec, is_compressed
+from api.database import SessionLocal, Transcript
+
+MODELS = (Transcript,)
+
+
+def compress_table(model, batch_size: int, dry_run: bool) -> dict:
+    """Compress one table; returns rows seen/rewritten and bytes before/after"""
+    stats = {"rows": 0, "compressed": 0, "bytes_before": 0, "bytes_after": 0}
+    last_id = 0
+    db = SessionLocal()
+    try:
+        while True:
+            # Only the id and the stored text: no ORM objects, no decompression
+            rows = db.query(model.id, model.json_content_stored).filter(
+                model.id > last_id,
+                model.json_content_stored.isnot(None)
+            ).order_by(model.id).limit(batch_size).all()
+            if not rows:
+                break
+            last_id = rows[-1][0]
+
+            updates = []
+            for row_id, stored in rows:
+                stats["rows"] += 1
+                size = len(stored.encode("utf-8"))
+                stats["bytes_before"] += size
+                compressed = stored if is_compressed(stored) else compress_text(stored)
+                stats["bytes_after"] += len(compressed.encode("utf-8"))
+                if compressed is not stored:
+                    updates.append({"id": row_id, "json_content_stored": compressed})
+
+            if updates and not dry_run:
+                db.bulk_update_mappings(model, updates)
+                db.commit()
+            stats["compressed"] += len(updates)
+            print(f"   {model.__tablename__}: {stats['rows']} rows scanned, {stats['compressed']} compressed")
+    finally:
+        db.close()
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compress stored transcript JSON")
+    parser.add_argument("--batch-size", type=int, default=200, help="rows per transaction")
+    parser.add_argument("--dry-run", action="store_true", help="measure the savings without writing")
+    args = parser.parse_args()
+
+    codec = default_codec()
+    if codec is None:
+        sys.exit("❌ JSON_COMPRESSION=none: nothing to do")
+    print(f"🗜️  Compressing stored JSON with {codec}{' (dry run)' if args.dry_run else ''}...")
+
+    started = time.perf_counter()
+    before = after = 0
+    for model in MODELS:
+        stats = compress_table(model, args.batch_size, args.dry_run)
+        before += stats["bytes_before"]
+        after += stats["bytes_after"]
+        saved = stats["bytes_before"] - stats["bytes_after"]
+        print(f"✅ {model.__tablename__}: {stats['compressed']}/{stats['rows']} rows compressed, "
+              f"{stats['bytes_before'] / 1e6:.1f}MB -> {stats['bytes_after'] / 1e6:.1f}MB ({saved / 1e6:.1f}MB saved)")
+
+    ratio = (1 - after / before) * 100 if before else 0
+    print(f"🎉 Done in {time.perf_counter() - started:.1f}s: "
+          f"{before / 1e6:.1f}MB -> {after / 1e6:.1f}MB, {ratio:.0f}% saved")
+
+
+if __name__ == "__main__":
+    try:
+        main()
+    except Exception as e:
+        print(f"❌ Compression failed: {e}")
+        sys.exit(1)
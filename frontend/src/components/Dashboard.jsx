@@ -10,6 +10,8 @@ import SettingsModal from './SettingsModal'
 
 function Dashboard({ setIsAuthenticated }) {
   const [transcripts, setTranscripts] = useState([])
+  const [nextCursor, setNextCursor] = useState(null)
+  const [loadingMore, setLoadingMore] = useState(false)
   const navigate = useNavigate()
   const [loading, setLoading] = useState(true)
   const [isSettingsOpen, setIsSettingsOpen] = useState(false)
@@ -77,22 +79,24 @@ function Dashboard({ setIsAuthenticated }) {
     loadTranscripts()
   }, [])
 
+  // Transform API response to match component format
+  const formatTranscripts = (items) => items.map(t => ({
+    id: t.transcript_id,
+    database_id: t.id,
+    filename: t.filename,
+    timestamp: t.created_at,
+    word_count: t.word_count,
+    preview: t.preview,
+    textFile: `/transcripts/${t.transcript_id}?format=txt`,
+    jsonFile: `/transcripts/${t.transcript_id}?format=json`
+  }))
+
   const loadTranscripts = async () => {
     try {
       setLoading(true)
       const data = await listTranscripts()
-      // Transform API response to match component format
-      const formattedTranscripts = data.map(t => ({
-        id: t.transcript_id,
-        database_id: t.id,
-        filename: t.filename,
-        timestamp: t.created_at,
-        word_count: t.word_count,
-        preview: t.preview,
-        textFile: `/transcripts/${t.transcript_id}?format=txt`,
-        jsonFile: `/transcripts/${t.transcript_id}?format=json`
-      }))
-      setTranscripts(formattedTranscripts)
+      setTranscripts(formatTranscripts(data.transcripts))
+      setNextCursor(data.next_cursor)
     } catch (error) {
       console.error('Failed to load transcripts:', error)
     } finally {
@@ -100,6 +104,20 @@ function Dashboard({ setIsAuthenticated }) {
     }
   }
 
+  const loadMoreTranscripts = async () => {
+    if (!nextCursor) return
+    try {
+      setLoadingMore(true)
+      const data = await listTranscripts({ cursor: nextCursor })
+      setTranscripts(current => [...current, ...formatTranscripts(data.transcripts)])
+      setNextCursor(data.next_cursor)
+    } catch (error) {
+      console.error('Failed to load transcripts:', error)
+    } finally {
+      setLoadingMore(false)
+    }
+  }
+
   const handleLogout = () => {
     clearTokens()
     setIsAuthenticated(false)
@@ -206,11 +224,22 @@ function Dashboard({ setIsAuthenticated }) {
                   <div className="animate-spin rounded-full h-8 w-8 border-b-2 border-blue-600"></div>
                 </div>
               ) : (
-                <TranscriptViewer 
-                  transcripts={transcripts}
-                  onTranscriptDeleted={handleTranscriptDeleted}
-                  onTranscriptRenamed={handleTranscriptRenamed}
-                />
+                <>
+                  <TranscriptViewer 
+                    transcripts={transcripts}
+                    onTranscriptDeleted={handleTranscriptDeleted}
+                    onTranscriptRenamed={handleTranscriptRenamed}
+                  />
+                  {nextCursor && (
+                    <button
+                      onClick={loadMoreTranscripts}
+                      disabled={loadingMore}
+                      className="mt-4 w-full py-2 text-sm font-medium text-blue-600 hover:text-blue-700 disabled:opacity-50"
+                    >
+                      {loadingMore ? 'Loading...' : 'Load older transcripts'}
+                    </button>
+                  )}
+                </>
               )}
             </div>
           )}
@@ -75,10 +75,16 @@ function Upload({ onTranscriptComplete, defaultQuality = 'medium' }) {
     setProgressLabel('Uploading file...')
 
     try {
-      const result = await transcribeAudio(file, quality, (prog) => {
+      const result = await transcribeAudio(file, quality, (prog, job) => {
         setProgress(prog)
         // Update label based on progress
-        if (prog < 25) {
+        if (job?.queue_position != null) {
+          const wait = job.estimated_wait_seconds
+          setProgressLabel(
+            `Waiting in queue (position ${job.queue_position + 1}` +
+            (wait ? `, about ${Math.max(1, Math.round(wait / 60))} min)...` : ')...')
+          )
+        } else if (prog < 25) {
           setProgressLabel('Uploading file...')
         } else if (prog < 50) {
           setProgressLabel('Processing audio...')
@@ -87,69 +87,169 @@ export const getCurrentUser = async () => {
   return response.data
 }
 
-export const transcribeAudio = async (file, quality = 'high', onProgress) => {
-  const formData = new FormData()
-  formData.append('file', file)
-  formData.append('quality', quality)
+// Progress floor reported for each backend job stage
+const JOB_STAGE_PROGRESS = {
+  queued: 25,
+  converting: 35,
+  uploading: 50,
+  transcribing: 60,
+  saving: 90,
+}
 
-  // Simulate transcription progress after upload
-  let uploadComplete = false
-  let simulationInterval = null
-  let currentProgress = 0
+const JOB_POLL_INTERVAL_MS = 2000
 
-  const startProgressSimulation = () => {
-    uploadComplete = true
-    currentProgress = 25 // Start from 25% after upload
-    
-    // Gradually increase progress from 25% to 95%
-    simulationInterval = setInterval(() => {
-      if (currentProgress < 95) {
-        // Slower progression as we get higher
-        const increment = currentProgress < 60 ? 2 : currentProgress < 80 ? 1 : 0.5
-        currentProgress = Math.min(95, currentProgress + increment)
-        if (onProgress) {
-          onProgress(Math.round(currentProgress))
-        }
-      }
-    }, 800) // Update every 800ms
+export const getJobStatus = async (jobId) => {
+  const response = await api.get(`/jobs/${jobId}`)
+  return response.data
+}
+
+// Poll a queued transcription job until it completes or fails.
+// onProgress receives the percentage and, while polling, the job status.
+export const waitForJob = async (jobId, onProgress) => {
+  let currentProgress = 25
+
+  while (true) {
+    const job = await getJobStatus(jobId)
+
+    if (job.status === 'completed') {
+      return job
+    }
+    if (job.status === 'error') {
+      const error = new Error(job.error || 'Transcription failed')
+      error.response = { data: { error: job.error || 'Transcription failed' } }
+      throw error
+    }
+
+    // Creep forward inside the current stage, never past 95%
+    const floor = JOB_STAGE_PROGRESS[job.status] ?? currentProgress
+    const increment = currentProgress < 60 ? 2 : currentProgress < 80 ? 1 : 0.5
+    currentProgress = Math.min(95, Math.max(floor, currentProgress + increment))
+    if (onProgress) {
+      // The job carries queue_position / estimated_wait_seconds while it waits its turn
+      onProgress(Math.round(currentProgress), job)
+    }
+
+    await new Promise((resolve) => setTimeout(resolve, JOB_POLL_INTERVAL_MS))
   }
+}
 
-  try {
-    const response = await api.post('/transcribe', formData, {
-      headers: {
-        'Content-Type': 'multipart/form-data',
-      },
-      onUploadProgress: (progressEvent) => {
-        if (onProgress && progressEvent.total && !uploadComplete) {
-          // Upload phase: 0-25%
-          const uploadProgress = Math.round((progressEvent.loaded * 25) / progressEvent.total)
-          onProgress(uploadProgress)
-          
-          // Start simulation when upload is complete
-          if (progressEvent.loaded === progressEvent.total) {
-            startProgressSimulation()
+const UPLOAD_CHUNK_SIZE = 5 * 1024 * 1024 // 5MB per PUT
+const UPLOAD_MAX_RETRIES = 5
+
+// Send a file in chunks; after a dropped connection, ask the server how much
+// it already holds and continue from there. Resolves with the queued job.
+export const uploadResumable = async (file, quality = 'high', onProgress) => {
+  const { data: upload } = await api.post('/uploads', {
+    filename: file.name,
+    size: file.size,
+    quality,
+  })
+
+  let offset = upload.offset
+  let retries = 0
+
+  while (true) {
+    const end = Math.min(offset + UPLOAD_CHUNK_SIZE, file.size)
+    try {
+      const response = await api.put(`/uploads/${upload.upload_id}`, file.slice(offset, end), {
+        headers: {
+          'Content-Type': 'application/offset+octet-stream',
+          'Upload-Offset': String(offset),
+        },
+        onUploadProgress: (progressEvent) => {
+          if (onProgress) {
+            onProgress(offset + progressEvent.loaded, file.size)
           }
         }
+      })
+      retries = 0
+      if (response.data?.job_id) {
+        return response.data
       }
-    })
+      offset = Number(response.headers['upload-offset'] ?? end)
+    } catch (error) {
+      const status = error.response?.status
+      if (status && status !== 409 && status !== 503 && status < 500) {
+        throw error
+      }
+      if (++retries > UPLOAD_MAX_RETRIES) {
+        throw error
+      }
+      // Back off, then resume from whatever the server kept
+      const retryAfter = Number(error.response?.headers?.['retry-after']) || 2 ** retries
+      await new Promise((resolve) => setTimeout(resolve, retryAfter * 1000))
+      try {
+        const head = await api.head(`/uploads/${upload.upload_id}`)
+        offset = Number(head.headers['upload-offset'])
+      } catch {
+        // Still offline: the next PUT attempt gets another retry
+      }
+    }
+  }
+}
 
-    // Clear simulation interval
-    if (simulationInterval) {
-      clearInterval(simulationInterval)
+export const transcribeAudio = async (file, quality = 'high', onProgress) => {
+  const upload = await uploadResumable(file, quality, (loaded, total) => {
+    if (onProgress && total) {
+      // Upload phase: 0-25%
+      onProgress(Math.round((loaded * 25) / total))
     }
-    
-    // Final progress: 100%
-    if (onProgress) {
-      onProgress(100)
+  })
+
+  // The backend queues the job and answers right away; follow it to completion
+  const result = await waitForJob(upload.job_id, onProgress)
+
+  // Final progress: 100%
+  if (onProgress) {
+    onProgress(100)
+  }
+
+  return result
+}
+
+export const getBatchStatus = async (batchId) => {
+  const response = await api.get(`/batches/${batchId}`)
+  return response.data
+}
+
+// Upload several files in one request and follow the batch until every file is done.
+// onProgress receives the overall percentage and the per-file job list.
+export const transcribeBatch = async (files, quality = 'high', onProgress) => {
+  const formData = new FormData()
+  files.forEach((file) => formData.append('files', file))
+  formData.append('quality', quality)
+
+  const response = await api.post('/transcribe/batch', formData, {
+    headers: {
+      'Content-Type': 'multipart/form-data',
+    },
+    onUploadProgress: (progressEvent) => {
+      if (onProgress && progressEvent.total) {
+        // Upload phase: 0-25%
+        onProgress(Math.round((progressEvent.loaded * 25) / progressEvent.total), [])
+      }
     }
+  })
 
-    return response.data
-  } catch (error) {
-    // Clear simulation on error
-    if (simulationInterval) {
-      clearInterval(simulationInterval)
+  while (true) {
+    const batch = await getBatchStatus(response.data.batch_id)
+
+    if (batch.status === 'completed') {
+      if (onProgress) {
+        onProgress(100, batch.jobs)
+      }
+      return batch
     }
-    throw error
+
+    if (onProgress) {
+      const perFile = batch.jobs.map((job) =>
+        job.status === 'completed' || job.status === 'error' ? 100 : JOB_STAGE_PROGRESS[job.status] ?? 25
+      )
+      const average = perFile.reduce((sum, value) => sum + value, 0) / perFile.length
+      onProgress(Math.min(95, Math.round(average)), batch.jobs)
+    }
+
+    await new Promise((resolve) => setTimeout(resolve, JOB_POLL_INTERVAL_MS))
   }
 }
 
@@ -166,8 +266,17 @@ export const checkHealth = async () => {
 }
 
 // Transcript management
-export const listTranscripts = async () => {
-  const response = await api.get('/transcripts/list')
+// One page, newest first: { transcripts, next_cursor }. Pass next_cursor as
+// `cursor` for the following page; created_from / created_to / prefix filter.
+export const listTranscripts = async (params = {}) => {
+  const response = await api.get('/transcripts/list', { params })
+  return response.data
+}
+
+// Full-text search: { results, next_offset }; each result has a highlighted
+// snippet and its matching utterances (start / end in ms)
+export const searchTranscripts = async (q, { limit, offset } = {}) => {
+  const response = await api.get('/transcripts/search', { params: { q, limit, offset } })
   return response.data
 }
 
@@ -1,41 +1,83 @@
 """
-Migration script to add default_user_prompt column to user_settings table
+Migration script to add new columns to existing tables
 Run this script to update your database: python migrate_db.py
+
+init_db() creates missing tables but never alters existing ones, so every
+column added to an existing model is listed in COLUMN_MIGRATIONS, and every
+index added to an existing table in INDEX_MIGRATIONS. Tables whose rows
+cannot be carried over are dropped and recreated (REBUILT_TABLES).
+Works against SQLite and PostgreSQL (DATABASE_URL).
 """
-import sqlite3
-from pathlib import Path
+from sqlalchemy import inspect, text
+
+from api.database import engine, init_db
+
+# (table, column, column DDL)
+COLUMN_MIGRATIONS = [
+    ("user_settings", "default_user_prompt", "TEXT"),
+    ("transcription_jobs", "content_hash", "VARCHAR"),
+    ("transcription_jobs", "batch_id", "VARCHAR"),
+    ("transcription_jobs", "audio_path", "VARCHAR"),
+    ("transcription_jobs", "upload_url", "VARCHAR"),
+    ("transcription_jobs", "worker_id", "VARCHAR"),
+    ("transcription_jobs", "heartbeat_at", "TIMESTAMP"),
+    ("transcription_jobs", "duration", "FLOAT"),
+    ("transcription_jobs", "remote_chunks", "TEXT"),
+    ("transcripts", "duration", "FLOAT"),
+    ("transcripts", "word_count", "INTEGER"),
+    ("transcripts", "preview", "TEXT"),
+    ("transcripts", "speaker_count", "INTEGER"),
+]
+
+# (index name, table, columns) - created on tables that predate the index
+INDEX_MIGRATIONS = [
+    ("ix_transcripts_user_created", "transcripts", "user_id, created_at"),
+]
+
+
+# (table, column of the current schema) - a table without that column is dropped and recreated.
+# transcription_cache kept its own copy of each result: entries now point at a transcript instead.
+# Dropping it is safe (it is only a cache) and removes the copies of deleted transcripts.
+REBUILT_TABLES = [
+    ("transcription_cache", "transcript_db_id"),
+]
 
-DB_PATH = Path("voice_transcript.db")
 
 def migrate():
-    if not DB_PATH.exists():
-        print(f"Database {DB_PATH} not found. No migration needed.")
-        return
-    
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
-    
+    inspector = inspect(engine)
+    with engine.begin() as conn:
+        for table, column in REBUILT_TABLES:
+            if table in inspector.get_table_names() and column not in [
+                col["name"] for col in inspector.get_columns(table)
+            ]:
+                conn.execute(text(f"DROP TABLE {table}"))
+                print(f"✅ Dropped the old '{table}' table, recreated below")
+
+    # Create any brand-new tables first
+    init_db()
+    inspector = inspect(engine)
+
+    with engine.begin() as conn:
+        for table, column, ddl in COLUMN_MIGRATIONS:
+            columns = [col["name"] for col in inspector.get_columns(table)]
+            if column in columns:
+                print(f"✅ Column '{table}.{column}' already exists. No migration needed.")
+                continue
+
+            conn.execute(text(f"ALTER TABLE {table} ADD COLUMN {column} {ddl}"))
+            print(f"✅ Successfully added '{column}' column to {table} table")
+
+        for name, table, columns in INDEX_MIGRATIONS:
+            if name in [index["name"] for index in inspector.get_indexes(table)]:
+                print(f"✅ Index '{name}' already exists. No migration needed.")
+                continue
+
+            conn.execute(text(f"CREATE INDEX {name} ON {table} ({columns})"))
+            print(f"✅ Successfully created index '{name}' on {table}")
+
+
+if __name__ == "__main__":
     try:
-        # Check if column already exists
-        cursor.execute("PRAGMA table_info(user_settings)")
-        columns = [row[1] for row in cursor.fetchall()]
-        
-        if 'default_user_prompt' in columns:
-            print("✅ Column 'default_user_prompt' already exists. No migration needed.")
-        else:
-            # Add the new column
-            cursor.execute("""
-                ALTER TABLE user_settings 
-                ADD COLUMN default_user_prompt TEXT
-            """)
-            conn.commit()
-            print("✅ Successfully added 'default_user_prompt' column to user_settings table")
-        
+        migrate()
     except Exception as e:
         print(f"❌ Migration failed: {e}")
-        conn.rollback()
-    finally:
-        conn.close()
-
-if __name__ == "__main__":
-    migrate()
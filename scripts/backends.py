@@ -0,0 +1,212 @@
+"""
+Transcription backends
+
+Every backend returns a TranscriptionResult (scripts/transcribe.py), so the
+code storing transcripts never depends on the engine that produced them:
+
+- AssemblyAIBackend: hosted API with speaker labels, any length
+- LocalWhisperBackend: faster-whisper on the CPU, in a pool of worker
+  processes. No upload and no per-minute cost, which suits short memos;
+  there is no speaker diarization, every utterance is speaker "A".
+
+TRANSCRIPTION_BACKEND selects assemblyai (default), local or auto. In auto
+mode recordings up to LOCAL_MAX_SECONDS go to the local engine and longer
+ones to AssemblyAI. faster-whisper is optional: without it, everything
+goes to AssemblyAI.
+"""
+import importlib.util
+import io
+import math
+import multiprocessing
+import os
+import threading
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import nullcontext
+from pathlib import Path
+
+from scripts.transcribe import (
+    TranscriptionResult, TRANSCRIPTION_SETTINGS, submit_audio, upload_audio, resume_transcript,
+    wait_for_completion, get_completion_strategy
+)
+
+TRANSCRIPTION_BACKEND = os.getenv("TRANSCRIPTION_BACKEND", "assemblyai").lower()
+LOCAL_MAX_SECONDS = float(os.getenv("LOCAL_MAX_SECONDS", "180"))
+LOCAL_WHISPER_MODEL = os.getenv("LOCAL_WHISPER_MODEL", "small")
+LOCAL_WORKERS = int(os.getenv("LOCAL_WORKERS", "2"))  # worker processes, each holding a model
+LOCAL_CPU_THREADS = int(os.getenv("LOCAL_CPU_THREADS", "0"))  # per process; 0 = library default
+
+
+class TranscriptionBackend:
+    """Turns prepared audio (path, in-memory file or URL) into a TranscriptionResult"""
+
+    name = None
+
+    def available(self) -> bool:
+        return True
+
+    def transcribe(self, audio, duration: float = None, report=None) -> TranscriptionResult:
+        """`report(status, **fields)` is called as the job moves through its stages"""
+        raise NotImplementedError
+
+
+class AssemblyAIBackend(TranscriptionBackend):
+    name = "assemblyai"
+
+    def __init__(self, api_key: str, upload_slots=None, remote_slot=None):
+        """
+        `upload_slots` bounds simultaneous uploads; `remote_slot(duration)`
+        returns a context manager held while the job is with AssemblyAI
+        (global cap).
+        """
+        self.api_key = api_key
+        self.upload_slots = upload_slots
+        self.remote_slot = remote_slot or nullcontext
+
+    def transcribe(self, audio, duration: float = None, report=None) -> TranscriptionResult:
+        if not self.api_key:
+            raise RuntimeError("AAI_API_KEY missing in .env")
+        report = report or (lambda status, **fields: None)
+
+        strategy = get_completion_strategy(duration)
+        if not _is_url(audio):
+            report("uploading")
+            with self.upload_slots or nullcontext():
+                audio = upload_audio(str(audio) if isinstance(audio, Path) else audio, self.api_key)
+            # Recorded so that a job resumed after a restart skips the upload
+            report("uploading", upload_url=audio)
+
+        with self.remote_slot(duration):
+            remote = submit_audio(audio, self.api_key, strategy=strategy)
+            report("transcribing", remote_job_id=remote.id)
+            return TranscriptionResult.from_assemblyai(wait_for_completion(remote, strategy=strategy))
+
+    def resume(self, remote_job_id: str, duration: float = None) -> TranscriptionResult:
+        """Pick up a job submitted before a restart instead of paying for it again"""
+        if not self.api_key:
+            raise RuntimeError("AAI_API_KEY missing in .env")
+        strategy = get_completion_strategy(duration)
+        with self.remote_slot(duration):
+            return TranscriptionResult.from_assemblyai(resume_transcript(remote_job_id, self.api_key, strategy=strategy))
+
+
+def _is_url(audio) -> bool:
+    return isinstance(audio, str) and audio.startswith(("http://", "https://"))
+
+
+# Loaded once per worker process by _init_worker
+_model = None
+
+
+def _init_worker(model_size: str, cpu_threads: int):
+    global _model
+    from faster_whisper import WhisperModel
+
+    _model = WhisperModel(model_size, device="cpu", compute_type="int8", cpu_threads=cpu_threads)
+
+
+def _whisper_transcribe(audio, language: str):
+    """Runs in a worker process; returns (utterances, audio duration in seconds)"""
+    if isinstance(audio, bytes):
+        audio = io.BytesIO(audio)
+    segments, info = _model.transcribe(audio, language=language, word_timestamps=True, vad_filter=True)
+
+    utterances = []
+    for segment in segments:
+        words = [{
+            "text": word.word.strip(),
+            "start": int(word.start * 1000),
+            "end": int(word.end * 1000),
+            "confidence": round(word.probability, 3),
+            "speaker": "A",
+        } for word in segment.words or []]
+        utterances.append({
+            "speaker": "A",
+            "text": segment.text.strip(),
+            "start": int(segment.start * 1000),
+            "end": int(segment.end * 1000),
+            "confidence": round(math.exp(segment.avg_logprob), 3),
+            "words": words,
+        })
+    return utterances, info.duration
+
+
+class LocalWhisperBackend(TranscriptionBackend):
+    name = "local"
+
+    def __init__(self, model_size: str = LOCAL_WHISPER_MODEL, workers: int = LOCAL_WORKERS,
+                 cpu_threads: int = LOCAL_CPU_THREADS):
+        self.model_size = model_size
+        self.workers = workers
+        self.cpu_threads = cpu_threads
+        self._pool = None
+        self._lock = threading.Lock()
+
+    def available(self) -> bool:
+        return importlib.util.find_spec("faster_whisper") is not None
+
+    def pool(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._pool is None:
+                # spawn: forking a process that runs threads (uvicorn, job workers) is unsafe
+                self._pool = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    mp_context=multiprocessing.get_context("spawn"),
+                    initializer=_init_worker,
+                    initargs=(self.model_size, self.cpu_threads)
+                )
+            return self._pool
+
+    def transcribe(self, audio, duration: float = None, report=None) -> TranscriptionResult:
+        if _is_url(audio):
+            raise ValueError("The local backend needs the audio itself, not an uploaded URL")
+        if report:
+            report("transcribing")
+
+        language = TRANSCRIPTION_SETTINGS.get("language_code")
+        payload = audio.getvalue() if isinstance(audio, io.BytesIO) else str(audio)
+        print(f"🖥️  Transcription locale (faster-whisper {self.model_size})")
+        utterances, audio_duration = self.pool().submit(_whisper_transcribe, payload, language).result()
+
+        return TranscriptionResult(f"local_{uuid.uuid4().hex[:12]}", utterances, audio_duration=audio_duration,
+                                   backend=self.name, language_code=language)
+
+
+local_backend = LocalWhisperBackend()
+_warned_unavailable = False
+
+
+def select_backend(duration: float = None, api_key: str = None, upload_slots=None,
+                   remote_slot=None) -> TranscriptionBackend:
+    """Pick the backend for a recording of `duration` seconds (None = unknown)"""
+    global _warned_unavailable
+    wants_local = TRANSCRIPTION_BACKEND == "local" or (
+        TRANSCRIPTION_BACKEND == "auto" and duration is not None and duration <= LOCAL_MAX_SECONDS
+    )
+    if wants_local:
+        if local_backend.available():
+            return local_backend
+        if not _warned_unavailable:
+            print("⚠️  faster-whisper is not installed, using AssemblyAI for every recording")
+            _warned_unavailable = True
+    return AssemblyAIBackend(api_key, upload_slots=upload_slots, remote_slot=remote_slot)
+
+
+def transcribe_routed(audio, duration: float = None, api_key: str = None, report=None,
+                      upload_slots=None, remote_slot=None) -> TranscriptionResult:
+    """
+    Transcribe with the backend chosen for `duration`; a failing local
+    engine falls back to AssemblyAI when an API key is available.
+    """
+    backend = select_backend(duration, api_key, upload_slots=upload_slots, remote_slot=remote_slot)
+    if backend.name != "local":
+        return backend.transcribe(audio, duration, report)
+    try:
+        return backend.transcribe(audio, duration, report)
+    except Exception as e:
+        if not api_key:
+            raise
+        print(f"⚠️  Local transcription failed, using AssemblyAI: {e}")
+        return AssemblyAIBackend(api_key, upload_slots=upload_slots, remote_slot=remote_slot).transcribe(
+            audio, duration, report
+        )
@@ -0,0 +1,171 @@
+"""
+Benchmark: login spike vs transcript downloads
+
+Serves a bcrypt login and a transcript download from one uvicorn process,
+with the password check done either
+
+    inline  verify_password() called in the async handler, as before, so
+            every check blocks the event loop for 100-300 ms
+    pool    awaited on password_hasher (api/auth.py), i.e. on its bounded
+            process pool
+
+and, for each mode, hammers the login with concurrent clients while a few
+other clients keep downloading a transcript. Reports logins per second and
+the download latency percentiles, the number a login spike used to ruin.
+
+    python scripts/bench_login.py
+    python scripts/bench_login.py --logins 64 --downloaders 8 --hash-workers 4
+
+The server runs in its own process, so the load generator does not share
+its GIL. Rejected logins (503 once the hashing queue is full) are counted
+separately from errors.
+"""
+import argparse
+import asyncio
+import multiprocessing
+import statistics
+import sys
+import time
+from contextlib import asynccontextmanager
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+import httpx
+import uvicorn
+from fastapi import FastAPI, Form, HTTPException
+from fastapi.responses import PlainTextResponse
+
+from api.auth import PasswordHasher, HashQueueFull, get_password_hash, verify_password
+
+BENCH_PORT = 8024
+PASSWORD = "correct horse battery staple"
+TRANSCRIPT = "\n".join(f"{'AB'[i % 2]}: sentence number {i} of the benchmark transcript" for i in range(2000))
+
+
+def build_app(hash_workers: int, hash_queue: int) -> FastAPI:
+    hashed = get_password_hash(PASSWORD)
+    hasher = PasswordHasher(workers=hash_workers, max_queue=hash_queue)
+
+    @asynccontextmanager
+    async def lifespan(app: FastAPI):
+        yield
+        hasher.shutdown()
+
+    app = FastAPI(lifespan=lifespan)
+
+    @app.post("/inline/token")
+    async def login_inline(password: str = Form(...)):
+        if not verify_password(password, hashed):
+            raise HTTPException(status_code=401)
+        return {"status": "ok"}
+
+    @app.post("/pool/token")
+    async def login_pool(password: str = Form(...)):
+        try:
+            if not await hasher.verify(password, hashed):
+                raise HTTPException(status_code=401)
+        except HashQueueFull as e:
+            raise HTTPException(status_code=503, headers={"Retry-After": str(e.retry_after)})
+        return {"status": "ok"}
+
+    @app.get("/download")
+    async def download():
+        return PlainTextResponse(TRANSCRIPT)
+
+    @app.get("/metrics")
+    def metrics():
+        return hasher.stats()
+
+    return app
+
+
+def serve(hash_workers: int, hash_queue: int):
+    uvicorn.run(build_app(hash_workers, hash_queue), port=BENCH_PORT, log_level="warning", backlog=4096)
+
+
+def wait_for_server(process):
+    while process.is_alive():
+        try:
+            httpx.get(f"http://127.0.0.1:{BENCH_PORT}/download", timeout=1)
+            return
+        except httpx.HTTPError:
+            time.sleep(0.1)
+    sys.exit("❌ Benchmark server did not start")
+
+
+async def load(mode: str, logins: int, downloaders: int, seconds: float) -> dict:
+    base = f"http://127.0.0.1:{BENCH_PORT}"
+    counts = {"logins": 0, "rejected": 0, "errors": 0}
+    downloads = []
+    deadline = time.perf_counter() + seconds
+    limits = httpx.Limits(max_connections=logins + downloaders, max_keepalive_connections=logins + downloaders)
+    async with httpx.AsyncClient(limits=limits, timeout=120) as client:
+        async def login_worker():
+            while time.perf_counter() < deadline:
+                try:
+                    response = await client.post(f"{base}/{mode}/token", data={"password": PASSWORD})
+                    if response.status_code == 503:
+                        counts["rejected"] += 1
+                        await asyncio.sleep(float(response.headers.get("Retry-After", 1)))
+                        continue
+                    response.raise_for_status()
+                    counts["logins"] += 1
+                except httpx.HTTPError:
+                    counts["errors"] += 1
+
+        async def download_worker():
+            while time.perf_counter() < deadline:
+                started = time.perf_counter()
+                try:
+                    response = await client.get(f"{base}/download")
+                    response.raise_for_status()
+                    downloads.append(time.perf_counter() - started)
+                except httpx.HTTPError:
+                    counts["errors"] += 1
+
+        started = time.perf_counter()
+        await asyncio.gather(*(login_worker() for _ in range(logins)),
+                             *(download_worker() for _ in range(downloaders)))
+        elapsed = time.perf_counter() - started
+    downloads.sort()
+    return {
+        "login_rps": counts["logins"] / elapsed,
+        "download_rps": len(downloads) / elapsed,
+        "p50": statistics.median(downloads) * 1000 if downloads else 0,
+        "p95": downloads[int(len(downloads) * 0.95)] * 1000 if downloads else 0,
+        "rejected": counts["rejected"],
+        "errors": counts["errors"],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Login throughput and download latency under a login spike")
+    parser.add_argument("--logins", type=int, default=32, help="concurrent login clients")
+    parser.add_argument("--downloaders", type=int, default=4, help="concurrent transcript download clients")
+    parser.add_argument("--seconds", type=float, default=10, help="duration of each run")
+    parser.add_argument("--hash-workers", type=int, default=2, help="hashing processes of the pool mode")
+    parser.add_argument("--hash-queue", type=int, default=64, help="hashes allowed to wait in pool mode")
+    args = parser.parse_args()
+
+    server = multiprocessing.Process(target=serve, args=(args.hash_workers, args.hash_queue))
+    server.start()
+    wait_for_server(server)
+
+    print(f"{'mode':>7} {'logins/s':>9} {'dl/s':>7} {'dl p50 ms':>10} {'dl p95 ms':>10} {'503':>5} {'errors':>7}")
+    try:
+        # Start the hashing processes before measuring
+        httpx.post(f"http://127.0.0.1:{BENCH_PORT}/pool/token", data={"password": PASSWORD}, timeout=60)
+        for mode in ("inline", "pool"):
+            r = asyncio.run(load(mode, args.logins, args.downloaders, args.seconds))
+            print(f"{mode:>7} {r['login_rps']:>9.1f} {r['download_rps']:>7.0f} {r['p50']:>10.1f} {r['p95']:>10.1f} "
+                  f"{r['rejected']:>5} {r['errors']:>7}")
+        print(f"hashing pool: {httpx.get(f'http://127.0.0.1:{BENCH_PORT}/metrics').json()}")
+    finally:
+        server.terminate()
+        server.join()
+
+
+if __name__ == "__main__":
+    main()
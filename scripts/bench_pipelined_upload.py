@@ -0,0 +1,93 @@
+"""
+Benchmark: convert-then-upload vs. conversion streamed into the upload
+
+For WAV inputs of 10, 50 and 100 MB, measures the time until AssemblyAI
+(here the local fake server) holds the converted MP3:
+
+    sequential  convert_to_mp3 to a file, then upload the file
+    pipelined   iter_mp3_chunks fed into the upload request as it encodes
+
+The fake server throttles uploads to --bandwidth MB/s, since loopback
+transfers would otherwise hide the network time being overlapped.
+
+    python scripts/bench_pipelined_upload.py --bandwidth 2
+"""
+import argparse
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+import os
+
+from scripts.fake_assemblyai import serve_in_thread
+from scripts.transcribe import upload_stream, _configure
+from utils.convert import convert_to_mp3, iter_mp3_chunks
+
+from assemblyai import api as aai_api
+from assemblyai.client import Client
+
+FAKE_PORT = 8021
+SIZES_MB = (10, 50, 100)
+WAV_BYTES_PER_SECOND = 44100 * 2 * 2  # 44.1kHz stereo 16-bit
+
+
+def make_wav(path: Path, size_mb: int):
+    """Noise is the worst case for the encoder, so conversion time is not understated"""
+    seconds = size_mb * 1024 * 1024 / WAV_BYTES_PER_SECOND
+    subprocess.run([
+        "ffmpeg", "-y", "-hide_banner", "-loglevel", "error",
+        "-f", "lavfi", "-i", f"anoisesrc=d={seconds:.2f}:r=44100",
+        "-ac", "2", "-c:a", "pcm_s16le", str(path)
+    ], check=True)
+
+
+def sequential(input_path: Path, workdir: Path, bitrate: str) -> float:
+    started = time.perf_counter()
+    mp3_path = workdir / f"{input_path.stem}.mp3"
+    convert_to_mp3(input_path, mp3_path, bitrate=bitrate)
+    with open(mp3_path, "rb") as audio:
+        aai_api.upload_file(Client.get_default().http_client, audio)
+    elapsed = time.perf_counter() - started
+    mp3_path.unlink()
+    return elapsed
+
+
+def pipelined(input_path: Path, bitrate: str) -> float:
+    started = time.perf_counter()
+    upload_stream(iter_mp3_chunks(input_path, bitrate), "fake")
+    return time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Pipelined upload benchmark")
+    parser.add_argument("--bandwidth", type=float, default=2.0, help="fake upload bandwidth in MB/s")
+    parser.add_argument("--bitrate", default="128k")
+    parser.add_argument("--sizes", type=int, nargs="+", default=SIZES_MB, help="input sizes in MB")
+    args = parser.parse_args()
+
+    server, base_url = serve_in_thread(FAKE_PORT, upload_bandwidth=args.bandwidth * 1024 * 1024)
+    os.environ["AAI_BASE_URL"] = base_url
+    _configure("fake")
+
+    print(f"{'input':>8} {'sequential':>12} {'pipelined':>12} {'saved':>8}")
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            workdir = Path(tmp)
+            for size_mb in args.sizes:
+                input_path = workdir / f"input_{size_mb}mb.wav"
+                make_wav(input_path, size_mb)
+                seq = sequential(input_path, workdir, args.bitrate)
+                pipe = pipelined(input_path, args.bitrate)
+                print(f"{size_mb:>6}MB {seq:>11.2f}s {pipe:>11.2f}s {(1 - pipe / seq) * 100:>7.1f}%")
+                input_path.unlink()
+    finally:
+        server.should_exit = True
+
+
+if __name__ == "__main__":
+    main()
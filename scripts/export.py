@@ -1,13 +1,46 @@
 import json
 from pathlib import Path
+from typing import BinaryIO, Optional
+
+# Exporters serialize a finished transcription once, in memory; the API
+# stores or streams the result directly and only the CLI writes files.
+
+
+def transcript_json(job, indent: Optional[int] = None) -> Optional[str]:
+    """Full AssemblyAI response as JSON text (None when the job has none)"""
+    if getattr(job, "json_response", None) is None:
+        return None
+    return json.dumps(job.json_response, indent=indent, ensure_ascii=False)
+
+
+def transcript_txt(job) -> str:
+    """One "speaker ▶ text" line per utterance"""
+    return "".join(f"{utt.speaker} ▶ {utt.text}\n" for utt in job.utterances)
+
+
+EXPORTERS = {
+    "json": lambda job: transcript_json(job, indent=2),
+    "txt": transcript_txt,
+}
+
+
+def export_transcript(job, fmt: str, stream: BinaryIO = None) -> bytes:
+    """Serialize `job` as `fmt` to UTF-8 bytes, written to `stream` when given"""
+    text = EXPORTERS[fmt](job)
+    if text is None:
+        raise ValueError(f"Nothing to export as {fmt}: the transcription has no response")
+    data = text.encode("utf-8")
+    if stream is not None:
+        stream.write(data)
+    return data
+
 
 def save_transcript_json(job, output_path: Path):
-    with open(output_path, "w", encoding="utf-8") as f:
-        json.dump(job.json_response, f, indent=2, ensure_ascii=False)
+    # Serialized first: no empty file is left behind when there is nothing to export
+    output_path.write_bytes(export_transcript(job, "json"))
     print(f"📄 Export JSON : {output_path.name}")
 
+
 def save_transcript_txt(job, output_path: Path):
-    with open(output_path, "w", encoding="utf-8") as f:
-        for utt in job.utterances:
-            f.write(f"{utt.speaker} ▶ {utt.text}\n")
-    print(f"📄 Export TXT : {output_path.name}")
\ No newline at end of file
+    output_path.write_bytes(export_transcript(job, "txt"))
+    print(f"📄 Export TXT : {output_path.name}")
@@ -0,0 +1,150 @@
+"""
+Local stand-in for the AssemblyAI REST API, for offline testing.
+
+Implements just enough of /v2/upload and /v2/transcript for the SDK calls
+made by scripts/transcribe.py, including webhook delivery. Point the app at
+it with AAI_BASE_URL:
+
+    python scripts/fake_assemblyai.py --port 8001
+    AAI_BASE_URL=http://127.0.0.1:8001 AAI_API_KEY=fake uvicorn api.app:app
+"""
+import argparse
+import asyncio
+import threading
+import time
+import uuid
+
+import httpx
+from fastapi import FastAPI, HTTPException, Request
+
+# Seconds a fake job spends "processing" per second of audio, and the audio
+# length assumed per uploaded megabyte (96 kbps MP3)
+REALTIME_FACTOR = 0.25
+SECONDS_PER_MB = 1024 * 1024 * 8 / 96000
+
+
+def create_app(realtime_factor: float = REALTIME_FACTOR, min_processing: float = 0.5,
+               upload_bandwidth: float = None) -> FastAPI:
+    """`upload_bandwidth` (bytes/s) throttles /v2/upload to mimic a real uplink"""
+    app = FastAPI(title="Fake AssemblyAI")
+    app.state.uploads = {}
+    app.state.transcripts = {}
+    app.state.stats = {"uploads": 0, "uploaded_bytes": 0, "submits": 0, "polls": 0, "webhooks": 0}
+    lock = threading.Lock()
+
+    def fake_result(transcript_id: str, audio_duration: float) -> dict:
+        end = max(int(audio_duration * 1000), 2000)
+        half = end // 2
+        utterances = [
+            {"speaker": "A", "text": "Bonjour, ceci est un test.", "start": 0, "end": half, "confidence": 0.95,
+             "words": [{"text": "Bonjour,", "start": 0, "end": half // 2, "confidence": 0.95, "speaker": "A"},
+                       {"text": "ceci est un test.", "start": half // 2, "end": half, "confidence": 0.95, "speaker": "A"}]},
+            {"speaker": "B", "text": "Très bien, merci.", "start": half, "end": end, "confidence": 0.93,
+             "words": [{"text": "Très bien, merci.", "start": half, "end": end, "confidence": 0.93, "speaker": "B"}]},
+        ]
+        return {
+            "text": " ".join(u["text"] for u in utterances),
+            "utterances": utterances,
+            "words": [w for u in utterances for w in u["words"]],
+            "confidence": 0.94,
+            "audio_duration": int(audio_duration),
+        }
+
+    def complete(transcript_id: str):
+        with lock:
+            record = app.state.transcripts[transcript_id]
+            record.update(fake_result(transcript_id, record.pop("_audio_duration")))
+            record["status"] = "completed"
+            webhook_url = record.get("webhook_url")
+            headers = {}
+            if record.get("webhook_auth_header_name"):
+                headers[record["webhook_auth_header_name"]] = record.get("webhook_auth_header_value") or ""
+
+        if webhook_url:
+            try:
+                response = httpx.post(webhook_url, json={"transcript_id": transcript_id, "status": "completed"},
+                                      headers=headers, timeout=10)
+                record["webhook_status_code"] = response.status_code
+                with lock:
+                    app.state.stats["webhooks"] += 1
+            except httpx.HTTPError as e:
+                print(f"[FAKE AAI] Webhook delivery failed: {e}")
+
+    @app.post("/v2/upload")
+    async def upload(request: Request):
+        size = 0
+        async for chunk in request.stream():
+            size += len(chunk)
+            if upload_bandwidth:
+                await asyncio.sleep(len(chunk) / upload_bandwidth)
+        upload_id = uuid.uuid4().hex
+        with lock:
+            app.state.uploads[upload_id] = size
+            app.state.stats["uploads"] += 1
+            app.state.stats["uploaded_bytes"] += size
+        return {"upload_url": f"{request.base_url}files/{upload_id}"}
+
+    @app.post("/v2/transcript")
+    async def submit(request: Request):
+        body = await request.json()
+        audio_url = body.get("audio_url", "")
+        size = app.state.uploads.get(audio_url.rstrip("/").rsplit("/", 1)[-1], 1024 * 1024)
+        audio_duration = size / (1024 * 1024) * SECONDS_PER_MB
+
+        transcript_id = uuid.uuid4().hex
+        record = dict(body)
+        record.update({"id": transcript_id, "status": "queued", "_audio_duration": audio_duration})
+        with lock:
+            app.state.transcripts[transcript_id] = record
+            app.state.stats["submits"] += 1
+
+        timer = threading.Timer(max(min_processing, audio_duration * realtime_factor), complete, args=(transcript_id,))
+        timer.daemon = True
+        timer.start()
+        return _public(record)
+
+    @app.get("/v2/transcript/{transcript_id}")
+    async def get_transcript(transcript_id: str):
+        with lock:
+            record = app.state.transcripts.get(transcript_id)
+            app.state.stats["polls"] += 1
+        if record is None:
+            raise HTTPException(status_code=404, detail="Transcript not found")
+        if record["status"] == "queued":
+            record["status"] = "processing"
+        return _public(record)
+
+    @app.get("/stats")
+    async def stats():
+        return app.state.stats
+
+    return app
+
+
+def _public(record: dict) -> dict:
+    return {key: value for key, value in record.items() if not key.startswith("_")}
+
+
+def serve_in_thread(port: int = 8001, **kwargs):
+    """Start the fake server in a daemon thread; returns (server, base_url)"""
+    import uvicorn
+
+    server = uvicorn.Server(uvicorn.Config(create_app(**kwargs), host="127.0.0.1", port=port, log_level="warning"))
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    while not server.started:
+        time.sleep(0.05)
+    return server, f"http://127.0.0.1:{port}"
+
+
+if __name__ == "__main__":
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description="Fake AssemblyAI server")
+    parser.add_argument("--port", type=int, default=8001)
+    parser.add_argument("--realtime-factor", type=float, default=REALTIME_FACTOR)
+    parser.add_argument("--upload-bandwidth", type=float, default=None, help="MB/s accepted by /v2/upload")
+    args = parser.parse_args()
+    bandwidth = args.upload_bandwidth * 1024 * 1024 if args.upload_bandwidth else None
+    uvicorn.run(create_app(realtime_factor=args.realtime_factor, upload_bandwidth=bandwidth),
+                host="127.0.0.1", port=args.port)
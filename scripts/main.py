@@ -34,7 +34,7 @@ def main(m4a_file: str, quality: str = "high"):
     txt_path = OUTPUT_DIR / f"{base_name}.txt"
 
     convert_to_mp3(input_path, mp3_path, bitrate=bitrate)
-    job = transcribe_audio(str(mp3_path), api_key)
+    job = transcribe_audio(str(mp3_path), api_key, progress=True)
     save_transcript_json(job, json_path)
     save_transcript_txt(job, txt_path)
 
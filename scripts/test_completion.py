@@ -0,0 +1,77 @@
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+import os
+import uvicorn
+from fastapi import FastAPI, Request
+
+from scripts.fake_assemblyai import serve_in_thread
+from scripts import transcribe
+
+FAKE_PORT = 8011
+RECEIVER_PORT = 8012
+
+
+def _start_webhook_receiver():
+    receiver = FastAPI()
+
+    @receiver.post("/webhooks/assemblyai")
+    async def webhook(request: Request):
+        payload = await request.json()
+        transcribe.notify_completion(payload["transcript_id"])
+        return {"status": "ok"}
+
+    server = uvicorn.Server(uvicorn.Config(receiver, host="127.0.0.1", port=RECEIVER_PORT, log_level="warning"))
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.05)
+    return server
+
+
+def test_completion_modes():
+    fake, base_url = serve_in_thread(FAKE_PORT, min_processing=1.0)
+    receiver = _start_webhook_receiver()
+    os.environ["AAI_BASE_URL"] = base_url
+
+    try:
+        with tempfile.NamedTemporaryFile(suffix=".mp3") as audio:
+            audio.write(b"\0" * 64 * 1024)
+            audio.flush()
+
+            # Polling with backoff
+            strategy = transcribe.ExponentialBackoff(initial=0.2, factor=2.0)
+            job = transcribe.submit_audio(audio.name, "fake", strategy=strategy)
+            job = transcribe.wait_for_completion(job, strategy=strategy)
+            assert job.status.value == "completed"
+            assert job.utterances and job.utterances[0].speaker == "A"
+            print(f"Polling: completed after {fake.config.app.state.stats['polls']} polls")
+
+            # Webhook: no polling until the callback arrives
+            polls_before = fake.config.app.state.stats["polls"]
+            strategy = transcribe.WebhookCompletion(
+                f"http://127.0.0.1:{RECEIVER_PORT}/webhooks/assemblyai", secret="s3cret", fallback_interval=30
+            )
+            started = time.time()
+            job = transcribe.submit_audio(audio.name, "fake", strategy=strategy)
+            job = transcribe.wait_for_completion(job, strategy=strategy)
+            assert job.status.value == "completed"
+            assert time.time() - started < 30, "webhook did not wake the waiter"
+            assert fake.config.app.state.stats["polls"] - polls_before == 1
+            assert fake.config.app.state.stats["webhooks"] == 1
+            print("Webhook: completed with a single status fetch")
+
+        print("Test passed successfully!")
+    finally:
+        os.environ.pop("AAI_BASE_URL", None)
+        fake.should_exit = True
+        receiver.should_exit = True
+
+
+if __name__ == "__main__":
+    test_completion_modes()
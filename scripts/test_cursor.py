@@ -0,0 +1,103 @@
+import sys
+from datetime import datetime
+from pathlib import Path
+from types import SimpleNamespace
+
+# Add parent directory to path
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from fastapi import HTTPException
+from fastapi.testclient import TestClient
+
+from api.app import app, _decode_cursor, _encode_cursor
+from api.auth import create_access_token
+from api.database import init_db, SessionLocal, User, Transcript
+
+TEST_EMAIL = "test_cursor_user@example.com"
+
+
+def test_cursor_round_trip():
+    created_at = datetime(2024, 5, 1, 12, 30, 15, 123456)
+    cursor = _encode_cursor(SimpleNamespace(created_at=created_at, id=42))
+    assert "=" not in cursor and "|" not in cursor
+    assert _decode_cursor(cursor) == (created_at, 42)
+    # Whole seconds have no fraction in isoformat()
+    assert _decode_cursor(_encode_cursor(SimpleNamespace(created_at=created_at.replace(microsecond=0), id=7))) \
+        == (created_at.replace(microsecond=0), 7)
+
+    for bad in ("not a cursor", "", "MjAyNA", _encode_cursor(SimpleNamespace(created_at=created_at, id="x"))):
+        try:
+            _decode_cursor(bad)
+        except HTTPException as e:
+            assert e.status_code == 400
+        else:
+            raise AssertionError(f"{bad!r} was accepted")
+    print("Cursor: round trip, invalid cursors rejected with 400")
+
+
+def test_cursor_ties():
+    init_db()
+    db = SessionLocal()
+
+    try:
+        user = db.query(User).filter(User.email == TEST_EMAIL).first()
+        if not user:
+            user = User(email=TEST_EMAIL, hashed_password="hashed_password")
+            db.add(user)
+            db.commit()
+        db.query(Transcript).filter(Transcript.user_id == user.id).delete()
+
+        # Seven transcripts, five of them created at the same instant
+        same = datetime(2024, 5, 1, 12, 0, 0)
+        times = [datetime(2024, 5, 2), same, same, same, same, same, datetime(2024, 4, 30)]
+        for index, created_at in enumerate(times):
+            db.add(Transcript(transcript_id=f"test_cursor_{index}", user_id=user.id, filename=f"t{index}.mp3",
+                              text_content="A: hello", created_at=created_at))
+        db.commit()
+        expected = [t.id for t in db.query(Transcript).filter(Transcript.user_id == user.id)
+                    .order_by(Transcript.created_at.desc(), Transcript.id.desc())]
+
+        client = TestClient(app)
+        headers = {"Authorization": f"Bearer {create_access_token(user.email, user.id)}"}
+        for limit in (1, 2, 3):
+            seen, cursor = [], None
+            while True:
+                params = {"limit": limit, **({"cursor": cursor} if cursor else {})}
+                page = client.get("/transcripts/list", params=params, headers=headers)
+                assert page.status_code == 200, page.text
+                page = page.json()
+                seen += [t["id"] for t in page["transcripts"]]
+                cursor = page["next_cursor"]
+                if cursor is None:
+                    break
+            # Every row once, in order, even when a page ends inside the run of equal created_at
+            assert seen == expected, (limit, seen, expected)
+        print("Cursor: pages split inside equal created_at, no row skipped or repeated")
+
+        # Rows inserted after a page was served do not shift the next one
+        first = client.get("/transcripts/list", params={"limit": 3}, headers=headers).json()
+        db.add(Transcript(transcript_id="test_cursor_new", user_id=user.id, filename="new.mp3",
+                          text_content="A: hello", created_at=same))
+        db.commit()
+        rest = client.get("/transcripts/list", params={"limit": 10, "cursor": first["next_cursor"]},
+                          headers=headers).json()
+        assert [t["id"] for t in first["transcripts"] + rest["transcripts"]] == expected
+        print("Cursor: later inserts do not shift the following pages")
+
+        assert client.get("/transcripts/list", params={"cursor": "garbage"}, headers=headers).status_code == 400
+        print("Test passed successfully!")
+
+    except Exception as e:
+        print(f"Test failed: {e}")
+        raise
+    finally:
+        # Clean up
+        db.rollback()
+        db.query(Transcript).filter(Transcript.transcript_id.like("test_cursor_%")).delete(synchronize_session=False)
+        db.commit()
+        db.close()
+
+
+if __name__ == "__main__":
+    test_cursor_round_trip()
+    test_cursor_ties()
@@ -0,0 +1,120 @@
+import sys
+import threading
+import time
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from api.scheduler import FairExecutor, FairQueue, FairSemaphore
+
+
+def _drain(queue):
+    return [queue.pop()[3] for _ in range(len(queue))]
+
+
+def test_finish_tag_order():
+    # Virtual finish tags: A (3 x 600s) gets 600, 1200, 1800; B arrives later with 60s and gets 60
+    queue = FairQueue("fair")
+    for i in range(3):
+        queue.push("A", 600, item_id=f"A{i}")
+    queue.push("B", 60, item_id="B0")
+    assert queue.ahead("B0") == []
+    assert queue.ahead("A2") == [60, 600, 600]
+    assert _drain(queue) == ["B0", "A0", "A1", "A2"]
+    print("Finish tags: a short upload goes ahead of another user's backlog")
+
+    # Weight 2 halves the cost: C's 400s tag at 200, before A's 300s
+    queue = FairQueue("fair")
+    queue.push("A", 300, item_id="A0")
+    queue.push("C", 400, item_id="C0", weight=2)
+    assert _drain(queue) == ["C0", "A0"]
+    print("Finish tags: weights scale the cost")
+
+    # The virtual clock follows the served entries: a flow idle so far starts at the clock,
+    # behind what was served already but ahead of the rest of the backlog
+    queue = FairQueue("fair")
+    for i in range(4):
+        queue.push("A", 600, item_id=f"A{i}")
+    assert [queue.pop()[3] for _ in range(2)] == ["A0", "A1"]
+    late = queue.push("L", 100, item_id="L0")
+    assert late[0] == 700, late[0]  # start 600 (A1's start) + 100
+    assert _drain(queue) == ["L0", "A2", "A3"]
+    print("Finish tags: late flows start at the virtual clock")
+
+    # Equal tags keep submission order
+    queue = FairQueue("fair")
+    for flow in ("X", "Y", "Z"):
+        queue.push(flow, 120, item_id=flow)
+    assert _drain(queue) == ["X", "Y", "Z"]
+
+
+def test_other_policies():
+    queue = FairQueue("sjf")
+    for item_id, cost in (("long", 3600), ("short", 30), ("mid", 600)):
+        queue.push("A", cost, item_id=item_id)
+    assert _drain(queue) == ["short", "mid", "long"]
+
+    queue = FairQueue("deadline", deadline_base=60, deadline_factor=0.5)
+    queue.push("A", 7200, item_id="long")  # due after 3660s
+    queue.push("B", 30, item_id="short")  # due after 75s
+    assert _drain(queue) == ["short", "long"]
+    print("Policies: sjf and deadline order by cost and due time")
+
+
+def test_executor_order():
+    order = []
+    executor = FairExecutor(workers=1, name="test")
+    gate = threading.Event()
+    executor.submit(gate.wait, flow="warm", cost=1)
+    # The worker is busy before anything else is queued
+    while executor.stats()["running"] == 0:
+        time.sleep(0.005)
+    for i in range(4):
+        executor.submit(order.append, f"A{i}", flow="A", item_id=f"A{i}", cost=600)
+    done = executor.submit(order.append, "B0", flow="B", item_id="B0", cost=60)
+    assert executor.position("B0") == 0
+    assert executor.position("A3") == 4
+    gate.set()
+    done.result(timeout=5)
+    while len(order) < 5:
+        time.sleep(0.01)
+    assert order == ["B0", "A0", "A1", "A2", "A3"], order
+    print("Executor: runs queued work in tag order")
+
+
+def test_semaphore_order():
+    semaphore = FairSemaphore(1, name="test")
+    granted = []
+    held = semaphore.acquire("warm", cost=1)
+
+    def wait_for_slot(flow, item_id, cost):
+        with semaphore.slot(flow, item_id=item_id, cost=cost):
+            granted.append(item_id)
+
+    waiters = [("A", "A0", 600), ("A", "A1", 600), ("A", "A2", 600), ("B", "B0", 60)]
+    threads = []
+    for flow, item_id, cost in waiters:
+        thread = threading.Thread(target=wait_for_slot, args=(flow, item_id, cost))
+        thread.start()
+        threads.append(thread)
+        # Queue the waiters one after another
+        while semaphore.position(item_id) is None:
+            time.sleep(0.005)
+
+    assert semaphore.stats()["queued"] == 4
+    semaphore.release(held)
+    for thread in threads:
+        thread.join(timeout=5)
+    assert granted == ["B0", "A0", "A1", "A2"], granted
+    stats = semaphore.stats()
+    assert stats["running"] == 0 and stats["completed"] == 5
+    print("Semaphore: grants slots in tag order")
+
+
+if __name__ == "__main__":
+    test_finish_tag_order()
+    test_other_policies()
+    test_executor_order()
+    test_semaphore_order()
+    print("Test passed successfully!")
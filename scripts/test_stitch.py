@@ -0,0 +1,82 @@
+import sys
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from scripts.transcribe import stitch_transcripts
+
+
+def _utterance(speaker, start, end, text):
+    """An AssemblyAI utterance (times in ms, relative to its chunk) with evenly spread words"""
+    words = text.split()
+    step = (end - start) // len(words)
+    return {
+        "speaker": speaker, "start": start, "end": end, "text": text,
+        "words": [{"text": w, "speaker": speaker, "start": start + i * step, "end": start + (i + 1) * step - 50}
+                  for i, w in enumerate(words)],
+    }
+
+
+def test_speaker_relabelling():
+    # Chunk 0 covers 0-60s (+10s of overlap): Alice is A, Bob is B
+    first = {"utterances": [
+        _utterance("A", 0, 30000, "alice opens the meeting"),
+        _utterance("B", 30000, 59000, "bob answers her"),
+        _utterance("A", 60000, 64000, "alice in the overlap"),
+        _utterance("B", 64500, 69500, "bob in the overlap too"),
+    ]}
+    # Chunk 1 starts at 60s and was labelled on its own: Bob is A, Alice is C, and Carol (B) is new
+    second = {"utterances": [
+        _utterance("C", 0, 4000, "alice in the overlap"),
+        _utterance("A", 4500, 9500, "bob in the overlap too"),
+        _utterance("B", 12000, 15000, "carol joins"),
+        _utterance("C", 16000, 20000, "alice welcomes carol"),
+    ]}
+
+    merged = stitch_transcripts([(first, 0, 60), (second, 60, float("inf"))])
+
+    assert [(u["speaker"], u["start"], u["text"]) for u in merged] == [
+        ("A", 0, "alice opens the meeting"),
+        ("B", 30000, "bob answers her"),
+        ("A", 60000, "alice in the overlap"),
+        ("B", 64500, "bob in the overlap too"),
+        ("C", 72000, "carol joins"),
+        ("A", 76000, "alice welcomes carol"),
+    ], merged
+    print("Stitching: overlap kept once, from the next chunk, at global times")
+
+    for utterance in merged:
+        assert {w["speaker"] for w in utterance["words"]} == {utterance["speaker"]}, utterance
+        assert utterance["start"] <= utterance["words"][0]["start"] < utterance["end"]
+    print("Stitching: speakers matched across the overlap, new speakers get a free label")
+
+
+def test_three_chunks():
+    # Each chunk swaps the labels again: matching is chained from chunk to chunk.
+    # A chunk opens with the previous one's 10s overlap and ends with the next one's
+    def chunk(alice, bob):
+        return {"utterances": [
+            _utterance(alice, 0, 4000, "alice overlaps"),
+            _utterance(bob, 5000, 9000, "bob overlaps"),
+            _utterance(alice, 10000, 30000, "alice speaks again"),
+            _utterance(bob, 30000, 49000, "bob speaks again"),
+            _utterance(alice, 50000, 54000, "alice overlaps"),
+            _utterance(bob, 55000, 59000, "bob overlaps"),
+        ]}
+
+    merged = stitch_transcripts([(chunk("A", "B"), 0, 50), (chunk("B", "A"), 50, 100),
+                                 (chunk("A", "B"), 100, float("inf"))])
+    assert [u["speaker"] for u in merged] == ["A", "B"] * 7, [u["speaker"] for u in merged]
+    assert [u["start"] for u in merged] == [
+        0, 5000, 10000, 30000,
+        50000, 55000, 60000, 80000,
+        100000, 105000, 110000, 130000, 150000, 155000,
+    ]
+    print("Stitching: labels stay consistent over three chunks")
+
+
+if __name__ == "__main__":
+    test_speaker_relabelling()
+    test_three_chunks()
+    print("Test passed successfully!")
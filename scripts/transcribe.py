@@ -1,25 +1,423 @@
+import os
 import time
+import threading
+from collections import OrderedDict, defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import nullcontext
+from types import SimpleNamespace
 import assemblyai as aai
 from assemblyai import TranscriptionConfig, Transcriber
+from assemblyai import api as aai_api
+from assemblyai.client import Client
 from tqdm import tqdm
 
-def transcribe_audio(audio_path: str, api_key: str):
+# Header AssemblyAI echoes back on webhook calls so we can authenticate them
+WEBHOOK_AUTH_HEADER = "X-Webhook-Secret"
+
+# Options sent with every job; they also key the dedup cache (see settings_key)
+TRANSCRIPTION_SETTINGS = {"speaker_labels": True, "language_code": "fr"}
+
+# Rough AssemblyAI turnaround: processing time as a fraction of audio length
+EXPECTED_REALTIME_FACTOR = float(os.getenv("AAI_EXPECTED_RTF", "0.25"))
+
+
+def _configure(api_key: str):
     aai.settings.api_key = api_key
-    config = TranscriptionConfig(speaker_labels=True, language_code="fr")
+    # Point the SDK at a stand-in server (see scripts/fake_assemblyai.py)
+    base_url = os.getenv("AAI_BASE_URL")
+    if base_url:
+        aai.settings.base_url = base_url
+
+
+def settings_key() -> str:
+    """Stable string for the settings that change what AssemblyAI returns"""
+    return ";".join(f"{key}={value}" for key, value in sorted(TRANSCRIPTION_SETTINGS.items()))
+
+
+def fetch_transcript(transcript_id: str):
+    """Fetch the current state of a job with a single status request"""
+    # aai.Transcript.get_by_id would block and poll on its own fixed interval
+    client = Client.get_default()
+    response = aai_api.get_transcript(client.http_client, transcript_id)
+    return aai.Transcript.from_response(client=client, response=response)
+
+
+def _is_finished(job) -> bool:
+    return job.status.value in ("completed", "error")
+
+
+class CompletionStrategy:
+    """Decides how a submitted job is followed until it finishes"""
+
+    def configure(self, config: TranscriptionConfig):
+        """Adjust the transcription config before the job is submitted"""
+
+    def delays(self):
+        """Yield the number of seconds to sleep before each status check"""
+        raise NotImplementedError
+
+    def sleep(self, job, delay: float):
+        time.sleep(delay)
+
+    def wait(self, job, progress: bool = False):
+        pbar = tqdm(desc="📡 Transcription en cours", unit="step") if progress else None
+        try:
+            for delay in self.delays():
+                if _is_finished(job):
+                    break
+                if pbar:
+                    pbar.update(1)
+                self.sleep(job, delay)
+                job = fetch_transcript(job.id)
+        finally:
+            if pbar:
+                pbar.close()
+        return job
+
+
+class FixedPolling(CompletionStrategy):
+    """Check every `interval` seconds (the historical behaviour)"""
+
+    def __init__(self, interval: float = 3.0):
+        self.interval = interval
+
+    def delays(self):
+        while True:
+            yield self.interval
+
+
+class ExponentialBackoff(CompletionStrategy):
+    """Start with short checks and back off geometrically up to `max_interval`"""
+
+    def __init__(self, initial: float = 3.0, factor: float = 1.5, max_interval: float = 60.0):
+        self.initial = initial
+        self.factor = factor
+        self.max_interval = max_interval
+
+    def delays(self):
+        delay = self.initial
+        while True:
+            yield delay
+            delay = min(delay * self.factor, self.max_interval)
+
+
+class DurationAwareBackoff(ExponentialBackoff):
+    """
+    Skip the checks that cannot succeed: the first one happens once the job
+    is expected to be done given the audio length, then back off from there.
+    """
+
+    def __init__(self, audio_duration: float, realtime_factor: float = EXPECTED_REALTIME_FACTOR,
+                 min_interval: float = 3.0, max_interval: float = 60.0):
+        super().__init__(initial=min_interval, max_interval=max_interval)
+        self.audio_duration = audio_duration
+        self.realtime_factor = realtime_factor
+
+    def delays(self):
+        expected = self.audio_duration * self.realtime_factor
+        yield max(self.initial, expected)
+        # Past the estimate, retry soon and then back off again
+        delay = max(self.initial, expected * 0.1)
+        while True:
+            yield min(delay, self.max_interval)
+            delay = min(delay * self.factor, self.max_interval)
+
+
+# transcript id -> threading.Event, set by the webhook receiver
+_webhook_events = OrderedDict()
+_webhook_lock = threading.Lock()
+_MAX_PENDING_WEBHOOKS = 4096
+
+
+def _webhook_event(transcript_id: str) -> threading.Event:
+    with _webhook_lock:
+        event = _webhook_events.get(transcript_id)
+        if event is None:
+            event = _webhook_events[transcript_id] = threading.Event()
+            # Notifications for jobs owned by another process are never claimed
+            while len(_webhook_events) > _MAX_PENDING_WEBHOOKS:
+                _webhook_events.popitem(last=False)
+        return event
+
+
+def notify_completion(transcript_id: str):
+    """Wake up whoever is waiting on `transcript_id` (called by the webhook endpoint)"""
+    _webhook_event(transcript_id).set()
+
+
+class WebhookCompletion(CompletionStrategy):
+    """
+    Let AssemblyAI call us back instead of polling. A slow fallback poll
+    covers lost webhooks and callbacks delivered to another API process.
+    """
+
+    def __init__(self, webhook_url: str, secret: str = None, fallback_interval: float = 120.0):
+        self.webhook_url = webhook_url
+        self.secret = secret
+        self.fallback_interval = fallback_interval
+
+    def configure(self, config: TranscriptionConfig):
+        if self.secret:
+            config.set_webhook(self.webhook_url, WEBHOOK_AUTH_HEADER, self.secret)
+        else:
+            config.set_webhook(self.webhook_url)
+
+    def delays(self):
+        while True:
+            yield self.fallback_interval
+
+    def sleep(self, job, delay: float):
+        _webhook_event(job.id).wait(delay)
+
+    def wait(self, job, progress: bool = False):
+        try:
+            return super().wait(job, progress=progress)
+        finally:
+            with _webhook_lock:
+                _webhook_events.pop(job.id, None)
+
+
+def get_completion_strategy(audio_duration: float = None) -> CompletionStrategy:
+    """
+    Build the strategy selected by AAI_COMPLETION_MODE:
+    fixed, exponential, duration (default) or webhook.
+    """
+    mode = os.getenv("AAI_COMPLETION_MODE", "duration").lower()
+
+    if mode == "webhook":
+        webhook_url = os.getenv("AAI_WEBHOOK_URL")
+        if not webhook_url:
+            raise EnvironmentError("AAI_WEBHOOK_URL is required when AAI_COMPLETION_MODE=webhook")
+        return WebhookCompletion(webhook_url, secret=os.getenv("AAI_WEBHOOK_SECRET"))
+    if mode == "fixed":
+        return FixedPolling()
+    if mode == "duration" and audio_duration:
+        return DurationAwareBackoff(audio_duration)
+    return ExponentialBackoff()
+
+
+def submit_audio(audio, api_key: str, strategy: CompletionStrategy = None):
+    """
+    Upload the audio and submit the transcription job without waiting.
+    `audio` is a local path or a binary file object (e.g. an in-memory MP3).
+    """
+    _configure(api_key)
+    config = TranscriptionConfig(**TRANSCRIPTION_SETTINGS)
+    if strategy:
+        strategy.configure(config)
     transcriber = Transcriber()
 
-    print("⬆️ Uploading and transcribing...")
-    job = transcriber.transcribe(audio_path, config=config)
+    if isinstance(audio, str) and audio.startswith(("http://", "https://")):
+        print("📨 Submitting transcription job...")
+    else:
+        print("⬆️ Uploading and transcribing...")
+    job = transcriber.submit(audio, config=config)
 
     print(f"🕐 Job ID: {job.id}")
-    with tqdm(desc="📡 Transcription en cours", unit="step") as pbar:
-        while job.status.value not in ("completed", "error"):
-            pbar.update(1)
-            time.sleep(3)
-            job.refresh()
+    return job
+
+
+def upload_audio(audio, api_key: str) -> str:
+    """Upload a local path or binary file object and return its AssemblyAI URL"""
+    _configure(api_key)
+    client = Client.get_default()
+
+    print("⬆️ Uploading...")
+    if isinstance(audio, str):
+        with open(audio, "rb") as audio_file:
+            return aai_api.upload_file(client.http_client, audio_file)
+    return aai_api.upload_file(client.http_client, audio)
+
+
+def resume_transcript(transcript_id: str, api_key: str, strategy: CompletionStrategy = None):
+    """Follow a job submitted earlier (e.g. before a restart) until it finishes"""
+    _configure(api_key)
+    print(f"🔁 Resuming job {transcript_id}")
+    return wait_for_completion(fetch_transcript(transcript_id), strategy=strategy)
+
+
+def upload_stream(chunks, api_key: str) -> str:
+    """
+    Upload audio that is still being produced (an iterator of bytes, e.g.
+    ffmpeg output) and return its AssemblyAI URL. The request body is sent
+    chunk by chunk as they arrive, so encoding and transfer overlap.
+    """
+    _configure(api_key)
+    client = Client.get_default()
+
+    print("⬆️ Uploading while converting...")
+    return aai_api.upload_file(client.http_client, chunks)
+
+
+def wait_for_completion(job, strategy: CompletionStrategy = None, progress: bool = False):
+    """Follow a submitted job until AssemblyAI reports it completed or failed."""
+    strategy = strategy or get_completion_strategy()
+    job = strategy.wait(job, progress=progress)
 
     if job.status.value == "error":
         raise RuntimeError("❌ Transcription échouée.")
 
     print("✅ Transcription terminée")
     return job
+
+
+def transcribe_audio(audio, api_key: str, audio_duration: float = None, progress: bool = False):
+    strategy = get_completion_strategy(audio_duration)
+    job = submit_audio(audio, api_key, strategy=strategy)
+    return wait_for_completion(job, strategy=strategy, progress=progress)
+
+
+class TranscriptionResult:
+    """
+    Backend-neutral transcript. Utterances are dicts with speaker, text,
+    start/end (ms), confidence and words; they are exposed as attributes
+    like on an AssemblyAI transcript. `json_response` is what gets stored.
+    """
+
+    def __init__(self, transcript_id, utterances, text=None, audio_duration=None,
+                 backend="assemblyai", json_response=None, **extra):
+        self.id = transcript_id
+        self.backend = backend
+        self.status = SimpleNamespace(value="completed")
+        self.text = text if text is not None else " ".join(u["text"] for u in utterances)
+        self.utterances = [SimpleNamespace(**u) for u in utterances]
+        self.json_response = json_response or {
+            "id": transcript_id,
+            "status": "completed",
+            "text": self.text,
+            "utterances": utterances,
+            "words": [w for u in utterances for w in u.get("words") or []],
+            "audio_duration": audio_duration,
+            "backend": backend,
+            **extra,
+        }
+
+    @classmethod
+    def from_assemblyai(cls, job):
+        """Wrap a completed AssemblyAI transcript, keeping its full JSON"""
+        response = job.json_response
+        return cls(job.id, response.get("utterances") or [], text=response.get("text"),
+                   audio_duration=response.get("audio_duration"), json_response=response)
+
+
+def _shift(utterance: dict, offset_ms: int) -> dict:
+    shifted = dict(utterance, start=utterance["start"] + offset_ms, end=utterance["end"] + offset_ms)
+    shifted["words"] = [dict(w, start=w["start"] + offset_ms, end=w["end"] + offset_ms)
+                        for w in utterance.get("words") or []]
+    return shifted
+
+
+def _speaker_overlap(previous: list, current: list, window_start: int, window_end: int) -> dict:
+    """
+    Milliseconds during which each (previous speaker, current speaker) pair
+    talk at the same time within the shared window, from word timings.
+    """
+    def words_in_window(utterances):
+        return [(w.get("speaker") or u["speaker"], max(w["start"], window_start), min(w["end"], window_end))
+                for u in utterances for w in u.get("words") or []
+                if w["end"] > window_start and w["start"] < window_end]
+
+    scores = defaultdict(int)
+    current_words = words_in_window(current)
+    for prev_speaker, prev_start, prev_end in words_in_window(previous):
+        for cur_speaker, cur_start, cur_end in current_words:
+            shared = min(prev_end, cur_end) - max(prev_start, cur_start)
+            if shared > 0:
+                scores[(prev_speaker, cur_speaker)] += shared
+    return scores
+
+
+def _next_label(used: set) -> str:
+    index = 0
+    while True:
+        label, n = "", index
+        while True:
+            label = chr(ord("A") + n % 26) + label
+            n = n // 26 - 1
+            if n < 0:
+                break
+        if label not in used:
+            return label
+        index += 1
+
+
+def stitch_transcripts(chunks) -> list:
+    """
+    Merge per-chunk utterances into one timeline.
+
+    `chunks` is a list of (json_response, start_seconds, end_seconds) where
+    end excludes the overlap shared with the next chunk. Times are shifted
+    by each chunk's offset and utterances starting in the overlap are left
+    to the next chunk. AssemblyAI labels speakers independently per chunk,
+    so labels are matched across the overlap: the pair of speakers whose
+    words coincide the longest is the same person.
+    """
+    merged = []
+    used_labels = set()
+    previous = None  # (global utterances of the previous chunk, overlap window in ms)
+
+    for response, start, end in chunks:
+        offset_ms = int(start * 1000)
+        utterances = [_shift(u, offset_ms) for u in response.get("utterances") or []]
+
+        mapping = {}
+        if previous:
+            prev_utterances, window = previous
+            scores = _speaker_overlap(prev_utterances, utterances, *window)
+            for (prev_speaker, cur_speaker), _ in sorted(scores.items(), key=lambda item: -item[1]):
+                if cur_speaker not in mapping and prev_speaker not in mapping.values():
+                    mapping[cur_speaker] = prev_speaker
+        for utterance in utterances:
+            if utterance["speaker"] not in mapping:
+                mapping[utterance["speaker"]] = _next_label(used_labels | set(mapping.values()))
+        used_labels.update(mapping.values())
+
+        for utterance in utterances:
+            utterance["speaker"] = mapping[utterance["speaker"]]
+            for word in utterance["words"]:
+                if word.get("speaker"):
+                    word["speaker"] = mapping.get(word["speaker"], utterance["speaker"])
+
+        if end == float("inf"):
+            merged.extend(utterances)
+        else:
+            end_ms = int(end * 1000)
+            merged.extend(u for u in utterances if u["start"] < end_ms)
+            previous = (utterances, (end_ms, max((u["end"] for u in utterances), default=end_ms)))
+    return merged
+
+
+def transcribe_chunked(chunks, api_key: str, upload_slots=None, remote_slot=None, remote_ids=None, on_submit=None):
+    """
+    Transcribe the chunks of a long recording concurrently and stitch them.
+
+    `chunks` is the list returned by utils.convert.split_audio:
+    (path, start_seconds, end_seconds). `upload_slots` optionally bounds
+    concurrent uploads (e.g. a shared semaphore); `remote_slot(duration)`
+    returns a context manager held by each chunk while it is with AssemblyAI.
+    `remote_ids` holds the AssemblyAI id of chunks submitted before a
+    restart (None for the others), which are followed instead of uploaded
+    again; `on_submit(index, id)` is called as each new chunk is submitted.
+    """
+    def transcribe_chunk(index, chunk):
+        path, start, end = chunk
+        duration = None if end == float("inf") else end - start
+        strategy = get_completion_strategy(duration)
+        with (remote_slot or nullcontext)(duration):
+            if remote_ids and remote_ids[index]:
+                return resume_transcript(remote_ids[index], api_key, strategy=strategy)
+            with upload_slots or nullcontext():
+                job = submit_audio(str(path), api_key, strategy=strategy)
+            if on_submit:
+                on_submit(index, job.id)
+            return wait_for_completion(job, strategy=strategy)
+
+    with ThreadPoolExecutor(max_workers=len(chunks)) as pool:
+        jobs = list(pool.map(transcribe_chunk, range(len(chunks)), chunks))
+
+    utterances = stitch_transcripts([(job.json_response, start, end) for job, (_, start, end) in zip(jobs, chunks)])
+    durations = [job.json_response.get("audio_duration") for job in jobs]
+    audio_duration = chunks[-1][1] + durations[-1] if durations[-1] is not None else None
+    print(f"🧵 {len(jobs)} segments assemblés")
+    chunk_ids = [job.id for job in jobs]
+    return TranscriptionResult(",".join(chunk_ids), utterances, audio_duration=audio_duration, chunks=chunk_ids)
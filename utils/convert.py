@@ -1,5 +1,36 @@
+import io
+import os
+import json
+import hashlib
 import subprocess
+import threading
+import time
+import math
+import re
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
 from pathlib import Path
+from typing import BinaryIO, Iterator, List, Optional, Tuple, Union
+
+# Taille des blocs lus/écrits sur les pipes ffmpeg
+CHUNK_SIZE = 1024 * 1024
+
+# Codecs acceptés tels quels par AssemblyAI : codec -> (conteneur ffprobe attendu, extension)
+SPEECH_READY_CODECS = {
+    "mp3": ("mp3", ".mp3"),
+    "aac": ("mov,mp4,m4a,3gp,3g2,mj2", ".m4a"),
+    "opus": ("ogg", ".ogg"),
+    "pcm_s16le": ("wav", ".wav"),
+}
+
+# Au-delà, un WAV est plus coûteux à envoyer qu'à réencoder
+MAX_PCM_SAMPLE_RATE = 16000
+MAX_SAMPLE_RATE = 48000
+
+# Résultats ffprobe mis en cache par empreinte SHA-256 du contenu
+PROBE_CACHE_SIZE = int(os.getenv("PROBE_CACHE_SIZE", "1024"))
+_probe_cache = OrderedDict()
+_probe_cache_lock = threading.Lock()
 
 def convert_to_mp3(input_path: Path, output_path: Path, bitrate: str = "128k"):
     """
@@ -19,3 +50,513 @@ def convert_to_mp3(input_path: Path, output_path: Path, bitrate: str = "128k"):
 
     if result.returncode != 0:
         raise RuntimeError(result.stderr.decode())
+
+
+def _feed_stdin(source: BinaryIO, stdin):
+    """Copie la source bloc par bloc dans le stdin de ffmpeg."""
+    try:
+        while True:
+            chunk = source.read(CHUNK_SIZE)
+            if not chunk:
+                break
+            stdin.write(chunk)
+    except BrokenPipeError:
+        # ffmpeg s'est arrêté (entrée illisible) : l'erreur est remontée via stderr
+        pass
+    finally:
+        try:
+            stdin.close()
+        except BrokenPipeError:
+            pass
+
+
+def convert_stream(source: BinaryIO, bitrate: str = "128k") -> io.BytesIO:
+    """
+    Convertit un flux audio en MP3 mono 16kHz sans passer par le disque.
+
+    Les blocs de `source` sont envoyés sur le stdin de ffmpeg pendant que le
+    MP3 encodé est lu sur son stdout. Le format d'entrée doit être lisible
+    en flux (mp3, wav, ogg, webm, ou mp4/m4a avec l'atome moov en tête).
+
+    Args:
+        source: Objet fichier binaire (ex: UploadFile.file)
+        bitrate: Bitrate cible (ex: '64k', '96k', '128k')
+
+    Returns:
+        Un BytesIO contenant le MP3, positionné au début.
+    """
+    print(f"🔄 Conversion en flux (bitrate={bitrate})")
+    process = subprocess.Popen([
+        "ffmpeg", "-hide_banner", "-loglevel", "error",
+        "-i", "pipe:0",
+        "-ac", "1", "-ar", "16000", "-b:a", bitrate,
+        "-f", "mp3", "pipe:1"
+    ], stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+
+    # stdin et stderr sont servis par des threads pour éviter tout interblocage
+    stderr_chunks = []
+    writer = _start_feeding(source, process)
+    reader = threading.Thread(target=lambda: stderr_chunks.append(process.stderr.read()), daemon=True)
+    reader.start()
+
+    output = io.BytesIO()
+    while True:
+        chunk = process.stdout.read(CHUNK_SIZE)
+        if not chunk:
+            break
+        output.write(chunk)
+
+    process.wait()
+    writer.join()
+    reader.join()
+
+    if process.returncode != 0:
+        raise RuntimeError(b"".join(stderr_chunks).decode(errors="replace"))
+
+    output.seek(0)
+    return output
+
+
+def _start_feeding(source: BinaryIO, process) -> threading.Thread:
+    writer = threading.Thread(target=_feed_stdin, args=(source, process.stdin), daemon=True)
+    writer.start()
+    return writer
+
+
+def iter_mp3_chunks(source: Union[Path, BinaryIO], bitrate: str = "128k") -> Iterator[bytes]:
+    """
+    Convertit en MP3 mono 16kHz et produit la sortie de ffmpeg au fil de
+    l'encodage, pour qu'elle parte sur le réseau pendant que la conversion
+    continue. Une erreur ffmpeg est levée (RuntimeError) une fois le flux
+    épuisé, ce qui fait échouer la requête qui le consomme.
+
+    Args:
+        source: Chemin du fichier, ou objet fichier binaire envoyé sur le
+            stdin de ffmpeg (mêmes formats que convert_stream)
+        bitrate: Bitrate cible (ex: '64k', '96k', '128k')
+    """
+    piped = not isinstance(source, Path)
+    print(f"🔄 Conversion en flux : {'stdin' if piped else source.name} (bitrate={bitrate})")
+    process = subprocess.Popen([
+        "ffmpeg", "-hide_banner", "-loglevel", "error",
+        "-i", "pipe:0" if piped else str(source),
+        "-ac", "1", "-ar", "16000", "-b:a", bitrate,
+        "-f", "mp3", "pipe:1"
+    ], stdin=subprocess.PIPE if piped else None, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+
+    stderr_chunks = []
+    writer = _start_feeding(source, process) if piped else None
+    reader = threading.Thread(target=lambda: stderr_chunks.append(process.stderr.read()), daemon=True)
+    reader.start()
+    try:
+        while True:
+            # read1 rend ce qui est disponible sans attendre un bloc complet
+            chunk = process.stdout.read1(CHUNK_SIZE)
+            if not chunk:
+                break
+            yield chunk
+
+        process.wait()
+        reader.join()
+        if process.returncode != 0:
+            raise RuntimeError(b"".join(stderr_chunks).decode(errors="replace"))
+    finally:
+        # Consommateur interrompu (upload échoué) : on arrête ffmpeg
+        if process.poll() is None:
+            process.kill()
+            process.wait()
+        if writer is not None:
+            # La source peut ensuite être relue depuis le début
+            writer.join()
+
+
+def estimate_mp3_duration(size_bytes: int, bitrate: str = "128k") -> float:
+    """
+    Estime la durée (secondes) d'un MP3 CBR à partir de sa taille et du bitrate.
+    """
+    bits_per_second = int(bitrate.rstrip("k")) * 1000
+    return size_bytes * 8 / bits_per_second
+
+
+def stream_sha256(source: BinaryIO, destination: Optional[BinaryIO] = None) -> str:
+    """
+    Empreinte SHA-256 d'un flux, calculée au fil de la lecture.
+
+    Si `destination` est fourni, les blocs y sont copiés en même temps
+    (remplace shutil.copyfileobj sans relire le fichier ensuite).
+    """
+    digest = hashlib.sha256()
+    for chunk in iter(lambda: source.read(CHUNK_SIZE), b""):
+        digest.update(chunk)
+        if destination is not None:
+            destination.write(chunk)
+    return digest.hexdigest()
+
+
+def file_sha256(path: Path) -> str:
+    """Empreinte SHA-256 du contenu d'un fichier, lu par blocs."""
+    with open(path, "rb") as f:
+        return stream_sha256(f)
+
+
+def _bitrate_to_bps(bitrate: str) -> int:
+    return int(bitrate.rstrip("k")) * 1000
+
+
+def _ffprobe_stream(source: BinaryIO) -> subprocess.CompletedProcess:
+    """ffprobe sur le stdin, la source étant remise au début ensuite."""
+    args = ["ffprobe", "-v", "error", "-print_format", "json", "-show_format", "-show_streams", "pipe:0"]
+    process = subprocess.Popen(args, stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    stderr_chunks = []
+    writer = _start_feeding(source, process)
+    reader = threading.Thread(target=lambda: stderr_chunks.append(process.stderr.read()), daemon=True)
+    reader.start()
+    stdout = process.stdout.read()
+    process.wait()
+    writer.join()
+    reader.join()
+    source.seek(0)
+    return subprocess.CompletedProcess(args, process.returncode, stdout, b"".join(stderr_chunks))
+
+
+def probe_media(input_path: Union[Path, BinaryIO], content_hash: Optional[str] = None) -> dict:
+    """
+    Inspecte un fichier avec ffprobe et résume son premier flux audio.
+
+    Le résultat est mis en cache par empreinte du contenu : un même
+    enregistrement envoyé plusieurs fois n'est analysé qu'une fois.
+    `input_path` peut aussi être un objet fichier binaire (content_hash
+    requis), lu sur le stdin de ffprobe : la durée est alors estimée pour
+    certains formats, ou absente (mp4/m4a avec l'atome moov en fin).
+
+    Returns:
+        dict avec codec, container, channels, sample_rate, bit_rate,
+        duration, extra_streams et content_hash.
+    """
+    content_hash = content_hash or file_sha256(input_path)
+    with _probe_cache_lock:
+        if content_hash in _probe_cache:
+            _probe_cache.move_to_end(content_hash)
+            return dict(_probe_cache[content_hash])
+
+    if isinstance(input_path, Path):
+        result = subprocess.run([
+            "ffprobe", "-v", "error", "-print_format", "json",
+            "-show_format", "-show_streams", str(input_path)
+        ], stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    else:
+        result = _ffprobe_stream(input_path)
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.decode())
+
+    data = json.loads(result.stdout)
+    streams = data.get("streams", [])
+    audio = next((st for st in streams if st.get("codec_type") == "audio"), None)
+    fmt = data.get("format", {})
+    bit_rate = (audio or {}).get("bit_rate") or fmt.get("bit_rate")
+    duration = (audio or {}).get("duration") or fmt.get("duration")
+
+    info = {
+        "codec": audio.get("codec_name") if audio else None,
+        "container": fmt.get("format_name"),
+        "channels": int(audio.get("channels", 0)) if audio else 0,
+        "sample_rate": int(audio.get("sample_rate", 0)) if audio else 0,
+        "bit_rate": int(bit_rate) if bit_rate else None,
+        "duration": float(duration) if duration else None,
+        # Vidéo, pochette ou pistes de données à retirer avant l'envoi
+        "extra_streams": max(len(streams) - 1, 0),
+        "content_hash": content_hash,
+    }
+
+    with _probe_cache_lock:
+        _probe_cache[content_hash] = info
+        while len(_probe_cache) > PROBE_CACHE_SIZE:
+            _probe_cache.popitem(last=False)
+    return dict(info)
+
+
+def plan_conversion(info: dict, bitrate: str = "128k") -> str:
+    """
+    Choisit le traitement minimal pour rendre le fichier exploitable :
+    "passthrough" (envoyé tel quel), "remux" (copie du flux audio dans un
+    conteneur adapté) ou "transcode" (réencodage MP3 mono 16kHz).
+    """
+    codec = info.get("codec")
+    if codec not in SPEECH_READY_CODECS or info.get("channels") != 1:
+        return "transcode"
+
+    if codec.startswith("pcm_"):
+        if info.get("sample_rate", 0) > MAX_PCM_SAMPLE_RATE:
+            return "transcode"
+    else:
+        if info.get("sample_rate", 0) > MAX_SAMPLE_RATE:
+            return "transcode"
+        # Un flux plus lourd que la qualité demandée est réencodé
+        if not info.get("bit_rate") or info["bit_rate"] > _bitrate_to_bps(bitrate) * 1.1:
+            return "transcode"
+
+    container, _ = SPEECH_READY_CODECS[codec]
+    if info.get("container") != container or info.get("extra_streams"):
+        return "remux"
+    return "passthrough"
+
+
+def remux_audio(input_path: Path, output_path: Path):
+    """Copie le premier flux audio dans un nouveau conteneur, sans réencodage."""
+    print(f"📦 Remux : {input_path.name} → {output_path.name}")
+    result = subprocess.run([
+        "ffmpeg", "-y", "-i", str(input_path),
+        "-map", "0:a:0", "-c:a", "copy",
+        str(output_path)
+    ], stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.decode())
+
+
+def prepare_audio(input_path: Path, output_stem: Path, bitrate: str = "128k",
+                  content_hash: Optional[str] = None) -> Tuple[Path, dict]:
+    """
+    Prépare un fichier pour la transcription en évitant tout réencodage inutile.
+
+    Args:
+        input_path: Fichier source
+        output_stem: Chemin de sortie sans extension (l'extension dépend du traitement)
+        bitrate: Bitrate cible en cas de réencodage
+        content_hash: Empreinte déjà calculée du fichier source, le cas échéant
+
+    Returns:
+        (chemin à envoyer, infos ffprobe complétées de la clé "plan")
+    """
+    try:
+        info = probe_media(input_path, content_hash)
+        plan = plan_conversion(info, bitrate)
+    except (RuntimeError, OSError, ValueError) as e:
+        # ffprobe absent ou fichier illisible : on laisse ffmpeg trancher
+        print(f"⚠️  ffprobe failed, transcoding: {e}")
+        info, plan = {}, "transcode"
+    info["plan"] = plan
+
+    if plan == "passthrough":
+        print(f"⏩ Passthrough : {input_path.name} ({info['codec']}, déjà prêt)")
+        return input_path, info
+
+    if plan == "remux":
+        _, extension = SPEECH_READY_CODECS[info["codec"]]
+        output_path = output_stem.parent / f"{output_stem.name}{extension}"
+        remux_audio(input_path, output_path)
+        return output_path, info
+
+    output_path = output_stem.parent / f"{output_stem.name}.mp3"
+    convert_to_mp3(input_path, output_path, bitrate=bitrate)
+    return output_path, info
+
+
+def detect_silences(input_path: Path, noise: str = "-30dB", min_silence: float = 0.5) -> List[Tuple[float, float]]:
+    """
+    Repère les silences d'un fichier avec le filtre silencedetect de ffmpeg.
+
+    Returns:
+        Liste de (début, fin) en secondes.
+    """
+    result = subprocess.run([
+        "ffmpeg", "-hide_banner", "-nostats", "-i", str(input_path),
+        "-af", f"silencedetect=noise={noise}:d={min_silence}",
+        "-f", "null", "-"
+    ], stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.decode())
+
+    log = result.stderr.decode(errors="replace")
+    starts = [float(v) for v in re.findall(r"silence_start: (-?[\d.]+)", log)]
+    ends = [float(v) for v in re.findall(r"silence_end: ([\d.]+)", log)]
+    return list(zip(starts, ends))
+
+
+def choose_cut_points(duration: float, chunks: int, silences: List[Tuple[float, float]],
+                      search_window: float = 0.15) -> List[float]:
+    """
+    Place chunks-1 points de découpe au milieu du silence le plus proche de
+    chaque découpe idéale (durée / chunks), dans une fenêtre de
+    ±search_window × longueur de segment. Sans silence proche, on coupe
+    à la position idéale.
+    """
+    segment = duration / chunks
+    midpoints = [(start + end) / 2 for start, end in silences]
+    cuts = []
+    for k in range(1, chunks):
+        ideal = segment * k
+        nearby = [m for m in midpoints if abs(m - ideal) <= segment * search_window]
+        cut = min(nearby, key=lambda m: abs(m - ideal)) if nearby else ideal
+        if not cuts or cut > cuts[-1]:
+            cuts.append(cut)
+    return cuts
+
+
+def split_audio(input_path: Path, output_stem: Path, duration: float, chunks: int,
+                overlap: float = 10.0) -> List[Tuple[Path, float, float]]:
+    """
+    Découpe un fichier en `chunks` segments aux silences, sans réencodage.
+
+    Chaque segment (sauf le dernier) déborde de `overlap` secondes sur le
+    suivant : cette zone commune sert à raccorder les locuteurs.
+
+    Returns:
+        Liste de (chemin, début, fin propre) en secondes ; la fin propre
+        exclut le débordement (inf pour le dernier segment).
+    """
+    try:
+        silences = detect_silences(input_path)
+    except RuntimeError as e:
+        print(f"⚠️  silencedetect failed, cutting at fixed positions: {e}")
+        silences = []
+
+    cuts = choose_cut_points(duration, chunks, silences)
+    bounds = list(zip([0.0] + cuts, cuts + [math.inf]))
+    print(f"✂️  Découpe : {input_path.name} en {len(bounds)} segments ({', '.join(f'{c:.1f}s' for c in cuts)})")
+
+    segments = []
+    for index, (start, end) in enumerate(bounds):
+        output_path = output_stem.parent / f"{output_stem.name}_part{index}{input_path.suffix}"
+        args = ["ffmpeg", "-y", "-ss", f"{start:.3f}"]
+        if end != math.inf:
+            args += ["-to", f"{end + overlap:.3f}"]
+        args += ["-i", str(input_path), "-map", "0:a:0", "-c", "copy", str(output_path)]
+        # -to avant -i s'exprime en temps absolu de la source
+        result = subprocess.run(args, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+        if result.returncode != 0:
+            raise RuntimeError(result.stderr.decode())
+        segments.append((output_path, start, end))
+    return segments
+
+
+class ConversionQueueFull(RuntimeError):
+    """La file d'attente des conversions est pleine : le client doit réessayer plus tard."""
+
+    def __init__(self, retry_after: int):
+        super().__init__("Conversion queue is full")
+        self.retry_after = retry_after
+
+
+class ConversionTicket:
+    """Place réservée dans la file d'attente, consommée par submit()."""
+
+    def __init__(self, admitted: bool = True):
+        self.enqueued_at = time.monotonic()
+        self.used = False
+        # False : conversion lancée par un thread de travail, hors sémaphore d'admission
+        self.admitted = admitted
+
+
+class ConversionExecutor:
+    """
+    Exécute les conversions ffmpeg sur un nombre borné de créneaux.
+
+    Chaque créneau correspond à un processus ffmpeg (les threads ne font
+    qu'attendre leur sous-processus). Au-delà de `slots` conversions en
+    cours, au plus `max_queue` attendent ; les suivantes sont refusées avec
+    ConversionQueueFull afin que l'API renvoie 503 + Retry-After.
+    """
+
+    # Moyenne glissante exponentielle des temps d'attente / d'exécution
+    EWMA_ALPHA = 0.2
+
+    def __init__(self, slots: Optional[int] = None, max_queue: int = 32):
+        self.slots = slots or os.cpu_count() or 1
+        self.max_queue = max_queue
+        self._pool = ThreadPoolExecutor(max_workers=self.slots, thread_name_prefix="ffmpeg")
+        self._admission = threading.BoundedSemaphore(self.slots + self.max_queue)
+        self._lock = threading.Lock()
+        self._waiting = 0
+        self._running = 0
+        self._counters = {"submitted": 0, "rejected": 0, "completed": 0, "failed": 0}
+        self._wait_avg = 0.0
+        self._wait_max = 0.0
+        self._run_avg = 10.0  # estimation initiale avant la première conversion
+
+    def reserve(self, block: bool = False) -> ConversionTicket:
+        """Réserve une place dans la file ; lève ConversionQueueFull si elle est pleine."""
+        if not self._admission.acquire(blocking=block):
+            with self._lock:
+                self._counters["rejected"] += 1
+            raise ConversionQueueFull(self.retry_after())
+        with self._lock:
+            self._waiting += 1
+        return ConversionTicket()
+
+    def cancel(self, ticket: ConversionTicket):
+        """Libère une réservation qui ne sera finalement pas utilisée."""
+        with self._lock:
+            if ticket.used:
+                return
+            ticket.used = True
+            self._waiting -= 1
+        if ticket.admitted:
+            self._admission.release()
+
+    def submit(self, fn, *args, ticket: Optional[ConversionTicket] = None, **kwargs) -> Future:
+        """Planifie fn(*args, **kwargs) ; réserve une place si aucun ticket n'est fourni."""
+        ticket = ticket or self.reserve()
+        with self._lock:
+            self._counters["submitted"] += 1
+        return self._pool.submit(self._run, ticket, fn, args, kwargs)
+
+    def run(self, fn, *args, ticket: Optional[ConversionTicket] = None, **kwargs):
+        """
+        Version bloquante de submit() pour les threads de travail.
+
+        Sans ticket, la conversion n'attend pas le sémaphore d'admission :
+        les tickets des jobs encore en file peuvent l'occuper entièrement, et
+        un thread de travail bloqué dessus ne les laisserait jamais démarrer
+        (interblocage). Le nombre de threads de travail borne déjà ces
+        conversions ; les créneaux ffmpeg restent partagés.
+        """
+        if ticket is None:
+            ticket = ConversionTicket(admitted=False)
+            with self._lock:
+                self._waiting += 1
+        return self.submit(fn, *args, ticket=ticket, **kwargs).result()
+
+    def _run(self, ticket: ConversionTicket, fn, args, kwargs):
+        started = time.monotonic()
+        waited = started - ticket.enqueued_at
+        with self._lock:
+            ticket.used = True
+            self._waiting -= 1
+            self._running += 1
+            self._wait_avg += self.EWMA_ALPHA * (waited - self._wait_avg)
+            self._wait_max = max(self._wait_max, waited)
+
+        succeeded = False
+        try:
+            result = fn(*args, **kwargs)
+            succeeded = True
+            return result
+        finally:
+            elapsed = time.monotonic() - started
+            with self._lock:
+                self._running -= 1
+                self._run_avg += self.EWMA_ALPHA * (elapsed - self._run_avg)
+                self._counters["completed" if succeeded else "failed"] += 1
+            if ticket.admitted:
+                self._admission.release()
+
+    def retry_after(self) -> int:
+        """Délai conseillé (secondes) avant qu'une place se libère."""
+        with self._lock:
+            rounds = math.ceil((self._waiting + 1) / self.slots)
+            return int(min(300, max(1, math.ceil(rounds * self._run_avg))))
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "slots": self.slots,
+                "running": self._running,
+                "queue_depth": self._waiting,
+                "max_queue": self.max_queue,
+                "wait_seconds_avg": round(self._wait_avg, 3),
+                "wait_seconds_max": round(self._wait_max, 3),
+                "run_seconds_avg": round(self._run_avg, 3),
+                **self._counters,
+            }